@@ -0,0 +1,179 @@
+"""Per-route-group admission control.
+
+Sync endpoints share FastAPI's threadpool (40 threads by default). Without
+limits, a burst of slow ``/queries/*`` requests can take every thread and
+leave cheap lookups such as ``GET /enemies/{id}`` waiting behind them.
+Requests are therefore sorted into groups before they run:
+
+- ``lookups``: GET/HEAD of a single resource (the last path segment is an id)
+- ``lists``: other GET/HEAD on the resource collections
+- ``analytics``: GET/HEAD under ``/queries``, ``/views`` and ``/analytics``
+- ``writes``: POST, PUT, PATCH and DELETE
+
+Each group runs at most ``limit`` requests at once, and at most ``queue``
+more wait for a slot, for up to ``ADMISSION_QUEUE_TIMEOUT_SECONDS``. Anything
+beyond that is rejected immediately with 503 and ``Retry-After``, so an
+overloaded group sheds load instead of growing latency for everyone.
+Limits are set per group as ``ADMISSION_<GROUP>=limit:queue`` (for example
+``ADMISSION_ANALYTICS=4:8``). Keep the sum of the limits below the threadpool
+size so no group can starve the others. ``/``, ``/health``, ``/admin``, the
+docs, ``/openapi.json`` and the long-lived ``/live`` streams (capped by
+``LIVE_MAX_SUBSCRIBERS``) are never limited. Limits apply per worker process.
+"""
+import asyncio
+import json
+import os
+import re
+from typing import Dict, Optional, Tuple
+
+QUEUE_TIMEOUT_SECONDS = float(os.getenv("ADMISSION_QUEUE_TIMEOUT_SECONDS", "2"))
+RETRY_AFTER_SECONDS = int(os.getenv("ADMISSION_RETRY_AFTER_SECONDS", "1"))
+
+DEFAULT_LIMITS = {
+    "lookups": (16, 64),
+    "lists": (8, 32),
+    "analytics": (4, 8),
+    "writes": (8, 32),
+}
+
+_ANALYTICS_PREFIXES = ("/queries", "/views", "/analytics")
+_EXEMPT_PREFIXES = ("/admin", "/health", "/live", "/docs", "/redoc", "/openapi.json")
+_READ_METHODS = ("GET", "HEAD")
+_ID_SEGMENT = re.compile(r"/\d+/?$")
+
+
+def _limits_from_env() -> Dict[str, Tuple[int, int]]:
+    limits = {}
+    for group, (limit, queue) in DEFAULT_LIMITS.items():
+        value = os.getenv(f"ADMISSION_{group.upper()}")
+        if value:
+            limit_text, _, queue_text = value.partition(":")
+            limit, queue = int(limit_text), int(queue_text or queue)
+        limits[group] = (limit, queue)
+    return limits
+
+
+def route_group(method: str, path: str) -> Optional[str]:
+    """Admission group of a request, or None if it is never limited."""
+    if path == "/" or path.startswith(_EXEMPT_PREFIXES):
+        return None
+    if method not in _READ_METHODS:
+        return "writes"
+    if path.startswith(_ANALYTICS_PREFIXES):
+        return "analytics"
+    if _ID_SEGMENT.search(path):
+        return "lookups"
+    return "lists"
+
+
+class Gate:
+    """A concurrency limit with a bounded, time-limited wait queue."""
+
+    def __init__(self, limit: int, queue: int):
+        self.limit = limit
+        self.queue = queue
+        self._semaphore = asyncio.Semaphore(limit)
+        self.active = 0
+        self.waiting = 0
+        self.reset()
+
+    def reset(self) -> None:
+        self.max_waiting = self.waiting
+        self.admitted = 0
+        self.queued = 0
+        self.rejected_queue_full = 0
+        self.rejected_timeout = 0
+
+    async def acquire(self, timeout: float) -> bool:
+        """Take a slot, waiting in the queue if there is room; False means reject."""
+        if self._semaphore.locked():
+            if self.waiting >= self.queue:
+                self.rejected_queue_full += 1
+                return False
+            self.queued += 1
+            self.waiting += 1
+            self.max_waiting = max(self.max_waiting, self.waiting)
+            try:
+                await asyncio.wait_for(self._semaphore.acquire(), timeout)
+            except asyncio.TimeoutError:
+                self.rejected_timeout += 1
+                return False
+            finally:
+                self.waiting -= 1
+        else:
+            await self._semaphore.acquire()
+        self.active += 1
+        self.admitted += 1
+        return True
+
+    def release(self) -> None:
+        self.active -= 1
+        self._semaphore.release()
+
+    def stats(self) -> Dict:
+        return {
+            "limit": self.limit,
+            "queue_size": self.queue,
+            "active": self.active,
+            "queue_depth": self.waiting,
+            "max_queue_depth": self.max_waiting,
+            "admitted": self.admitted,
+            "queued": self.queued,
+            "rejected_queue_full": self.rejected_queue_full,
+            "rejected_timeout": self.rejected_timeout,
+        }
+
+
+# One gate per group; asyncio primitives bind to the event loop on first use
+gates: Dict[str, Gate] = {group: Gate(limit, queue) for group, (limit, queue) in _limits_from_env().items()}
+
+
+def metrics() -> Dict:
+    """Per-group limits, current and peak queue depth, admissions and rejections."""
+    return {
+        "queue_timeout_seconds": QUEUE_TIMEOUT_SECONDS,
+        "retry_after_seconds": RETRY_AFTER_SECONDS,
+        "groups": {group: gate.stats() for group, gate in gates.items()},
+    }
+
+
+def reset() -> None:
+    """Zero the counters; limits and requests in flight are unaffected."""
+    for gate in gates.values():
+        gate.reset()
+
+
+class AdmissionControlMiddleware:
+    """Limit concurrent requests per route group; reject overflow with 503."""
+
+    def __init__(self, app, queue_timeout: float = QUEUE_TIMEOUT_SECONDS):
+        self.app = app
+        self.queue_timeout = queue_timeout
+
+    async def __call__(self, scope, receive, send):
+        group = route_group(scope["method"], scope["path"]) if scope["type"] == "http" else None
+        gate = gates.get(group) if group is not None else None
+        if gate is None:
+            await self.app(scope, receive, send)
+            return
+
+        if not await gate.acquire(self.queue_timeout):
+            await self._reject(group, send)
+            return
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            gate.release()
+
+    async def _reject(self, group: str, send) -> None:
+        body = json.dumps({"detail": f"Server is busy ({group} requests); retry shortly"}).encode("utf-8")
+        await send({
+            "type": "http.response.start",
+            "status": 503,
+            "headers": [
+                (b"content-type", b"application/json"),
+                (b"content-length", str(len(body)).encode("latin-1")),
+                (b"retry-after", str(RETRY_AFTER_SECONDS).encode("latin-1")),
+            ],
+        })
+        await send({"type": "http.response.body", "body": body})
@@ -0,0 +1,157 @@
+"""Operational endpoints for inspecting the running service.
+
+With ``ADMIN_TOKEN`` set, every endpoint requires ``Authorization: Bearer
+<token>``. A read-only snapshot (``SNAPSHOT_MODE=1``) is meant for public
+traffic, so there the endpoints refuse to serve until a token is set.
+"""
+import os
+import secrets
+import sqlite3
+from typing import Optional
+
+from fastapi import APIRouter, Depends, Header, HTTPException, Query, status
+
+import admission
+import enemy_index
+import group_commit
+import live_updates
+import single_flight
+import slow_query_log
+import snapshot
+
+ADMIN_TOKEN = os.getenv("ADMIN_TOKEN") or None
+
+
+def require_admin(authorization: Optional[str] = Header(None)) -> None:
+    """Check the bearer token when ADMIN_TOKEN is set (always required in snapshot mode)."""
+    if ADMIN_TOKEN is None:
+        if snapshot.ENABLED:
+            raise HTTPException(
+                status_code=status.HTTP_403_FORBIDDEN,
+                detail="Admin endpoints are disabled in snapshot mode until ADMIN_TOKEN is set"
+            )
+        return
+    scheme, _, token = (authorization or "").partition(" ")
+    if scheme.lower() != "bearer" or not secrets.compare_digest(token.encode(), ADMIN_TOKEN.encode()):
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Missing or invalid admin token",
+            headers={"WWW-Authenticate": "Bearer"}
+        )
+
+
+router = APIRouter(prefix="/admin", tags=["Admin"], dependencies=[Depends(require_admin)])
+
+
+@router.get("/slow-queries")
+def get_slow_queries(
+    limit: int = Query(50, ge=1, le=1000, description="Maximum number of queries to return")
+):
+    """
+    Most recent statements slower than SLOW_QUERY_MS, newest first, with
+    duration, parameters, originating request and query plan.
+    """
+    return {
+        "settings": slow_query_log.settings(),
+        "queries": slow_query_log.recent(limit)
+    }
+
+
+@router.delete("/slow-queries", status_code=status.HTTP_204_NO_CONTENT)
+def clear_slow_queries():
+    """Empty the slow-query buffer."""
+    slow_query_log.clear()
+    return None
+
+
+@router.get("/single-flight")
+def get_single_flight_metrics():
+    """
+    How many GET executions ran and how many identical concurrent requests
+    were served from one of them instead, per route.
+    """
+    return single_flight.metrics()
+
+
+@router.delete("/single-flight", status_code=status.HTTP_204_NO_CONTENT)
+def reset_single_flight_metrics():
+    """Reset the single-flight counters."""
+    single_flight.reset()
+    return None
+
+
+@router.get("/admission")
+def get_admission_metrics():
+    """
+    Per route group (lookups, lists, analytics, writes): concurrency limit,
+    queue size, requests running and queued now, peak queue depth, and how
+    many requests were admitted or rejected with 503.
+    """
+    return admission.metrics()
+
+
+@router.delete("/admission", status_code=status.HTTP_204_NO_CONTENT)
+def reset_admission_metrics():
+    """Reset the admission counters."""
+    admission.reset()
+    return None
+
+
+@router.get("/group-commit")
+def get_group_commit_metrics():
+    """
+    Batches committed by the group-commit writer, operations per batch and
+    operations that failed (GROUP_COMMIT=1).
+    """
+    return group_commit.writer.metrics()
+
+
+@router.delete("/group-commit", status_code=status.HTTP_204_NO_CONTENT)
+def reset_group_commit_metrics():
+    """Reset the group-commit counters."""
+    group_commit.writer.reset()
+    return None
+
+
+@router.get("/live")
+async def get_live_metrics():
+    """
+    Open live subscriptions per table, change-log position, and events
+    published, delivered, dropped or ending a stream on overflow.
+    """
+    # async: the hub's subscriber sets are only touched on the event loop
+    return live_updates.hub.metrics()
+
+
+@router.get("/snapshot")
+def get_snapshot():
+    """The read-only snapshot being served (SNAPSHOT_MODE=1): source, size, materialized views."""
+    return snapshot.store.info()
+
+
+@router.post("/snapshot/reload")
+def reload_snapshot():
+    """
+    Load the snapshot file again and swap it in atomically. Requests already
+    running finish on the previous snapshot.
+    """
+    if not snapshot.ENABLED:
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail="Not serving a snapshot; start the worker with SNAPSHOT_MODE=1"
+        )
+    try:
+        snapshot.store.reload()
+    except sqlite3.Error as e:
+        # The previous snapshot stays in service
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Could not load snapshot: {e}"
+        )
+    return snapshot.store.info()
+
+
+@router.get("/enemy-index")
+def get_enemy_index():
+    """The in-memory enemy stats index: array backend, rows, loads and incremental updates."""
+    return enemy_index.index.metrics()
@@ -0,0 +1,176 @@
+"""Analytics endpoints computed in SQL with window functions."""
+import enum
+from fastapi import APIRouter, Depends, HTTPException, Request, status, Query
+from sqlalchemy import case, func, select
+from sqlalchemy.orm import Session
+from typing import Dict, List, Optional
+
+from compression import CompressedBody
+from config import get_db
+from fast_json import dumps
+from lookups import get_or_404
+from models import Enemy, Character
+from replicas import use_primary
+from table_versions import VersionedCache
+
+router = APIRouter(prefix="/analytics", tags=["Analytics"])
+
+# Results only change when enemies or their character names change; stored
+# as compressed response bodies so cache hits are sent without re-encoding
+_enemy_cache = VersionedCache(("enemies", "characters"), maxsize=256)
+
+DEFAULT_PERCENTILES = (0.25, 0.5, 0.75, 0.9, 0.99)
+
+
+class EnemyStat(str, enum.Enum):
+    """Enemy stat columns available for analytics."""
+    hp = "hp"
+    attack = "attack"
+    defense = "defense"
+    card_score = "card_score"
+
+
+def _stat_summary(db: Session, column, percentiles) -> Dict:
+    """
+    Count, min, max, mean and nearest-rank percentiles for one stat.
+
+    A percentile p is the smallest value whose cume_dist() reaches p, so one
+    ordered pass over the stat's covering index answers every percentile.
+    """
+    ranked = select(
+        column.label("value"),
+        func.cume_dist().over(order_by=column).label("cd")
+    ).subquery()
+
+    row = db.execute(
+        select(
+            func.count().label("count"),
+            func.min(ranked.c.value).label("min"),
+            func.max(ranked.c.value).label("max"),
+            func.avg(ranked.c.value).label("mean"),
+            *[
+                func.min(case((ranked.c.cd >= p, ranked.c.value))).label(f"p{i}")
+                for i, p in enumerate(percentiles)
+            ]
+        )
+    ).one()
+
+    return {
+        "count": row.count,
+        "min": row.min,
+        "max": row.max,
+        "mean": float(row.mean) if row.mean is not None else None,
+        "percentiles": {
+            f"p{p * 100:g}": row._mapping[f"p{i}"] for i, p in enumerate(percentiles)
+        }
+    }
+
+
+def _stat_histogram(db: Session, column, low: int, high: int, buckets: int) -> List[Dict]:
+    """Fixed-width histogram over [low, high] with at most ``buckets`` buckets."""
+    width = max(1, -(-(high - low + 1) // buckets))
+    bucket = ((column - low) // width).label("bucket")
+    counts = dict(db.execute(select(bucket, func.count()).group_by(bucket)).all())
+
+    return [
+        {
+            "bucket_start": low + i * width,
+            "bucket_end": min(high, low + (i + 1) * width - 1),
+            "count": counts.get(i, 0)
+        }
+        for i in range(-(-(high - low + 1) // width))
+    ]
+
+
+def _stat_top(db: Session, column, top_k: int) -> List[Dict]:
+    """Top-K enemies for one stat with their competition rank."""
+    ranked = select(
+        Enemy.enemy_id,
+        Enemy.character_id,
+        column.label("value"),
+        func.rank().over(order_by=column.desc()).label("rank"),
+        func.row_number().over(order_by=(column.desc(), Enemy.enemy_id)).label("rn")
+    ).subquery()
+
+    rows = db.execute(
+        select(ranked.c.enemy_id, Character.name, ranked.c.value, ranked.c.rank)
+        .join(Character, Character.character_id == ranked.c.character_id)
+        .where(ranked.c.rn <= top_k)
+        .order_by(ranked.c.rn)
+    ).all()
+
+    return [
+        {"enemy_id": r.enemy_id, "name": r.name, "value": r.value, "rank": r.rank}
+        for r in rows
+    ]
+
+
+def _enemy_ranks(db: Session, enemy_id: int, stats: List[EnemyStat]) -> Dict:
+    """Rank (1 = highest) and percentile of one enemy for every requested stat."""
+    columns = []
+    for stat in stats:
+        column = getattr(Enemy, stat.value)
+        columns.append(func.rank().over(order_by=column.desc()).label(f"{stat.value}_rank"))
+        columns.append(func.cume_dist().over(order_by=column).label(f"{stat.value}_cd"))
+    ranked = select(Enemy.enemy_id, *columns).subquery()
+
+    row = db.execute(select(ranked).where(ranked.c.enemy_id == enemy_id)).one()
+    return {
+        stat.value: {
+            "rank": row._mapping[f"{stat.value}_rank"],
+            "percentile": round(row._mapping[f"{stat.value}_cd"] * 100, 2)
+        }
+        for stat in stats
+    }
+
+
+@router.get("/enemies")
+def get_enemy_analytics(
+    request: Request,
+    stats: Optional[List[EnemyStat]] = Query(None, description="Stats to analyse (default: all)"),
+    percentiles: Optional[List[float]] = Query(None, description="Percentiles as fractions, e.g. 0.5"),
+    buckets: int = Query(10, ge=1, le=100, description="Histogram bucket count"),
+    top_k: int = Query(5, ge=0, le=100, description="Top enemies per stat"),
+    enemy_id: Optional[int] = Query(None, description="Also report this enemy's rank per stat"),
+    db: Session = Depends(get_db)
+):
+    """
+    Enemy stat distributions: percentiles, histograms, top-K and rank-of-enemy.
+    Computed in SQL with window functions; cached until enemies change.
+    """
+    stats = list(dict.fromkeys(stats or list(EnemyStat)))
+    percentiles = tuple(sorted(set(percentiles or DEFAULT_PERCENTILES)))
+    if any(not 0 < p <= 1 for p in percentiles):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Percentiles must be between 0 (exclusive) and 1"
+        )
+    if enemy_id is not None:
+        get_or_404(db, Enemy, enemy_id, "Enemy")
+
+    def compute():
+        # Cached under the primary's table versions, so read from the primary
+        with use_primary(db):
+            result = {"stats": {}}
+            for stat in stats:
+                column = getattr(Enemy, stat.value)
+                summary = _stat_summary(db, column, percentiles)
+                if summary["count"]:
+                    summary["histogram"] = _stat_histogram(
+                        db, column, summary["min"], summary["max"], buckets
+                    )
+                else:
+                    summary["histogram"] = []
+                summary["top"] = _stat_top(db, column, top_k) if top_k else []
+                result["stats"][stat.value] = summary
+
+            result["enemy_count"] = next(iter(result["stats"].values()))["count"]
+            if enemy_id is not None:
+                result["enemy"] = {
+                    "enemy_id": enemy_id,
+                    "ranks": _enemy_ranks(db, enemy_id, stats)
+                }
+            return CompressedBody(dumps(result))
+
+    key = (tuple(stats), percentiles, buckets, top_k, enemy_id)
+    return _enemy_cache.get_or_compute(key, compute).response(request)
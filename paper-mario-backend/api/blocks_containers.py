@@ -1,9 +1,14 @@
 """Block Container endpoints."""
-from fastapi import APIRouter, Depends, HTTPException, status, Query
+from fastapi import APIRouter, Depends, Header, Response, status, Query
 from sqlalchemy.orm import Session
 from typing import List, Optional
+from datetime import datetime
 
+from concurrency import set_etag
 from config import get_db
+from fast_json import list_response
+from last_modified import list_not_modified, modified_since_filter, not_modified, table_state
+from lookups import get_or_404
 from models import BlockContainer
 from models.blocks_containers import BlockType
 from schemas.blocks_containers import BlockContainerCreate, BlockContainerResponse, BlockContainerUpdate
@@ -13,15 +18,23 @@ router = APIRouter(prefix="/blocks", tags=["Blocks & Containers"])
 
 @router.get("/", response_model=List[BlockContainerResponse])
 def get_blocks(
+    response: Response,
     skip: int = 0,
     limit: int = None,
     location_id: Optional[int] = Query(None, description="Filter by location"),
     block_type: Optional[BlockType] = Query(None, description="Filter by block type"),
     has_item: Optional[bool] = Query(None, description="Filter blocks that contain items"),
+    modified_since: Optional[datetime] = Query(None, description="Only rows created or updated at or after this time (UTC)"),
+    if_modified_since: Optional[str] = Header(None),
+    if_none_match: Optional[str] = Header(None),
     db: Session = Depends(get_db)
 ):
     """Get all blocks with optional filtering. Use skip/limit for pagination (optional)."""
-    query = db.query(BlockContainer)
+    unchanged = list_not_modified(response, table_state(db, BlockContainer), if_modified_since, if_none_match)
+    if unchanged is not None:
+        return unchanged
+
+    query = modified_since_filter(db.query(BlockContainer), BlockContainer, modified_since)
     
     if location_id:
         query = query.filter(BlockContainer.location_id == location_id)
@@ -37,18 +50,22 @@ def get_blocks(
     if limit is not None:
         query = query.limit(limit)
     blocks = query.all()
-    return blocks
+    return list_response(blocks, BlockContainerResponse, response)
 
 
 @router.get("/{block_id}", response_model=BlockContainerResponse)
-def get_block(block_id: int, db: Session = Depends(get_db)):
+def get_block(
+    block_id: int,
+    response: Response,
+    if_modified_since: Optional[str] = Header(None),
+    db: Session = Depends(get_db)
+):
     """Get a specific block by ID."""
-    block = db.query(BlockContainer).filter(BlockContainer.block_id == block_id).first()
-    if not block:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail=f"Block with id {block_id} not found"
-        )
+    block = get_or_404(db, BlockContainer, block_id, "Block")
+    set_etag(response, block)
+    unchanged = not_modified(response, block.updated_at, if_modified_since)
+    if unchanged is not None:
+        return unchanged
     return block
 
 
@@ -66,15 +83,12 @@ def create_block(block: BlockContainerCreate, db: Session = Depends(get_db)):
 def update_block(
     block_id: int,
     block_update: BlockContainerUpdate,
+    response: Response,
+    if_match: Optional[str] = Header(None),
     db: Session = Depends(get_db)
 ):
     """Update a block."""
-    db_block = db.query(BlockContainer).filter(BlockContainer.block_id == block_id).first()
-    if not db_block:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail=f"Block with id {block_id} not found"
-        )
+    db_block = get_or_404(db, BlockContainer, block_id, "Block", if_match=if_match)
     
     update_data = block_update.model_dump(exclude_unset=True)
     for field, value in update_data.items():
@@ -82,18 +96,18 @@ def update_block(
     
     db.commit()
     db.refresh(db_block)
+    set_etag(response, db_block)
     return db_block
 
 
 @router.delete("/{block_id}", status_code=status.HTTP_204_NO_CONTENT)
-def delete_block(block_id: int, db: Session = Depends(get_db)):
+def delete_block(
+    block_id: int,
+    if_match: Optional[str] = Header(None),
+    db: Session = Depends(get_db)
+):
     """Delete a block."""
-    db_block = db.query(BlockContainer).filter(BlockContainer.block_id == block_id).first()
-    if not db_block:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail=f"Block with id {block_id} not found"
-        )
+    db_block = get_or_404(db, BlockContainer, block_id, "Block", if_match=if_match)
     
     db.delete(db_block)
     db.commit()
@@ -1,9 +1,14 @@
 """Boss endpoints."""
-from fastapi import APIRouter, Depends, HTTPException, status, Query
+from fastapi import APIRouter, Depends, Header, Response, status, Query
 from sqlalchemy.orm import Session
 from typing import List, Optional
+from datetime import datetime
 
+from concurrency import set_etag
 from config import get_db
+from fast_json import list_response
+from last_modified import list_not_modified, modified_since_filter, not_modified, table_state
+from lookups import get_or_404
 from models import Boss, Character
 from schemas.bosses import BossCreate, BossResponse, BossUpdate
 
@@ -12,13 +17,21 @@ router = APIRouter(prefix="/bosses", tags=["Bosses"])
 
 @router.get("/", response_model=List[BossResponse])
 def get_bosses(
+    response: Response,
     skip: int = 0,
     limit: int = None,
     chapter_id: Optional[int] = Query(None, description="Filter by chapter"),
+    modified_since: Optional[datetime] = Query(None, description="Only rows created or updated at or after this time (UTC)"),
+    if_modified_since: Optional[str] = Header(None),
+    if_none_match: Optional[str] = Header(None),
     db: Session = Depends(get_db)
 ):
     """Get all bosses with optional filtering. Use skip/limit for pagination (optional)."""
-    query = db.query(Boss)
+    unchanged = list_not_modified(response, table_state(db, Boss), if_modified_since, if_none_match)
+    if unchanged is not None:
+        return unchanged
+
+    query = modified_since_filter(db.query(Boss), Boss, modified_since)
     
     if chapter_id:
         query = query.filter(Boss.chapter_id == chapter_id)
@@ -27,32 +40,31 @@ def get_bosses(
     if limit is not None:
         query = query.limit(limit)
     bosses = query.all()
-    return bosses
+    return list_response(bosses, BossResponse, response)
 
 
 @router.get("/{boss_id}", response_model=BossResponse)
-def get_boss(boss_id: int, db: Session = Depends(get_db)):
+def get_boss(
+    boss_id: int,
+    response: Response,
+    if_modified_since: Optional[str] = Header(None),
+    db: Session = Depends(get_db)
+):
     """Get a specific boss by ID."""
-    boss = db.query(Boss).filter(Boss.boss_id == boss_id).first()
-    if not boss:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail=f"Boss with id {boss_id} not found"
-        )
+    boss = get_or_404(db, Boss, boss_id, "Boss")
+    set_etag(response, boss)
+    unchanged = not_modified(response, boss.updated_at, if_modified_since)
+    if unchanged is not None:
+        return unchanged
     return boss
 
 
 @router.get("/{boss_id}/character")
 def get_boss_character(boss_id: int, db: Session = Depends(get_db)):
     """Get the character info for a specific boss."""
-    boss = db.query(Boss).filter(Boss.boss_id == boss_id).first()
-    if not boss:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail=f"Boss with id {boss_id} not found"
-        )
+    boss = get_or_404(db, Boss, boss_id, "Boss")
     
-    character = db.query(Character).filter(Character.character_id == boss.character_id).first()
+    character = db.get(Character, boss.character_id)
     return character
 
 
@@ -60,12 +72,7 @@ def get_boss_character(boss_id: int, db: Session = Depends(get_db)):
 def create_boss(boss: BossCreate, db: Session = Depends(get_db)):
     """Create a new boss."""
     # Check if character exists
-    character = db.query(Character).filter(Character.character_id == boss.character_id).first()
-    if not character:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail=f"Character with id {boss.character_id} not found"
-        )
+    character = get_or_404(db, Character, boss.character_id, "Character")
     
     db_boss = Boss(**boss.model_dump())
     db.add(db_boss)
@@ -78,15 +85,12 @@ def create_boss(boss: BossCreate, db: Session = Depends(get_db)):
 def update_boss(
     boss_id: int,
     boss_update: BossUpdate,
+    response: Response,
+    if_match: Optional[str] = Header(None),
     db: Session = Depends(get_db)
 ):
     """Update a boss."""
-    db_boss = db.query(Boss).filter(Boss.boss_id == boss_id).first()
-    if not db_boss:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail=f"Boss with id {boss_id} not found"
-        )
+    db_boss = get_or_404(db, Boss, boss_id, "Boss", if_match=if_match)
     
     update_data = boss_update.model_dump(exclude_unset=True)
     for field, value in update_data.items():
@@ -94,18 +98,18 @@ def update_boss(
     
     db.commit()
     db.refresh(db_boss)
+    set_etag(response, db_boss)
     return db_boss
 
 
 @router.delete("/{boss_id}", status_code=status.HTTP_204_NO_CONTENT)
-def delete_boss(boss_id: int, db: Session = Depends(get_db)):
+def delete_boss(
+    boss_id: int,
+    if_match: Optional[str] = Header(None),
+    db: Session = Depends(get_db)
+):
     """Delete a boss."""
-    db_boss = db.query(Boss).filter(Boss.boss_id == boss_id).first()
-    if not db_boss:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail=f"Boss with id {boss_id} not found"
-        )
+    db_boss = get_or_404(db, Boss, boss_id, "Boss", if_match=if_match)
     
     db.delete(db_boss)
     db.commit()
@@ -0,0 +1,44 @@
+"""API endpoint for the change feed (incremental sync)."""
+from typing import Optional
+
+from fastapi import APIRouter, Depends, HTTPException, Query, status
+from sqlalchemy.orm import Session
+
+import change_feed
+from config import Base, Versioned, get_db
+
+router = APIRouter(prefix="/changes", tags=["Changes"])
+
+# Tables whose rows are recorded in the change log
+TRACKED_TABLES = sorted(
+    mapper.local_table.name for mapper in Base.registry.mappers if issubclass(mapper.class_, Versioned)
+)
+
+
+@router.get("/")
+def get_changes(
+    since: int = Query(0, ge=0, description="Return entries after this sequence number"),
+    limit: int = Query(100, ge=0, le=1000, description="Maximum number of entries to return"),
+    table: Optional[str] = Query(None, description="Only changes to this table"),
+    db: Session = Depends(get_db)
+):
+    """
+    Row changes committed after `since`, oldest first.
+
+    Page by passing `next_since` back as `since` while `has_more` is true.
+    Call with `limit=0` for just `latest_seq`, e.g. right before a full download.
+    Returns 410 if entries after `since` were already compacted; download the
+    tables again and continue from `latest_seq`.
+    """
+    if table is not None and table not in TRACKED_TABLES:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Unknown table '{table}'; expected one of {', '.join(TRACKED_TABLES)}"
+        )
+    page = change_feed.changes_since(db, since, limit, table)
+    if page is None:
+        raise HTTPException(
+            status_code=status.HTTP_410_GONE,
+            detail=f"Changes after {since} were compacted; download the tables again"
+        )
+    return page
@@ -1,9 +1,15 @@
 """Chapter endpoints."""
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Header, Response, status, Query
 from sqlalchemy.orm import Session
-from typing import List
+from typing import List, Optional
+from datetime import datetime
 
+import reference_cache
+from concurrency import set_etag
 from config import get_db
+from fast_json import list_response
+from last_modified import list_not_modified, modified_since_filter, not_modified, table_state
+from lookups import get_or_404
 from models import Chapter, Location
 from schemas.chapters import ChapterCreate, ChapterResponse, ChapterUpdate
 
@@ -12,39 +18,46 @@ router = APIRouter(prefix="/chapters", tags=["Chapters"])
 
 @router.get("/", response_model=List[ChapterResponse])
 def get_chapters(
+    response: Response,
     skip: int = 0,
     limit: int = None,
+    modified_since: Optional[datetime] = Query(None, description="Only rows created or updated at or after this time (UTC)"),
+    if_modified_since: Optional[str] = Header(None),
+    if_none_match: Optional[str] = Header(None),
     db: Session = Depends(get_db)
 ):
     """Get all chapters. Use skip/limit for pagination (optional)."""
-    query = db.query(Chapter).offset(skip)
+    unchanged = list_not_modified(response, table_state(db, Chapter), if_modified_since, if_none_match)
+    if unchanged is not None:
+        return unchanged
+
+    query = modified_since_filter(db.query(Chapter), Chapter, modified_since).offset(skip)
     if limit is not None:
         query = query.limit(limit)
     chapters = query.all()
-    return chapters
+    return list_response(chapters, ChapterResponse, response)
 
 
 @router.get("/{chapter_id}", response_model=ChapterResponse)
-def get_chapter(chapter_id: int, db: Session = Depends(get_db)):
+def get_chapter(
+    chapter_id: int,
+    response: Response,
+    if_modified_since: Optional[str] = Header(None),
+    db: Session = Depends(get_db)
+):
     """Get a specific chapter by ID."""
-    chapter = db.query(Chapter).filter(Chapter.chapter_id == chapter_id).first()
-    if not chapter:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail=f"Chapter with id {chapter_id} not found"
-        )
+    chapter = reference_cache.chapters.get_or_404(db, chapter_id)
+    set_etag(response, chapter)
+    unchanged = not_modified(response, chapter.updated_at, if_modified_since)
+    if unchanged is not None:
+        return unchanged
     return chapter
 
 
 @router.get("/{chapter_id}/locations")
 def get_chapter_locations(chapter_id: int, db: Session = Depends(get_db)):
     """Get all locations in a specific chapter."""
-    chapter = db.query(Chapter).filter(Chapter.chapter_id == chapter_id).first()
-    if not chapter:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail=f"Chapter with id {chapter_id} not found"
-        )
+    reference_cache.chapters.get_or_404(db, chapter_id)
     
     locations = db.query(Location).filter(Location.chapter_id == chapter_id).all()
     return locations
@@ -54,7 +67,7 @@ def get_chapter_locations(chapter_id: int, db: Session = Depends(get_db)):
 def create_chapter(chapter: ChapterCreate, db: Session = Depends(get_db)):
     """Create a new chapter."""
     # Check if chapter name already exists
-    existing = db.query(Chapter).filter(Chapter.name == chapter.name).first()
+    existing = reference_cache.chapters.get_by_name(db, chapter.name)
     if existing:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
@@ -72,15 +85,12 @@ def create_chapter(chapter: ChapterCreate, db: Session = Depends(get_db)):
 def update_chapter(
     chapter_id: int,
     chapter_update: ChapterUpdate,
+    response: Response,
+    if_match: Optional[str] = Header(None),
     db: Session = Depends(get_db)
 ):
     """Update a chapter."""
-    db_chapter = db.query(Chapter).filter(Chapter.chapter_id == chapter_id).first()
-    if not db_chapter:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail=f"Chapter with id {chapter_id} not found"
-        )
+    db_chapter = get_or_404(db, Chapter, chapter_id, "Chapter", if_match=if_match)
     
     # Update only provided fields
     update_data = chapter_update.model_dump(exclude_unset=True)
@@ -89,18 +99,18 @@ def update_chapter(
     
     db.commit()
     db.refresh(db_chapter)
+    set_etag(response, db_chapter)
     return db_chapter
 
 
 @router.delete("/{chapter_id}", status_code=status.HTTP_204_NO_CONTENT)
-def delete_chapter(chapter_id: int, db: Session = Depends(get_db)):
+def delete_chapter(
+    chapter_id: int,
+    if_match: Optional[str] = Header(None),
+    db: Session = Depends(get_db)
+):
     """Delete a chapter."""
-    db_chapter = db.query(Chapter).filter(Chapter.chapter_id == chapter_id).first()
-    if not db_chapter:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail=f"Chapter with id {chapter_id} not found"
-        )
+    db_chapter = get_or_404(db, Chapter, chapter_id, "Chapter", if_match=if_match)
     
     db.delete(db_chapter)
     db.commit()
@@ -1,9 +1,14 @@
 """Character endpoints."""
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Header, Response, status, Query
 from sqlalchemy.orm import Session
-from typing import List
+from typing import List, Optional
+from datetime import datetime
 
+from concurrency import set_etag
 from config import get_db
+from fast_json import list_response
+from last_modified import list_not_modified, modified_since_filter, not_modified, table_state
+from lookups import get_or_404, get_by_name
 from models import Character
 from schemas.characters import CharacterCreate, CharacterResponse, CharacterUpdate
 
@@ -12,27 +17,39 @@ router = APIRouter(prefix="/characters", tags=["Characters"])
 
 @router.get("/", response_model=List[CharacterResponse])
 def get_characters(
+    response: Response,
     skip: int = 0,
     limit: int = None,
+    modified_since: Optional[datetime] = Query(None, description="Only rows created or updated at or after this time (UTC)"),
+    if_modified_since: Optional[str] = Header(None),
+    if_none_match: Optional[str] = Header(None),
     db: Session = Depends(get_db)
 ):
     """Get all characters. Use skip/limit for pagination (optional)."""
-    query = db.query(Character).offset(skip)
+    unchanged = list_not_modified(response, table_state(db, Character), if_modified_since, if_none_match)
+    if unchanged is not None:
+        return unchanged
+
+    query = modified_since_filter(db.query(Character), Character, modified_since).offset(skip)
     if limit is not None:
         query = query.limit(limit)
     characters = query.all()
-    return characters
+    return list_response(characters, CharacterResponse, response)
 
 
 @router.get("/{character_id}", response_model=CharacterResponse)
-def get_character(character_id: int, db: Session = Depends(get_db)):
+def get_character(
+    character_id: int,
+    response: Response,
+    if_modified_since: Optional[str] = Header(None),
+    db: Session = Depends(get_db)
+):
     """Get a specific character by ID."""
-    character = db.query(Character).filter(Character.character_id == character_id).first()
-    if not character:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail=f"Character with id {character_id} not found"
-        )
+    character = get_or_404(db, Character, character_id, "Character")
+    set_etag(response, character)
+    unchanged = not_modified(response, character.updated_at, if_modified_since)
+    if unchanged is not None:
+        return unchanged
     return character
 
 
@@ -40,7 +57,7 @@ def get_character(character_id: int, db: Session = Depends(get_db)):
 def create_character(character: CharacterCreate, db: Session = Depends(get_db)):
     """Create a new character."""
     # Check if character name already exists
-    existing = db.query(Character).filter(Character.name == character.name).first()
+    existing = get_by_name(db, Character, character.name)
     if existing:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
@@ -58,15 +75,12 @@ def create_character(character: CharacterCreate, db: Session = Depends(get_db)):
 def update_character(
     character_id: int,
     character_update: CharacterUpdate,
+    response: Response,
+    if_match: Optional[str] = Header(None),
     db: Session = Depends(get_db)
 ):
     """Update a character."""
-    db_character = db.query(Character).filter(Character.character_id == character_id).first()
-    if not db_character:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail=f"Character with id {character_id} not found"
-        )
+    db_character = get_or_404(db, Character, character_id, "Character", if_match=if_match)
     
     # Update only provided fields
     update_data = character_update.model_dump(exclude_unset=True)
@@ -75,18 +89,18 @@ def update_character(
     
     db.commit()
     db.refresh(db_character)
+    set_etag(response, db_character)
     return db_character
 
 
 @router.delete("/{character_id}", status_code=status.HTTP_204_NO_CONTENT)
-def delete_character(character_id: int, db: Session = Depends(get_db)):
+def delete_character(
+    character_id: int,
+    if_match: Optional[str] = Header(None),
+    db: Session = Depends(get_db)
+):
     """Delete a character."""
-    db_character = db.query(Character).filter(Character.character_id == character_id).first()
-    if not db_character:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail=f"Character with id {character_id} not found"
-        )
+    db_character = get_or_404(db, Character, character_id, "Character", if_match=if_match)
     
     db.delete(db_character)
     db.commit()
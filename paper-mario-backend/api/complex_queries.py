@@ -1,17 +1,32 @@
 """Complex query endpoints with multiple joins."""
-from fastapi import APIRouter, Depends
+import enum
+
+from fastapi import APIRouter, Depends, Query, Request
+from sqlalchemy import func, select
 from sqlalchemy.orm import Session
-from typing import List
+from typing import List, Optional
 
+import chapter_documents
+from api.enemies import SortOrder
+from compression import CompressedBody
 from config import get_db
+from json_sql import array_body, json_array_agg, json_object, json_value
 from models import (
     Enemy, Character, Boss, Chapter, Location,
     BlockContainer, Item, SideQuest, PlayableCharacter,
     QuestCharacter
 )
+from models.locations import LocationType
+from replicas import use_primary
+from table_versions import VersionedCache
 
 router = APIRouter(prefix="/queries", tags=["Complex Queries"])
 
+# Compressed side-quest documents, valid until a contributing table changes
+_side_quest_cache = VersionedCache(
+    ("side_quests", "locations", "chapters", "items", "quest_character", "characters"), maxsize=64
+)
+
 
 @router.get("/enemies-with-details")
 def get_enemies_with_details(db: Session = Depends(get_db)):
@@ -152,96 +167,156 @@ def get_blocks_with_items_and_locations(db: Session = Depends(get_db)):
 
 
 @router.get("/side-quests-full-details")
-def get_side_quests_full_details(db: Session = Depends(get_db)):
+def get_side_quests_full_details(
+    request: Request,
+    skip: int = 0,
+    limit: int = None,
+    chapter_id: Optional[int] = Query(None, description="Filter by the chapter of the start location"),
+    reward_item_id: Optional[int] = Query(None, description="Filter by reward item"),
+    db: Session = Depends(get_db)
+):
     """
     Get side quests with location, reward item, and involved characters.
     Joins: SideQuest -> Location -> Chapter, SideQuest -> Item, SideQuest -> QuestCharacter -> Character
+    
+    Each quest is built as one JSON document in the database, with its characters
+    aggregated by a correlated subquery. Use skip/limit for pagination (optional).
+    Cached until side quests or the data they reference change.
     """
-    results = db.query(
-        SideQuest.quest_id,
-        SideQuest.name.label("quest_name"),
-        SideQuest.description,
-        Location.name.label("start_location"),
-        Chapter.name.label("chapter"),
-        Item.name.label("reward"),
-        Character.name.label("character_name"),
-        QuestCharacter.role
-    ).outerjoin(
+    key = (skip, limit, chapter_id, reward_item_id)
+    return _side_quest_cache.get_or_compute(
+        key, lambda: _side_quest_documents(db, skip, limit, chapter_id, reward_item_id)
+    ).response(request)
+
+
+def _side_quest_documents(db: Session, skip: int, limit: Optional[int], chapter_id: Optional[int],
+                          reward_item_id: Optional[int]) -> CompressedBody:
+    characters = select(
+        json_array_agg(json_object("name", Character.name, "role", QuestCharacter.role))
+    ).select_from(QuestCharacter).join(
+        Character, QuestCharacter.character_id == Character.character_id
+    ).where(
+        QuestCharacter.quest_id == SideQuest.quest_id
+    ).scalar_subquery()
+    
+    query = select(
+        json_object(
+            "quest_id", SideQuest.quest_id,
+            "name", SideQuest.name,
+            "description", SideQuest.description,
+            "start_location", Location.name,
+            "chapter", Chapter.name,
+            "reward", Item.name,
+            "characters", json_value(characters)
+        )
+    ).select_from(SideQuest).outerjoin(
         Location, SideQuest.start_location_id == Location.location_id
     ).outerjoin(
         Chapter, Location.chapter_id == Chapter.chapter_id
     ).outerjoin(
         Item, SideQuest.reward_item_id == Item.item_id
-    ).outerjoin(
-        QuestCharacter, SideQuest.quest_id == QuestCharacter.quest_id
-    ).outerjoin(
-        Character, QuestCharacter.character_id == Character.character_id
-    ).all()
+    )
     
-    # Group by quest_id to handle multiple characters per quest
-    quests_dict = {}
-    for r in results:
-        if r.quest_id not in quests_dict:
-            quests_dict[r.quest_id] = {
-                "quest_id": r.quest_id,
-                "name": r.quest_name,
-                "description": r.description,
-                "start_location": r.start_location,
-                "chapter": r.chapter,
-                "reward": r.reward,
-                "characters": []
-            }
-        
-        if r.character_name:
-            quests_dict[r.quest_id]["characters"].append({
-                "name": r.character_name,
-                "role": r.role.value if r.role else None
-            })
+    if chapter_id is not None:
+        query = query.where(Location.chapter_id == chapter_id)
+    if reward_item_id is not None:
+        query = query.where(SideQuest.reward_item_id == reward_item_id)
     
-    return list(quests_dict.values())
+    query = query.order_by(SideQuest.quest_id).offset(skip)
+    if limit is not None:
+        query = query.limit(limit)
+    
+    # Cached under the primary's table versions, so read from the primary
+    with use_primary(db):
+        return CompressedBody(array_body(db.execute(query).scalars()))
+
+
+class LocationSortField(str, enum.Enum):
+    """Columns locations-with-everything can be sorted by."""
+    location_id = "location_id"
+    name = "name"
+    objects = "objects"
+    blocks = "blocks"
+    navigation_objects = "navigation_objects"
+    obstacles = "obstacles"
+    switches = "switches"
+    total_interactive_elements = "total_interactive_elements"
+
+
+def _count_per_location(model, label: str):
+    """Child rows per location, aggregated before joining (an index-only scan)."""
+    return select(
+        model.location_id, func.count().label(label)
+    ).group_by(model.location_id).subquery()
 
 
 @router.get("/locations-with-everything")
-def get_locations_with_everything(db: Session = Depends(get_db)):
+def get_locations_with_everything(
+    skip: int = 0,
+    limit: int = None,
+    chapter_id: Optional[int] = Query(None, description="Filter by chapter"),
+    location_type: Optional[LocationType] = Query(None, description="Filter by location type"),
+    sort_by: LocationSortField = Query(LocationSortField.location_id, description="Sort column"),
+    order: SortOrder = Query(SortOrder.asc, description="Sort direction"),
+    db: Session = Depends(get_db)
+):
     """
     Get locations with chapter info and count of objects, enemies, blocks, etc.
-    Complex aggregation query with multiple joins.
+    
+    Each child table is counted per location in its own grouped subquery and
+    the counts are joined to locations one-to-one, so the work grows with the
+    number of child rows instead of their product per location.
+    Use skip/limit for pagination (optional).
     """
-    from sqlalchemy import func
     from models import Object, NavigationObject, Obstacle, Switch
     
-    results = db.query(
+    counts = {
+        "objects": _count_per_location(Object, "objects"),
+        "blocks": _count_per_location(BlockContainer, "blocks"),
+        "navigation_objects": _count_per_location(NavigationObject, "navigation_objects"),
+        "obstacles": _count_per_location(Obstacle, "obstacles"),
+        "switches": _count_per_location(Switch, "switches"),
+    }
+    count_columns = {
+        name: func.coalesce(subquery.c[name], 0) for name, subquery in counts.items()
+    }
+    total = sum(count_columns.values()).label("total_interactive_elements")
+    
+    query = select(
         Location.location_id,
         Location.name.label("location_name"),
         Location.type.label("location_type"),
         Location.description,
         Chapter.name.label("chapter_name"),
         Chapter.world_number,
-        func.count(Object.object_id.distinct()).label("object_count"),
-        func.count(BlockContainer.block_id.distinct()).label("block_count"),
-        func.count(NavigationObject.navobj_id.distinct()).label("nav_object_count"),
-        func.count(Obstacle.obstacle_id.distinct()).label("obstacle_count"),
-        func.count(Switch.switch_id.distinct()).label("switch_count")
+        *(column.label(name) for name, column in count_columns.items()),
+        total
     ).join(
         Chapter, Location.chapter_id == Chapter.chapter_id
-    ).outerjoin(
-        Object, Location.location_id == Object.location_id
-    ).outerjoin(
-        BlockContainer, Location.location_id == BlockContainer.location_id
-    ).outerjoin(
-        NavigationObject, Location.location_id == NavigationObject.location_id
-    ).outerjoin(
-        Obstacle, Location.location_id == Obstacle.location_id
-    ).outerjoin(
-        Switch, Location.location_id == Switch.location_id
-    ).group_by(
-        Location.location_id,
-        Location.name,
-        Location.type,
-        Location.description,
-        Chapter.name,
-        Chapter.world_number
-    ).all()
+    )
+    for subquery in counts.values():
+        query = query.outerjoin(subquery, subquery.c.location_id == Location.location_id)
+    
+    if chapter_id is not None:
+        query = query.where(Location.chapter_id == chapter_id)
+    if location_type is not None:
+        query = query.where(Location.type == location_type)
+    
+    sort_columns = {
+        LocationSortField.location_id: Location.location_id,
+        LocationSortField.name: Location.name,
+        LocationSortField.total_interactive_elements: total,
+        **{LocationSortField(name): column for name, column in count_columns.items()},
+    }
+    sort_column = sort_columns[sort_by]
+    if order == SortOrder.desc:
+        query = query.order_by(sort_column.desc(), Location.location_id.desc())
+    else:
+        query = query.order_by(sort_column, Location.location_id)
+    
+    query = query.offset(skip)
+    if limit is not None:
+        query = query.limit(limit)
     
     return [
         {
@@ -252,93 +327,25 @@ def get_locations_with_everything(db: Session = Depends(get_db)):
             "chapter": r.chapter_name,
             "world": r.world_number,
             "statistics": {
-                "objects": r.object_count,
-                "blocks": r.block_count,
-                "navigation_objects": r.nav_object_count,
-                "obstacles": r.obstacle_count,
-                "switches": r.switch_count,
-                "total_interactive_elements": (
-                    r.object_count + r.block_count + r.nav_object_count + 
-                    r.obstacle_count + r.switch_count
-                )
+                "objects": r.objects,
+                "blocks": r.blocks,
+                "navigation_objects": r.navigation_objects,
+                "obstacles": r.obstacles,
+                "switches": r.switches,
+                "total_interactive_elements": r.total_interactive_elements
             }
         }
-        for r in results
+        for r in db.execute(query)
     ]
 
 
 @router.get("/chapter-summary/{chapter_id}")
-def get_chapter_summary(chapter_id: int, db: Session = Depends(get_db)):
+def get_chapter_summary(chapter_id: int, request: Request, db: Session = Depends(get_db)):
     """
     Get complete summary of a chapter with all related data.
-    Multiple joins and aggregations.
+    Served from the precompiled chapter document store.
     """
-    from sqlalchemy import func
-    from models import Pixl
-    
-    # Get chapter basic info
-    chapter = db.query(Chapter).filter(Chapter.chapter_id == chapter_id).first()
-    if not chapter:
+    body = chapter_documents.get_compressed(db, chapter_id, chapter_documents.SUMMARY)
+    if body is None:
         return {"error": "Chapter not found"}
-    
-    # Count locations
-    location_count = db.query(func.count(Location.location_id)).filter(
-        Location.chapter_id == chapter_id
-    ).scalar()
-    
-    # Get bosses in this chapter
-    bosses = db.query(
-        Character.name,
-        Boss.phase_count,
-        Boss.special_mechanics
-    ).join(
-        Boss, Character.character_id == Boss.character_id
-    ).filter(
-        Boss.chapter_id == chapter_id
-    ).all()
-    
-    # Get playable characters unlocked in this chapter
-    playable_chars = db.query(
-        Character.name,
-        PlayableCharacter.special_ability
-    ).join(
-        PlayableCharacter, Character.character_id == PlayableCharacter.character_id
-    ).filter(
-        PlayableCharacter.unlock_chapter_id == chapter_id
-    ).all()
-    
-    # Get pixls unlocked in this chapter
-    pixls = db.query(Pixl).filter(Pixl.unlock_chapter_id == chapter_id).all()
-    
-    return {
-        "chapter_id": chapter.chapter_id,
-        "name": chapter.name,
-        "world_number": chapter.world_number,
-        "description": chapter.description,
-        "statistics": {
-            "location_count": location_count
-        },
-        "bosses": [
-            {
-                "name": b.name,
-                "phase_count": b.phase_count,
-                "special_mechanics": b.special_mechanics
-            }
-            for b in bosses
-        ],
-        "playable_characters_unlocked": [
-            {
-                "name": pc.name,
-                "special_ability": pc.special_ability
-            }
-            for pc in playable_chars
-        ],
-        "pixls_unlocked": [
-            {
-                "name": p.name,
-                "ability": p.ability,
-                "is_optional": p.is_optional
-            }
-            for p in pixls
-        ]
-    }
+    return chapter_documents.response(request, body)
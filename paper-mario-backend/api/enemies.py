@@ -1,61 +1,173 @@
 """Enemy endpoints."""
-from fastapi import APIRouter, Depends, HTTPException, status, Query
+import enum
+from fastapi import APIRouter, Depends, Header, Response, status, Query
+from sqlalchemy import func
 from sqlalchemy.orm import Session
-from typing import List, Optional
+from typing import Dict, List, Optional, Tuple
+from datetime import datetime
 
+import enemy_index
+from concurrency import set_etag
 from config import get_db
+from fast_json import list_response
+from last_modified import list_not_modified, modified_since_filter, not_modified, table_state
+from lookups import get_or_404
 from models import Enemy, Character
 from schemas.enemies import EnemyCreate, EnemyResponse, EnemyUpdate
 
 router = APIRouter(prefix="/enemies", tags=["Enemies"])
 
 
+class EnemySortField(str, enum.Enum):
+    """Columns enemies can be sorted by."""
+    enemy_id = "enemy_id"
+    hp = "hp"
+    attack = "attack"
+    defense = "defense"
+    card_score = "card_score"
+
+
+class SortOrder(str, enum.Enum):
+    """Sort direction."""
+    asc = "asc"
+    desc = "desc"
+
+
+def filter_stat_ranges(query, ranges: Dict[str, Tuple[Optional[int], Optional[int]]]):
+    """Apply inclusive stat range filters to an Enemy query."""
+    for stat, (low, high) in ranges.items():
+        column = getattr(Enemy, stat)
+        if low is not None:
+            query = query.filter(column >= low)
+        if high is not None:
+            query = query.filter(column <= high)
+    return query
+
+
+def filter_enemies(
+    query,
+    ranges: Dict[str, Tuple[Optional[int], Optional[int]]],
+    sort_by: EnemySortField = EnemySortField.enemy_id,
+    order: SortOrder = SortOrder.asc
+):
+    """
+    Apply inclusive stat range filters and sorting to an Enemy query.
+
+    Every stat leads one of the composite idx_enemy_<stat>_stats indexes and
+    trails the others, so any combination of ranges is answered by an index
+    search with the remaining bounds checked inside the index.
+    """
+    query = filter_stat_ranges(query, ranges)
+
+    sort_column = getattr(Enemy, sort_by.value)
+    if sort_by == EnemySortField.enemy_id and any(
+        bound is not None for bounds in ranges.values() for bound in bounds
+    ):
+        # Under a LIMIT SQLite prefers walking the table in rowid order to
+        # avoid a sort, even when a range would discard most rows. "+ 0"
+        # hides the rowid ordering so the range index is searched instead.
+        sort_column = Enemy.enemy_id + 0
+    if order == SortOrder.desc:
+        return query.order_by(sort_column.desc(), Enemy.enemy_id.desc())
+    return query.order_by(sort_column, Enemy.enemy_id)
+
+
+def stat_ranges(
+    min_hp: Optional[int] = Query(None, description="Minimum HP filter"),
+    max_hp: Optional[int] = Query(None, description="Maximum HP filter"),
+    min_attack: Optional[int] = Query(None, description="Minimum attack filter"),
+    max_attack: Optional[int] = Query(None, description="Maximum attack filter"),
+    min_defense: Optional[int] = Query(None, description="Minimum defense filter"),
+    max_defense: Optional[int] = Query(None, description="Maximum defense filter"),
+    min_card_score: Optional[int] = Query(None, description="Minimum card score filter"),
+    max_card_score: Optional[int] = Query(None, description="Maximum card score filter"),
+) -> Dict[str, Tuple[Optional[int], Optional[int]]]:
+    """Inclusive (min, max) bounds per stat from the query string."""
+    return {
+        "hp": (min_hp, max_hp),
+        "attack": (min_attack, max_attack),
+        "defense": (min_defense, max_defense),
+        "card_score": (min_card_score, max_card_score),
+    }
+
+
 @router.get("/", response_model=List[EnemyResponse])
 def get_enemies(
+    response: Response,
     skip: int = 0,
     limit: int = None,
-    min_hp: Optional[int] = Query(None, description="Minimum HP filter"),
-    max_hp: Optional[int] = Query(None, description="Maximum HP filter"),
+    ranges: Dict[str, Tuple[Optional[int], Optional[int]]] = Depends(stat_ranges),
+    sort_by: EnemySortField = Query(EnemySortField.enemy_id, description="Sort column"),
+    order: SortOrder = Query(SortOrder.asc, description="Sort direction"),
+    modified_since: Optional[datetime] = Query(None, description="Only rows created or updated at or after this time (UTC)"),
+    if_modified_since: Optional[str] = Header(None),
+    if_none_match: Optional[str] = Header(None),
     db: Session = Depends(get_db)
 ):
-    """Get all enemies with optional HP filtering. Use skip/limit for pagination (optional)."""
-    query = db.query(Enemy)
-    
-    if min_hp is not None:
-        query = query.filter(Enemy.hp >= min_hp)
-    if max_hp is not None:
-        query = query.filter(Enemy.hp <= max_hp)
+    """Get all enemies with optional stat range filtering and sorting. Use skip/limit for pagination (optional)."""
+    unchanged = list_not_modified(response, table_state(db, Enemy), if_modified_since, if_none_match)
+    if unchanged is not None:
+        return unchanged
+
+    if modified_since is None and enemy_index.ENABLED and enemy_index.index.usable(db):
+        # Rows come from the in-memory stats index instead of the enemies table
+        index = enemy_index.index.state(db)
+        enemies = index.select(ranges, sort_by.value, order == SortOrder.desc, skip, limit)
+        return list_response(enemies, EnemyResponse, response)
+
+    query = filter_enemies(modified_since_filter(db.query(Enemy), Enemy, modified_since), ranges, sort_by, order)
     
     query = query.offset(skip)
     if limit is not None:
         query = query.limit(limit)
     enemies = query.all()
-    return enemies
+    return list_response(enemies, EnemyResponse, response)
+
+
+@router.get("/summary")
+def get_enemy_summary(
+    ranges: Dict[str, Tuple[Optional[int], Optional[int]]] = Depends(stat_ranges),
+    db: Session = Depends(get_db)
+):
+    """Count of the enemies within the stat ranges, with the sum and mean of each stat."""
+    if enemy_index.ENABLED:
+        return enemy_index.index.state(db).summary(ranges)
+
+    columns = [getattr(Enemy, stat) for stat in enemy_index.STATS]
+    count, *totals = filter_stat_ranges(
+        db.query(func.count(Enemy.enemy_id), *(func.coalesce(func.sum(column), 0) for column in columns)),
+        ranges
+    ).one()
+    sums = dict(zip(enemy_index.STATS, totals))
+    return {
+        "count": count,
+        "sum": sums,
+        "mean": {stat: total / count if count else None for stat, total in sums.items()},
+    }
 
 
 @router.get("/{enemy_id}", response_model=EnemyResponse)
-def get_enemy(enemy_id: int, db: Session = Depends(get_db)):
+def get_enemy(
+    enemy_id: int,
+    response: Response,
+    if_modified_since: Optional[str] = Header(None),
+    db: Session = Depends(get_db)
+):
     """Get a specific enemy by ID."""
-    enemy = db.query(Enemy).filter(Enemy.enemy_id == enemy_id).first()
-    if not enemy:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail=f"Enemy with id {enemy_id} not found"
-        )
+    enemy = get_or_404(db, Enemy, enemy_id, "Enemy")
+    set_etag(response, enemy)
+    unchanged = not_modified(response, enemy.updated_at, if_modified_since)
+    if unchanged is not None:
+        return unchanged
     return enemy
 
 
 @router.get("/{enemy_id}/character")
 def get_enemy_character(enemy_id: int, db: Session = Depends(get_db)):
     """Get the character info for a specific enemy."""
-    enemy = db.query(Enemy).filter(Enemy.enemy_id == enemy_id).first()
-    if not enemy:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail=f"Enemy with id {enemy_id} not found"
-        )
+    enemy = get_or_404(db, Enemy, enemy_id, "Enemy")
     
-    character = db.query(Character).filter(Character.character_id == enemy.character_id).first()
+    character = db.get(Character, enemy.character_id)
     return character
 
 
@@ -63,12 +175,7 @@ def get_enemy_character(enemy_id: int, db: Session = Depends(get_db)):
 def create_enemy(enemy: EnemyCreate, db: Session = Depends(get_db)):
     """Create a new enemy."""
     # Check if character exists
-    character = db.query(Character).filter(Character.character_id == enemy.character_id).first()
-    if not character:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail=f"Character with id {enemy.character_id} not found"
-        )
+    character = get_or_404(db, Character, enemy.character_id, "Character")
     
     db_enemy = Enemy(**enemy.model_dump())
     db.add(db_enemy)
@@ -81,15 +188,12 @@ def create_enemy(enemy: EnemyCreate, db: Session = Depends(get_db)):
 def update_enemy(
     enemy_id: int,
     enemy_update: EnemyUpdate,
+    response: Response,
+    if_match: Optional[str] = Header(None),
     db: Session = Depends(get_db)
 ):
     """Update an enemy's stats."""
-    db_enemy = db.query(Enemy).filter(Enemy.enemy_id == enemy_id).first()
-    if not db_enemy:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail=f"Enemy with id {enemy_id} not found"
-        )
+    db_enemy = get_or_404(db, Enemy, enemy_id, "Enemy", if_match=if_match)
     
     # Update only provided fields
     update_data = enemy_update.model_dump(exclude_unset=True)
@@ -98,18 +202,18 @@ def update_enemy(
     
     db.commit()
     db.refresh(db_enemy)
+    set_etag(response, db_enemy)
     return db_enemy
 
 
 @router.delete("/{enemy_id}", status_code=status.HTTP_204_NO_CONTENT)
-def delete_enemy(enemy_id: int, db: Session = Depends(get_db)):
+def delete_enemy(
+    enemy_id: int,
+    if_match: Optional[str] = Header(None),
+    db: Session = Depends(get_db)
+):
     """Delete an enemy."""
-    db_enemy = db.query(Enemy).filter(Enemy.enemy_id == enemy_id).first()
-    if not db_enemy:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail=f"Enemy with id {enemy_id} not found"
-        )
+    db_enemy = get_or_404(db, Enemy, enemy_id, "Enemy", if_match=if_match)
     
     db.delete(db_enemy)
     db.commit()
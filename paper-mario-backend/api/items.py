@@ -1,9 +1,15 @@
 """Item endpoints."""
-from fastapi import APIRouter, Depends, HTTPException, status, Query
+from fastapi import APIRouter, Depends, HTTPException, Header, Response, status, Query
 from sqlalchemy.orm import Session
 from typing import List, Optional
+from datetime import datetime
 
+import reference_cache
+from concurrency import set_etag
 from config import get_db
+from fast_json import list_response
+from last_modified import list_not_modified, modified_since_filter, not_modified, table_state
+from lookups import get_or_404
 from models import Item
 from schemas.items import ItemCreate, ItemResponse, ItemUpdate
 
@@ -12,13 +18,21 @@ router = APIRouter(prefix="/items", tags=["Items"])
 
 @router.get("/", response_model=List[ItemResponse])
 def get_items(
+    response: Response,
     skip: int = 0,
     limit: int = None,
     key_items_only: Optional[bool] = Query(None, description="Filter for key items only"),
+    modified_since: Optional[datetime] = Query(None, description="Only rows created or updated at or after this time (UTC)"),
+    if_modified_since: Optional[str] = Header(None),
+    if_none_match: Optional[str] = Header(None),
     db: Session = Depends(get_db)
 ):
     """Get all items with optional key item filtering. Use skip/limit for pagination (optional)."""
-    query = db.query(Item)
+    unchanged = list_not_modified(response, table_state(db, Item), if_modified_since, if_none_match)
+    if unchanged is not None:
+        return unchanged
+
+    query = modified_since_filter(db.query(Item), Item, modified_since)
     
     if key_items_only is not None:
         query = query.filter(Item.is_key_item == key_items_only)
@@ -27,18 +41,22 @@ def get_items(
     if limit is not None:
         query = query.limit(limit)
     items = query.all()
-    return items
+    return list_response(items, ItemResponse, response)
 
 
 @router.get("/{item_id}", response_model=ItemResponse)
-def get_item(item_id: int, db: Session = Depends(get_db)):
+def get_item(
+    item_id: int,
+    response: Response,
+    if_modified_since: Optional[str] = Header(None),
+    db: Session = Depends(get_db)
+):
     """Get a specific item by ID."""
-    item = db.query(Item).filter(Item.item_id == item_id).first()
-    if not item:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail=f"Item with id {item_id} not found"
-        )
+    item = reference_cache.items.get_or_404(db, item_id)
+    set_etag(response, item)
+    unchanged = not_modified(response, item.updated_at, if_modified_since)
+    if unchanged is not None:
+        return unchanged
     return item
 
 
@@ -46,7 +64,7 @@ def get_item(item_id: int, db: Session = Depends(get_db)):
 def create_item(item: ItemCreate, db: Session = Depends(get_db)):
     """Create a new item."""
     # Check if item name already exists
-    existing = db.query(Item).filter(Item.name == item.name).first()
+    existing = reference_cache.items.get_by_name(db, item.name)
     if existing:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
@@ -64,15 +82,12 @@ def create_item(item: ItemCreate, db: Session = Depends(get_db)):
 def update_item(
     item_id: int,
     item_update: ItemUpdate,
+    response: Response,
+    if_match: Optional[str] = Header(None),
     db: Session = Depends(get_db)
 ):
     """Update an item."""
-    db_item = db.query(Item).filter(Item.item_id == item_id).first()
-    if not db_item:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail=f"Item with id {item_id} not found"
-        )
+    db_item = get_or_404(db, Item, item_id, "Item", if_match=if_match)
     
     # Update only provided fields
     update_data = item_update.model_dump(exclude_unset=True)
@@ -81,18 +96,18 @@ def update_item(
     
     db.commit()
     db.refresh(db_item)
+    set_etag(response, db_item)
     return db_item
 
 
 @router.delete("/{item_id}", status_code=status.HTTP_204_NO_CONTENT)
-def delete_item(item_id: int, db: Session = Depends(get_db)):
+def delete_item(
+    item_id: int,
+    if_match: Optional[str] = Header(None),
+    db: Session = Depends(get_db)
+):
     """Delete an item."""
-    db_item = db.query(Item).filter(Item.item_id == item_id).first()
-    if not db_item:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail=f"Item with id {item_id} not found"
-        )
+    db_item = get_or_404(db, Item, item_id, "Item", if_match=if_match)
     
     db.delete(db_item)
     db.commit()
@@ -0,0 +1,74 @@
+"""API endpoint for live change subscriptions (Server-Sent Events)."""
+from typing import Optional
+
+from fastapi import APIRouter, Header, HTTPException, Query, status
+from fastapi.responses import StreamingResponse
+from starlette.concurrency import run_in_threadpool
+
+import live_updates
+from api.changes import TRACKED_TABLES
+from live_updates import OverflowPolicy, Subscriber
+
+router = APIRouter(prefix="/live", tags=["Live Updates"])
+
+
+@router.get(
+    "/changes",
+    response_class=StreamingResponse,
+    responses={200: {"content": {"text/event-stream": {}}, "description": "Server-Sent Events stream"}}
+)
+async def stream_changes(
+    table: Optional[str] = Query(None, description="Only changes to this table"),
+    id: Optional[int] = Query(None, description="Only changes to the row with this primary key"),
+    location_id: Optional[int] = Query(None, description="Only rows in this location"),
+    chapter_id: Optional[int] = Query(None, description="Only rows in this chapter"),
+    character_id: Optional[int] = Query(None, description="Only rows of this character"),
+    since: Optional[int] = Query(None, ge=0, description="Replay changes after this sequence number first"),
+    on_overflow: OverflowPolicy = Query(OverflowPolicy.disconnect, description="When this client falls behind"),
+    last_event_id: Optional[str] = Header(None)
+):
+    """
+    Stream matching row changes as Server-Sent Events (`event: change`, `id: <seq>`).
+
+    Each event's data is a `/changes` entry. A reconnecting EventSource sends
+    `Last-Event-ID` and first receives everything it missed. Streams end with
+    `event: overflow` if the client falls more than LIVE_QUEUE_SIZE events behind
+    (reconnect to resume) unless `on_overflow=drop_oldest`.
+    """
+    if table is not None and table not in TRACKED_TABLES:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Unknown table '{table}'; expected one of {', '.join(TRACKED_TABLES)}"
+        )
+    if last_event_id is not None and last_event_id.isdigit():
+        since = int(last_event_id)
+
+    refs = {
+        name: value
+        for name, value in (("location_id", location_id), ("chapter_id", chapter_id), ("character_id", character_id))
+        if value is not None
+    }
+    subscriber = Subscriber(table, id, refs, on_overflow)
+    # Subscribe before replaying so nothing committed in between is missed
+    if not live_updates.hub.subscribe(subscriber):
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Too many live subscribers; poll /changes instead",
+            headers={"Retry-After": "30"}
+        )
+
+    replay = None
+    if since is not None:
+        replay = await run_in_threadpool(live_updates.replay_page, since)
+        if replay is None:
+            live_updates.hub.unsubscribe(subscriber)
+            raise HTTPException(
+                status_code=status.HTTP_410_GONE,
+                detail=f"Changes after {since} were compacted; download the tables again"
+            )
+
+    return StreamingResponse(
+        live_updates.stream(subscriber, since, replay),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
@@ -1,9 +1,14 @@
 """Location endpoints."""
-from fastapi import APIRouter, Depends, HTTPException, status, Query
+from fastapi import APIRouter, Depends, Header, Response, status, Query
 from sqlalchemy.orm import Session
 from typing import List, Optional
+from datetime import datetime
 
+from concurrency import set_etag
 from config import get_db
+from fast_json import list_response
+from last_modified import list_not_modified, modified_since_filter, not_modified, table_state
+from lookups import get_or_404
 from models import Location
 from models.locations import LocationType
 from schemas.locations import LocationCreate, LocationResponse, LocationUpdate
@@ -13,14 +18,22 @@ router = APIRouter(prefix="/locations", tags=["Locations"])
 
 @router.get("/", response_model=List[LocationResponse])
 def get_locations(
+    response: Response,
     skip: int = 0,
     limit: int = None,
     location_type: Optional[LocationType] = Query(None, description="Filter by location type"),
     chapter_id: Optional[int] = Query(None, description="Filter by chapter"),
+    modified_since: Optional[datetime] = Query(None, description="Only rows created or updated at or after this time (UTC)"),
+    if_modified_since: Optional[str] = Header(None),
+    if_none_match: Optional[str] = Header(None),
     db: Session = Depends(get_db)
 ):
     """Get all locations with optional filtering. Use skip/limit for pagination (optional)."""
-    query = db.query(Location)
+    unchanged = list_not_modified(response, table_state(db, Location), if_modified_since, if_none_match)
+    if unchanged is not None:
+        return unchanged
+
+    query = modified_since_filter(db.query(Location), Location, modified_since)
     
     if location_type:
         query = query.filter(Location.type == location_type)
@@ -31,18 +44,22 @@ def get_locations(
     if limit is not None:
         query = query.limit(limit)
     locations = query.all()
-    return locations
+    return list_response(locations, LocationResponse, response)
 
 
 @router.get("/{location_id}", response_model=LocationResponse)
-def get_location(location_id: int, db: Session = Depends(get_db)):
+def get_location(
+    location_id: int,
+    response: Response,
+    if_modified_since: Optional[str] = Header(None),
+    db: Session = Depends(get_db)
+):
     """Get a specific location by ID."""
-    location = db.query(Location).filter(Location.location_id == location_id).first()
-    if not location:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail=f"Location with id {location_id} not found"
-        )
+    location = get_or_404(db, Location, location_id, "Location")
+    set_etag(response, location)
+    unchanged = not_modified(response, location.updated_at, if_modified_since)
+    if unchanged is not None:
+        return unchanged
     return location
 
 
@@ -60,15 +77,12 @@ def create_location(location: LocationCreate, db: Session = Depends(get_db)):
 def update_location(
     location_id: int,
     location_update: LocationUpdate,
+    response: Response,
+    if_match: Optional[str] = Header(None),
     db: Session = Depends(get_db)
 ):
     """Update a location."""
-    db_location = db.query(Location).filter(Location.location_id == location_id).first()
-    if not db_location:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail=f"Location with id {location_id} not found"
-        )
+    db_location = get_or_404(db, Location, location_id, "Location", if_match=if_match)
     
     update_data = location_update.model_dump(exclude_unset=True)
     for field, value in update_data.items():
@@ -76,18 +90,18 @@ def update_location(
     
     db.commit()
     db.refresh(db_location)
+    set_etag(response, db_location)
     return db_location
 
 
 @router.delete("/{location_id}", status_code=status.HTTP_204_NO_CONTENT)
-def delete_location(location_id: int, db: Session = Depends(get_db)):
+def delete_location(
+    location_id: int,
+    if_match: Optional[str] = Header(None),
+    db: Session = Depends(get_db)
+):
     """Delete a location."""
-    db_location = db.query(Location).filter(Location.location_id == location_id).first()
-    if not db_location:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail=f"Location with id {location_id} not found"
-        )
+    db_location = get_or_404(db, Location, location_id, "Location", if_match=if_match)
     
     db.delete(db_location)
     db.commit()
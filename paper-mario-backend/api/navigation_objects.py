@@ -1,9 +1,14 @@
 """Navigation Object endpoints."""
-from fastapi import APIRouter, Depends, HTTPException, status, Query
+from fastapi import APIRouter, Depends, Header, Response, status, Query
 from sqlalchemy.orm import Session
 from typing import List, Optional
+from datetime import datetime
 
+from concurrency import set_etag
 from config import get_db
+from fast_json import list_response
+from last_modified import list_not_modified, modified_since_filter, not_modified, table_state
+from lookups import get_or_404
 from models import NavigationObject
 from models.navigation_objects import NavigationType
 from schemas.navigation_objects import NavigationObjectCreate, NavigationObjectResponse, NavigationObjectUpdate
@@ -13,14 +18,22 @@ router = APIRouter(prefix="/navigation-objects", tags=["Navigation Objects"])
 
 @router.get("/", response_model=List[NavigationObjectResponse])
 def get_navigation_objects(
+    response: Response,
     skip: int = 0,
     limit: int = None,
     location_id: Optional[int] = Query(None, description="Filter by location"),
     nav_type: Optional[NavigationType] = Query(None, description="Filter by navigation type"),
+    modified_since: Optional[datetime] = Query(None, description="Only rows created or updated at or after this time (UTC)"),
+    if_modified_since: Optional[str] = Header(None),
+    if_none_match: Optional[str] = Header(None),
     db: Session = Depends(get_db)
 ):
     """Get all navigation objects with optional filtering. Use skip/limit for pagination (optional)."""
-    query = db.query(NavigationObject)
+    unchanged = list_not_modified(response, table_state(db, NavigationObject), if_modified_since, if_none_match)
+    if unchanged is not None:
+        return unchanged
+
+    query = modified_since_filter(db.query(NavigationObject), NavigationObject, modified_since)
     
     if location_id:
         query = query.filter(NavigationObject.location_id == location_id)
@@ -31,18 +44,22 @@ def get_navigation_objects(
     if limit is not None:
         query = query.limit(limit)
     nav_objects = query.all()
-    return nav_objects
+    return list_response(nav_objects, NavigationObjectResponse, response)
 
 
 @router.get("/{navobj_id}", response_model=NavigationObjectResponse)
-def get_navigation_object(navobj_id: int, db: Session = Depends(get_db)):
+def get_navigation_object(
+    navobj_id: int,
+    response: Response,
+    if_modified_since: Optional[str] = Header(None),
+    db: Session = Depends(get_db)
+):
     """Get a specific navigation object by ID."""
-    nav_obj = db.query(NavigationObject).filter(NavigationObject.navobj_id == navobj_id).first()
-    if not nav_obj:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail=f"Navigation object with id {navobj_id} not found"
-        )
+    nav_obj = get_or_404(db, NavigationObject, navobj_id, "Navigation object")
+    set_etag(response, nav_obj)
+    unchanged = not_modified(response, nav_obj.updated_at, if_modified_since)
+    if unchanged is not None:
+        return unchanged
     return nav_obj
 
 
@@ -60,15 +77,12 @@ def create_navigation_object(nav_obj: NavigationObjectCreate, db: Session = Depe
 def update_navigation_object(
     navobj_id: int,
     nav_obj_update: NavigationObjectUpdate,
+    response: Response,
+    if_match: Optional[str] = Header(None),
     db: Session = Depends(get_db)
 ):
     """Update a navigation object."""
-    db_nav_obj = db.query(NavigationObject).filter(NavigationObject.navobj_id == navobj_id).first()
-    if not db_nav_obj:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail=f"Navigation object with id {navobj_id} not found"
-        )
+    db_nav_obj = get_or_404(db, NavigationObject, navobj_id, "Navigation object", if_match=if_match)
     
     update_data = nav_obj_update.model_dump(exclude_unset=True)
     for field, value in update_data.items():
@@ -76,18 +90,18 @@ def update_navigation_object(
     
     db.commit()
     db.refresh(db_nav_obj)
+    set_etag(response, db_nav_obj)
     return db_nav_obj
 
 
 @router.delete("/{navobj_id}", status_code=status.HTTP_204_NO_CONTENT)
-def delete_navigation_object(navobj_id: int, db: Session = Depends(get_db)):
+def delete_navigation_object(
+    navobj_id: int,
+    if_match: Optional[str] = Header(None),
+    db: Session = Depends(get_db)
+):
     """Delete a navigation object."""
-    db_nav_obj = db.query(NavigationObject).filter(NavigationObject.navobj_id == navobj_id).first()
-    if not db_nav_obj:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail=f"Navigation object with id {navobj_id} not found"
-        )
+    db_nav_obj = get_or_404(db, NavigationObject, navobj_id, "Navigation object", if_match=if_match)
     
     db.delete(db_nav_obj)
     db.commit()
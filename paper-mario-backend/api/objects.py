@@ -1,9 +1,14 @@
 """Object endpoints."""
-from fastapi import APIRouter, Depends, HTTPException, status, Query
+from fastapi import APIRouter, Depends, Header, Response, status, Query
 from sqlalchemy.orm import Session
 from typing import List, Optional
+from datetime import datetime
 
+from concurrency import set_etag
 from config import get_db
+from fast_json import list_response
+from last_modified import list_not_modified, modified_since_filter, not_modified, table_state
+from lookups import get_or_404
 from models import Object
 from schemas.objects import ObjectCreate, ObjectResponse, ObjectUpdate
 
@@ -12,14 +17,22 @@ router = APIRouter(prefix="/objects", tags=["Objects"])
 
 @router.get("/", response_model=List[ObjectResponse])
 def get_objects(
+    response: Response,
     skip: int = 0,
     limit: int = None,
     location_id: Optional[int] = Query(None, description="Filter by location"),
     object_type: Optional[str] = Query(None, description="Filter by object type"),
+    modified_since: Optional[datetime] = Query(None, description="Only rows created or updated at or after this time (UTC)"),
+    if_modified_since: Optional[str] = Header(None),
+    if_none_match: Optional[str] = Header(None),
     db: Session = Depends(get_db)
 ):
     """Get all objects with optional filtering. Use skip/limit for pagination (optional)."""
-    query = db.query(Object)
+    unchanged = list_not_modified(response, table_state(db, Object), if_modified_since, if_none_match)
+    if unchanged is not None:
+        return unchanged
+
+    query = modified_since_filter(db.query(Object), Object, modified_since)
     
     if location_id:
         query = query.filter(Object.location_id == location_id)
@@ -30,18 +43,22 @@ def get_objects(
     if limit is not None:
         query = query.limit(limit)
     objects = query.all()
-    return objects
+    return list_response(objects, ObjectResponse, response)
 
 
 @router.get("/{object_id}", response_model=ObjectResponse)
-def get_object(object_id: int, db: Session = Depends(get_db)):
+def get_object(
+    object_id: int,
+    response: Response,
+    if_modified_since: Optional[str] = Header(None),
+    db: Session = Depends(get_db)
+):
     """Get a specific object by ID."""
-    obj = db.query(Object).filter(Object.object_id == object_id).first()
-    if not obj:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail=f"Object with id {object_id} not found"
-        )
+    obj = get_or_404(db, Object, object_id, "Object")
+    set_etag(response, obj)
+    unchanged = not_modified(response, obj.updated_at, if_modified_since)
+    if unchanged is not None:
+        return unchanged
     return obj
 
 
@@ -59,15 +76,12 @@ def create_object(obj: ObjectCreate, db: Session = Depends(get_db)):
 def update_object(
     object_id: int,
     object_update: ObjectUpdate,
+    response: Response,
+    if_match: Optional[str] = Header(None),
     db: Session = Depends(get_db)
 ):
     """Update an object."""
-    db_object = db.query(Object).filter(Object.object_id == object_id).first()
-    if not db_object:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail=f"Object with id {object_id} not found"
-        )
+    db_object = get_or_404(db, Object, object_id, "Object", if_match=if_match)
     
     update_data = object_update.model_dump(exclude_unset=True)
     for field, value in update_data.items():
@@ -75,18 +89,18 @@ def update_object(
     
     db.commit()
     db.refresh(db_object)
+    set_etag(response, db_object)
     return db_object
 
 
 @router.delete("/{object_id}", status_code=status.HTTP_204_NO_CONTENT)
-def delete_object(object_id: int, db: Session = Depends(get_db)):
+def delete_object(
+    object_id: int,
+    if_match: Optional[str] = Header(None),
+    db: Session = Depends(get_db)
+):
     """Delete an object."""
-    db_object = db.query(Object).filter(Object.object_id == object_id).first()
-    if not db_object:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail=f"Object with id {object_id} not found"
-        )
+    db_object = get_or_404(db, Object, object_id, "Object", if_match=if_match)
     
     db.delete(db_object)
     db.commit()
@@ -1,9 +1,14 @@
 """Obstacle endpoints."""
-from fastapi import APIRouter, Depends, HTTPException, status, Query
+from fastapi import APIRouter, Depends, Header, Response, status, Query
 from sqlalchemy.orm import Session
 from typing import List, Optional
+from datetime import datetime
 
+from concurrency import set_etag
 from config import get_db
+from fast_json import list_response
+from last_modified import list_not_modified, modified_since_filter, not_modified, table_state
+from lookups import get_or_404
 from models import Obstacle
 from schemas.obstacles import ObstacleCreate, ObstacleResponse, ObstacleUpdate
 
@@ -12,14 +17,22 @@ router = APIRouter(prefix="/obstacles", tags=["Obstacles"])
 
 @router.get("/", response_model=List[ObstacleResponse])
 def get_obstacles(
+    response: Response,
     skip: int = 0,
     limit: int = None,
     location_id: Optional[int] = Query(None, description="Filter by location"),
     obstacle_type: Optional[str] = Query(None, description="Filter by obstacle type"),
+    modified_since: Optional[datetime] = Query(None, description="Only rows created or updated at or after this time (UTC)"),
+    if_modified_since: Optional[str] = Header(None),
+    if_none_match: Optional[str] = Header(None),
     db: Session = Depends(get_db)
 ):
     """Get all obstacles with optional filtering. Use skip/limit for pagination (optional)."""
-    query = db.query(Obstacle)
+    unchanged = list_not_modified(response, table_state(db, Obstacle), if_modified_since, if_none_match)
+    if unchanged is not None:
+        return unchanged
+
+    query = modified_since_filter(db.query(Obstacle), Obstacle, modified_since)
     
     if location_id:
         query = query.filter(Obstacle.location_id == location_id)
@@ -30,18 +43,22 @@ def get_obstacles(
     if limit is not None:
         query = query.limit(limit)
     obstacles = query.all()
-    return obstacles
+    return list_response(obstacles, ObstacleResponse, response)
 
 
 @router.get("/{obstacle_id}", response_model=ObstacleResponse)
-def get_obstacle(obstacle_id: int, db: Session = Depends(get_db)):
+def get_obstacle(
+    obstacle_id: int,
+    response: Response,
+    if_modified_since: Optional[str] = Header(None),
+    db: Session = Depends(get_db)
+):
     """Get a specific obstacle by ID."""
-    obstacle = db.query(Obstacle).filter(Obstacle.obstacle_id == obstacle_id).first()
-    if not obstacle:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail=f"Obstacle with id {obstacle_id} not found"
-        )
+    obstacle = get_or_404(db, Obstacle, obstacle_id, "Obstacle")
+    set_etag(response, obstacle)
+    unchanged = not_modified(response, obstacle.updated_at, if_modified_since)
+    if unchanged is not None:
+        return unchanged
     return obstacle
 
 
@@ -59,15 +76,12 @@ def create_obstacle(obstacle: ObstacleCreate, db: Session = Depends(get_db)):
 def update_obstacle(
     obstacle_id: int,
     obstacle_update: ObstacleUpdate,
+    response: Response,
+    if_match: Optional[str] = Header(None),
     db: Session = Depends(get_db)
 ):
     """Update an obstacle."""
-    db_obstacle = db.query(Obstacle).filter(Obstacle.obstacle_id == obstacle_id).first()
-    if not db_obstacle:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail=f"Obstacle with id {obstacle_id} not found"
-        )
+    db_obstacle = get_or_404(db, Obstacle, obstacle_id, "Obstacle", if_match=if_match)
     
     update_data = obstacle_update.model_dump(exclude_unset=True)
     for field, value in update_data.items():
@@ -75,18 +89,18 @@ def update_obstacle(
     
     db.commit()
     db.refresh(db_obstacle)
+    set_etag(response, db_obstacle)
     return db_obstacle
 
 
 @router.delete("/{obstacle_id}", status_code=status.HTTP_204_NO_CONTENT)
-def delete_obstacle(obstacle_id: int, db: Session = Depends(get_db)):
+def delete_obstacle(
+    obstacle_id: int,
+    if_match: Optional[str] = Header(None),
+    db: Session = Depends(get_db)
+):
     """Delete an obstacle."""
-    db_obstacle = db.query(Obstacle).filter(Obstacle.obstacle_id == obstacle_id).first()
-    if not db_obstacle:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail=f"Obstacle with id {obstacle_id} not found"
-        )
+    db_obstacle = get_or_404(db, Obstacle, obstacle_id, "Obstacle", if_match=if_match)
     
     db.delete(db_obstacle)
     db.commit()
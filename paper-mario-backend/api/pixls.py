@@ -1,9 +1,15 @@
 """Pixl endpoints."""
-from fastapi import APIRouter, Depends, HTTPException, status, Query
+from fastapi import APIRouter, Depends, HTTPException, Header, Response, status, Query
 from sqlalchemy.orm import Session
 from typing import List, Optional
+from datetime import datetime
 
+import reference_cache
+from concurrency import set_etag
 from config import get_db
+from fast_json import list_response
+from last_modified import list_not_modified, modified_since_filter, not_modified, table_state
+from lookups import get_or_404
 from models import Pixl
 from schemas.pixls import PixlCreate, PixlResponse, PixlUpdate
 
@@ -12,13 +18,21 @@ router = APIRouter(prefix="/pixls", tags=["Pixls"])
 
 @router.get("/", response_model=List[PixlResponse])
 def get_pixls(
+    response: Response,
     skip: int = 0,
     limit: int = None,
     optional_only: Optional[bool] = Query(None, description="Filter for optional pixls"),
+    modified_since: Optional[datetime] = Query(None, description="Only rows created or updated at or after this time (UTC)"),
+    if_modified_since: Optional[str] = Header(None),
+    if_none_match: Optional[str] = Header(None),
     db: Session = Depends(get_db)
 ):
     """Get all pixls with optional filtering. Use skip/limit for pagination (optional)."""
-    query = db.query(Pixl)
+    unchanged = list_not_modified(response, table_state(db, Pixl), if_modified_since, if_none_match)
+    if unchanged is not None:
+        return unchanged
+
+    query = modified_since_filter(db.query(Pixl), Pixl, modified_since)
     
     if optional_only is not None:
         query = query.filter(Pixl.is_optional == optional_only)
@@ -27,18 +41,22 @@ def get_pixls(
     if limit is not None:
         query = query.limit(limit)
     pixls = query.all()
-    return pixls
+    return list_response(pixls, PixlResponse, response)
 
 
 @router.get("/{pixl_id}", response_model=PixlResponse)
-def get_pixl(pixl_id: int, db: Session = Depends(get_db)):
+def get_pixl(
+    pixl_id: int,
+    response: Response,
+    if_modified_since: Optional[str] = Header(None),
+    db: Session = Depends(get_db)
+):
     """Get a specific pixl by ID."""
-    pixl = db.query(Pixl).filter(Pixl.pixl_id == pixl_id).first()
-    if not pixl:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail=f"Pixl with id {pixl_id} not found"
-        )
+    pixl = reference_cache.pixls.get_or_404(db, pixl_id)
+    set_etag(response, pixl)
+    unchanged = not_modified(response, pixl.updated_at, if_modified_since)
+    if unchanged is not None:
+        return unchanged
     return pixl
 
 
@@ -46,7 +64,7 @@ def get_pixl(pixl_id: int, db: Session = Depends(get_db)):
 def create_pixl(pixl: PixlCreate, db: Session = Depends(get_db)):
     """Create a new pixl."""
     # Check if pixl name already exists
-    existing = db.query(Pixl).filter(Pixl.name == pixl.name).first()
+    existing = reference_cache.pixls.get_by_name(db, pixl.name)
     if existing:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
@@ -64,15 +82,12 @@ def create_pixl(pixl: PixlCreate, db: Session = Depends(get_db)):
 def update_pixl(
     pixl_id: int,
     pixl_update: PixlUpdate,
+    response: Response,
+    if_match: Optional[str] = Header(None),
     db: Session = Depends(get_db)
 ):
     """Update a pixl."""
-    db_pixl = db.query(Pixl).filter(Pixl.pixl_id == pixl_id).first()
-    if not db_pixl:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail=f"Pixl with id {pixl_id} not found"
-        )
+    db_pixl = get_or_404(db, Pixl, pixl_id, "Pixl", if_match=if_match)
     
     update_data = pixl_update.model_dump(exclude_unset=True)
     for field, value in update_data.items():
@@ -80,18 +95,18 @@ def update_pixl(
     
     db.commit()
     db.refresh(db_pixl)
+    set_etag(response, db_pixl)
     return db_pixl
 
 
 @router.delete("/{pixl_id}", status_code=status.HTTP_204_NO_CONTENT)
-def delete_pixl(pixl_id: int, db: Session = Depends(get_db)):
+def delete_pixl(
+    pixl_id: int,
+    if_match: Optional[str] = Header(None),
+    db: Session = Depends(get_db)
+):
     """Delete a pixl."""
-    db_pixl = db.query(Pixl).filter(Pixl.pixl_id == pixl_id).first()
-    if not db_pixl:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail=f"Pixl with id {pixl_id} not found"
-        )
+    db_pixl = get_or_404(db, Pixl, pixl_id, "Pixl", if_match=if_match)
     
     db.delete(db_pixl)
     db.commit()
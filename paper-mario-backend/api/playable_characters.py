@@ -1,9 +1,14 @@
 """Playable Character endpoints."""
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Header, Response, status, Query
 from sqlalchemy.orm import Session
-from typing import List
+from typing import List, Optional
+from datetime import datetime
 
+from concurrency import set_etag
 from config import get_db
+from fast_json import list_response
+from last_modified import list_not_modified, modified_since_filter, not_modified, table_state
+from lookups import get_or_404
 from models import PlayableCharacter, Character
 from schemas.playable_characters import PlayableCharacterCreate, PlayableCharacterResponse, PlayableCharacterUpdate
 
@@ -12,29 +17,39 @@ router = APIRouter(prefix="/playable-characters", tags=["Playable Characters"])
 
 @router.get("/", response_model=List[PlayableCharacterResponse])
 def get_playable_characters(
+    response: Response,
     skip: int = 0,
     limit: int = None,
+    modified_since: Optional[datetime] = Query(None, description="Only rows created or updated at or after this time (UTC)"),
+    if_modified_since: Optional[str] = Header(None),
+    if_none_match: Optional[str] = Header(None),
     db: Session = Depends(get_db)
 ):
     """Get all playable characters. Use skip/limit for pagination (optional)."""
-    query = db.query(PlayableCharacter).offset(skip)
+    unchanged = list_not_modified(response, table_state(db, PlayableCharacter), if_modified_since, if_none_match)
+    if unchanged is not None:
+        return unchanged
+
+    query = modified_since_filter(db.query(PlayableCharacter), PlayableCharacter, modified_since).offset(skip)
     if limit is not None:
         query = query.limit(limit)
     playable_chars = query.all()
-    return playable_chars
+    return list_response(playable_chars, PlayableCharacterResponse, response)
 
 
 @router.get("/{character_id}", response_model=PlayableCharacterResponse)
-def get_playable_character(character_id: int, db: Session = Depends(get_db)):
+def get_playable_character(
+    character_id: int,
+    response: Response,
+    if_modified_since: Optional[str] = Header(None),
+    db: Session = Depends(get_db)
+):
     """Get a specific playable character by ID."""
-    playable = db.query(PlayableCharacter).filter(
-        PlayableCharacter.character_id == character_id
-    ).first()
-    if not playable:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail=f"Playable character with id {character_id} not found"
-        )
+    playable = get_or_404(db, PlayableCharacter, character_id, "Playable character")
+    set_etag(response, playable)
+    unchanged = not_modified(response, playable.updated_at, if_modified_since)
+    if unchanged is not None:
+        return unchanged
     return playable
 
 
@@ -42,19 +57,10 @@ def get_playable_character(character_id: int, db: Session = Depends(get_db)):
 def create_playable_character(playable: PlayableCharacterCreate, db: Session = Depends(get_db)):
     """Create a new playable character."""
     # Check if character exists
-    character = db.query(Character).filter(
-        Character.character_id == playable.character_id
-    ).first()
-    if not character:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail=f"Character with id {playable.character_id} not found"
-        )
+    character = get_or_404(db, Character, playable.character_id, "Character")
     
     # Check if already exists as playable
-    existing = db.query(PlayableCharacter).filter(
-        PlayableCharacter.character_id == playable.character_id
-    ).first()
+    existing = db.get(PlayableCharacter, playable.character_id)
     if existing:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
@@ -72,17 +78,12 @@ def create_playable_character(playable: PlayableCharacterCreate, db: Session = D
 def update_playable_character(
     character_id: int,
     playable_update: PlayableCharacterUpdate,
+    response: Response,
+    if_match: Optional[str] = Header(None),
     db: Session = Depends(get_db)
 ):
     """Update a playable character."""
-    db_playable = db.query(PlayableCharacter).filter(
-        PlayableCharacter.character_id == character_id
-    ).first()
-    if not db_playable:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail=f"Playable character with id {character_id} not found"
-        )
+    db_playable = get_or_404(db, PlayableCharacter, character_id, "Playable character", if_match=if_match)
     
     update_data = playable_update.model_dump(exclude_unset=True)
     for field, value in update_data.items():
@@ -90,20 +91,18 @@ def update_playable_character(
     
     db.commit()
     db.refresh(db_playable)
+    set_etag(response, db_playable)
     return db_playable
 
 
 @router.delete("/{character_id}", status_code=status.HTTP_204_NO_CONTENT)
-def delete_playable_character(character_id: int, db: Session = Depends(get_db)):
+def delete_playable_character(
+    character_id: int,
+    if_match: Optional[str] = Header(None),
+    db: Session = Depends(get_db)
+):
     """Delete a playable character."""
-    db_playable = db.query(PlayableCharacter).filter(
-        PlayableCharacter.character_id == character_id
-    ).first()
-    if not db_playable:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail=f"Playable character with id {character_id} not found"
-        )
+    db_playable = get_or_404(db, PlayableCharacter, character_id, "Playable character", if_match=if_match)
     
     db.delete(db_playable)
     db.commit()
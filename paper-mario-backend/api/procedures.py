@@ -1,9 +1,14 @@
 """API endpoints for stored procedures."""
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, Header, HTTPException, Request, status
+from sqlalchemy.exc import SQLAlchemyError
 from sqlalchemy.orm import Session
 from pydantic import BaseModel, Field
 from typing import List, Optional
 
+import chapter_documents
+import group_commit
+import idempotency
+import replicas
 from config import get_db
 from stored_procedures import StoredProcedures
 
@@ -64,6 +69,7 @@ class TransferItemRequest(BaseModel):
 @router.post("/create-enemy")
 def create_enemy_with_character(
     request: CreateEnemyRequest,
+    idempotency_key: Optional[str] = Header(None),
     db: Session = Depends(get_db)
 ):
     """
@@ -72,6 +78,10 @@ def create_enemy_with_character(
     This ensures data consistency - if either the character or enemy creation fails,
     neither will be saved to the database.
     """
+    replayed = idempotency.begin(db, idempotency_key, "create-enemy", request)
+    if replayed is not None:
+        return replayed
+    
     result = StoredProcedures.create_enemy_with_character(
         db=db,
         name=request.name,
@@ -79,7 +89,8 @@ def create_enemy_with_character(
         hp=request.hp,
         attack=request.attack,
         defense=request.defense,
-        card_score=request.card_score
+        card_score=request.card_score,
+        commit=idempotency_key is None
     )
     
     if not result["success"]:
@@ -88,12 +99,14 @@ def create_enemy_with_character(
             detail=result.get("error", "Failed to create enemy")
         )
     
+    idempotency.complete(db, idempotency_key, "create-enemy", request, result)
     return result
 
 
 @router.post("/create-boss")
 def create_boss_with_character(
     request: CreateBossRequest,
+    idempotency_key: Optional[str] = Header(None),
     db: Session = Depends(get_db)
 ):
     """
@@ -101,13 +114,18 @@ def create_boss_with_character(
     
     Validates chapter existence and creates both character and boss records atomically.
     """
+    replayed = idempotency.begin(db, idempotency_key, "create-boss", request)
+    if replayed is not None:
+        return replayed
+    
     result = StoredProcedures.create_boss_with_character(
         db=db,
         name=request.name,
         description=request.description,
         chapter_id=request.chapter_id,
         phase_count=request.phase_count,
-        special_mechanics=request.special_mechanics
+        special_mechanics=request.special_mechanics,
+        commit=idempotency_key is None
     )
     
     if not result["success"]:
@@ -116,12 +134,14 @@ def create_boss_with_character(
             detail=result.get("error", "Failed to create boss")
         )
     
+    idempotency.complete(db, idempotency_key, "create-boss", request, result)
     return result
 
 
 @router.post("/create-quest")
 def create_side_quest_with_characters(
     request: CreateQuestRequest,
+    idempotency_key: Optional[str] = Header(None),
     db: Session = Depends(get_db)
 ):
     """
@@ -129,6 +149,10 @@ def create_side_quest_with_characters(
     
     Creates the quest and assigns giver, target, and helper characters atomically.
     """
+    replayed = idempotency.begin(db, idempotency_key, "create-quest", request)
+    if replayed is not None:
+        return replayed
+    
     result = StoredProcedures.create_side_quest_with_characters(
         db=db,
         quest_name=request.quest_name,
@@ -137,7 +161,8 @@ def create_side_quest_with_characters(
         reward_item_id=request.reward_item_id,
         quest_giver_id=request.quest_giver_id,
         quest_target_id=request.quest_target_id,
-        quest_helper_ids=request.quest_helper_ids
+        quest_helper_ids=request.quest_helper_ids,
+        commit=idempotency_key is None
     )
     
     if not result["success"]:
@@ -146,25 +171,45 @@ def create_side_quest_with_characters(
             detail=result.get("error", "Failed to create quest")
         )
     
+    idempotency.complete(db, idempotency_key, "create-quest", request, result)
     return result
 
 
 @router.post("/apply-status-effect")
 def apply_status_effect(
     request: ApplyStatusEffectRequest,
+    idempotency_key: Optional[str] = Header(None),
     db: Session = Depends(get_db)
 ):
     """
     Stored Procedure: Apply a status effect to a character.
     
     Handles checking if effect is already applied and updates or creates accordingly.
+    With GROUP_COMMIT=1, requests without an Idempotency-Key are committed in
+    batches with other concurrent applications.
     """
-    result = StoredProcedures.apply_status_effect_to_character(
-        db=db,
-        character_id=request.character_id,
-        status_id=request.status_id,
-        duration_seconds=request.duration_seconds
-    )
+    if idempotency_key is None and group_commit.writer.running:
+        # Committed together with concurrent requests' writes (GROUP_COMMIT=1);
+        # keyed requests keep their own transaction, which also stores the key
+        try:
+            result = group_commit.writer.run(lambda writer_db: StoredProcedures.stage_status_effect(
+                writer_db, request.character_id, request.status_id, request.duration_seconds
+            ))
+            replicas.note_write(db)
+        except SQLAlchemyError as e:
+            result = {"success": False, "error": str(e)}
+    else:
+        replayed = idempotency.begin(db, idempotency_key, "apply-status-effect", request)
+        if replayed is not None:
+            return replayed
+        
+        result = StoredProcedures.apply_status_effect_to_character(
+            db=db,
+            character_id=request.character_id,
+            status_id=request.status_id,
+            duration_seconds=request.duration_seconds,
+            commit=idempotency_key is None
+        )
     
     if not result["success"]:
         raise HTTPException(
@@ -172,12 +217,14 @@ def apply_status_effect(
             detail=result.get("error", "Failed to apply status effect")
         )
     
+    idempotency.complete(db, idempotency_key, "apply-status-effect", request, result)
     return result
 
 
 @router.post("/populate-location")
 def populate_location_with_blocks(
     request: PopulateLocationRequest,
+    idempotency_key: Optional[str] = Header(None),
     db: Session = Depends(get_db)
 ):
     """
@@ -185,12 +232,17 @@ def populate_location_with_blocks(
     
     Creates all blocks in a single transaction - all succeed or all fail.
     """
+    replayed = idempotency.begin(db, idempotency_key, "populate-location", request)
+    if replayed is not None:
+        return replayed
+    
     block_configs = [block.dict() for block in request.blocks]
     
     result = StoredProcedures.populate_location_with_blocks(
         db=db,
         location_id=request.location_id,
-        block_configs=block_configs
+        block_configs=block_configs,
+        commit=idempotency_key is None
     )
     
     if not result["success"]:
@@ -199,30 +251,33 @@ def populate_location_with_blocks(
             detail=result.get("error", "Failed to populate location")
         )
     
+    idempotency.complete(db, idempotency_key, "populate-location", request, result)
     return result
 
 
 @router.get("/chapter-info/{chapter_id}")
-def get_chapter_complete_info(chapter_id: int, db: Session = Depends(get_db)):
+def get_chapter_complete_info(chapter_id: int, request: Request, db: Session = Depends(get_db)):
     """
     Stored Procedure: Get complete chapter information.
     
-    Returns all related data (locations, bosses, pixls, playable characters) in one call.
+    Returns all related data (locations, bosses, pixls, playable characters) in one call,
+    served from the precompiled chapter document store.
     """
-    result = StoredProcedures.get_chapter_complete_info(db, chapter_id)
+    body = chapter_documents.get_compressed(db, chapter_id, chapter_documents.COMPLETE)
     
-    if not result["success"]:
+    if body is None:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
-            detail=result.get("error", "Chapter not found")
+            detail=f"Chapter {chapter_id} not found"
         )
     
-    return result
+    return chapter_documents.response(request, body)
 
 
 @router.post("/transfer-item")
 def transfer_item_between_blocks(
     request: TransferItemRequest,
+    idempotency_key: Optional[str] = Header(None),
     db: Session = Depends(get_db)
 ):
     """
@@ -230,10 +285,15 @@ def transfer_item_between_blocks(
     
     Atomically moves an item between two blocks in a single transaction.
     """
+    replayed = idempotency.begin(db, idempotency_key, "transfer-item", request)
+    if replayed is not None:
+        return replayed
+    
     result = StoredProcedures.transfer_item_between_blocks(
         db=db,
         from_block_id=request.from_block_id,
-        to_block_id=request.to_block_id
+        to_block_id=request.to_block_id,
+        commit=idempotency_key is None
     )
     
     if not result["success"]:
@@ -242,4 +302,5 @@ def transfer_item_between_blocks(
             detail=result.get("error", "Failed to transfer item")
         )
     
+    idempotency.complete(db, idempotency_key, "transfer-item", request, result)
     return result
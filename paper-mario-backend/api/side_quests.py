@@ -1,9 +1,14 @@
 """Side Quest endpoints."""
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Header, Response, status, Query
 from sqlalchemy.orm import Session
-from typing import List
+from typing import List, Optional
+from datetime import datetime
 
+from concurrency import set_etag
 from config import get_db
+from fast_json import list_response
+from last_modified import list_not_modified, modified_since_filter, not_modified, table_state
+from lookups import get_or_404, get_by_name
 from models import SideQuest
 from schemas.side_quests import SideQuestCreate, SideQuestResponse, SideQuestUpdate
 
@@ -12,27 +17,39 @@ router = APIRouter(prefix="/side-quests", tags=["Side Quests"])
 
 @router.get("/", response_model=List[SideQuestResponse])
 def get_side_quests(
+    response: Response,
     skip: int = 0,
     limit: int = None,
+    modified_since: Optional[datetime] = Query(None, description="Only rows created or updated at or after this time (UTC)"),
+    if_modified_since: Optional[str] = Header(None),
+    if_none_match: Optional[str] = Header(None),
     db: Session = Depends(get_db)
 ):
     """Get all side quests. Use skip/limit for pagination (optional)."""
-    query = db.query(SideQuest).offset(skip)
+    unchanged = list_not_modified(response, table_state(db, SideQuest), if_modified_since, if_none_match)
+    if unchanged is not None:
+        return unchanged
+
+    query = modified_since_filter(db.query(SideQuest), SideQuest, modified_since).offset(skip)
     if limit is not None:
         query = query.limit(limit)
     quests = query.all()
-    return quests
+    return list_response(quests, SideQuestResponse, response)
 
 
 @router.get("/{quest_id}", response_model=SideQuestResponse)
-def get_side_quest(quest_id: int, db: Session = Depends(get_db)):
+def get_side_quest(
+    quest_id: int,
+    response: Response,
+    if_modified_since: Optional[str] = Header(None),
+    db: Session = Depends(get_db)
+):
     """Get a specific side quest by ID."""
-    quest = db.query(SideQuest).filter(SideQuest.quest_id == quest_id).first()
-    if not quest:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail=f"Side quest with id {quest_id} not found"
-        )
+    quest = get_or_404(db, SideQuest, quest_id, "Side quest")
+    set_etag(response, quest)
+    unchanged = not_modified(response, quest.updated_at, if_modified_since)
+    if unchanged is not None:
+        return unchanged
     return quest
 
 
@@ -40,7 +57,7 @@ def get_side_quest(quest_id: int, db: Session = Depends(get_db)):
 def create_side_quest(quest: SideQuestCreate, db: Session = Depends(get_db)):
     """Create a new side quest."""
     # Check if quest name already exists
-    existing = db.query(SideQuest).filter(SideQuest.name == quest.name).first()
+    existing = get_by_name(db, SideQuest, quest.name)
     if existing:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
@@ -58,15 +75,12 @@ def create_side_quest(quest: SideQuestCreate, db: Session = Depends(get_db)):
 def update_side_quest(
     quest_id: int,
     quest_update: SideQuestUpdate,
+    response: Response,
+    if_match: Optional[str] = Header(None),
     db: Session = Depends(get_db)
 ):
     """Update a side quest."""
-    db_quest = db.query(SideQuest).filter(SideQuest.quest_id == quest_id).first()
-    if not db_quest:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail=f"Side quest with id {quest_id} not found"
-        )
+    db_quest = get_or_404(db, SideQuest, quest_id, "Side quest", if_match=if_match)
     
     # Update only provided fields
     update_data = quest_update.model_dump(exclude_unset=True)
@@ -75,18 +89,18 @@ def update_side_quest(
     
     db.commit()
     db.refresh(db_quest)
+    set_etag(response, db_quest)
     return db_quest
 
 
 @router.delete("/{quest_id}", status_code=status.HTTP_204_NO_CONTENT)
-def delete_side_quest(quest_id: int, db: Session = Depends(get_db)):
+def delete_side_quest(
+    quest_id: int,
+    if_match: Optional[str] = Header(None),
+    db: Session = Depends(get_db)
+):
     """Delete a side quest."""
-    db_quest = db.query(SideQuest).filter(SideQuest.quest_id == quest_id).first()
-    if not db_quest:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail=f"Side quest with id {quest_id} not found"
-        )
+    db_quest = get_or_404(db, SideQuest, quest_id, "Side quest", if_match=if_match)
     
     db.delete(db_quest)
     db.commit()
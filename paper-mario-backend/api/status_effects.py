@@ -1,10 +1,15 @@
 """Status Effect endpoints."""
-from fastapi import APIRouter, Depends, HTTPException, status, Query
+from fastapi import APIRouter, Depends, HTTPException, Header, Response, status, Query
 from sqlalchemy.orm import Session
 from typing import List, Optional
 from datetime import datetime
 
+import reference_cache
+from concurrency import set_etag
 from config import get_db
+from fast_json import list_response
+from last_modified import list_not_modified, modified_since_filter, not_modified, table_state
+from lookups import get_or_404
 from models import StatusEffect, CharacterStatusEffect
 from models.status_effects import EffectType
 from schemas.status_effects import (
@@ -17,13 +22,21 @@ router = APIRouter(prefix="/status-effects", tags=["Status Effects"])
 
 @router.get("/", response_model=List[StatusEffectResponse])
 def get_status_effects(
+    response: Response,
     skip: int = 0,
     limit: int = None,
     effect_type: Optional[EffectType] = Query(None, description="Filter by effect type"),
+    modified_since: Optional[datetime] = Query(None, description="Only rows created or updated at or after this time (UTC)"),
+    if_modified_since: Optional[str] = Header(None),
+    if_none_match: Optional[str] = Header(None),
     db: Session = Depends(get_db)
 ):
     """Get all status effects with optional filtering. Use skip/limit for pagination (optional)."""
-    query = db.query(StatusEffect)
+    unchanged = list_not_modified(response, table_state(db, StatusEffect), if_modified_since, if_none_match)
+    if unchanged is not None:
+        return unchanged
+
+    query = modified_since_filter(db.query(StatusEffect), StatusEffect, modified_since)
     
     if effect_type:
         query = query.filter(StatusEffect.effect_type == effect_type)
@@ -32,18 +45,22 @@ def get_status_effects(
     if limit is not None:
         query = query.limit(limit)
     effects = query.all()
-    return effects
+    return list_response(effects, StatusEffectResponse, response)
 
 
 @router.get("/{status_id}", response_model=StatusEffectResponse)
-def get_status_effect(status_id: int, db: Session = Depends(get_db)):
+def get_status_effect(
+    status_id: int,
+    response: Response,
+    if_modified_since: Optional[str] = Header(None),
+    db: Session = Depends(get_db)
+):
     """Get a specific status effect by ID."""
-    effect = db.query(StatusEffect).filter(StatusEffect.status_id == status_id).first()
-    if not effect:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail=f"Status effect with id {status_id} not found"
-        )
+    effect = reference_cache.status_effects.get_or_404(db, status_id)
+    set_etag(response, effect)
+    unchanged = not_modified(response, effect.updated_at, if_modified_since)
+    if unchanged is not None:
+        return unchanged
     return effect
 
 
@@ -51,7 +68,7 @@ def get_status_effect(status_id: int, db: Session = Depends(get_db)):
 def create_status_effect(effect: StatusEffectCreate, db: Session = Depends(get_db)):
     """Create a new status effect."""
     # Check if status effect name already exists
-    existing = db.query(StatusEffect).filter(StatusEffect.name == effect.name).first()
+    existing = reference_cache.status_effects.get_by_name(db, effect.name)
     if existing:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
@@ -69,15 +86,12 @@ def create_status_effect(effect: StatusEffectCreate, db: Session = Depends(get_d
 def update_status_effect(
     status_id: int,
     effect_update: StatusEffectUpdate,
+    response: Response,
+    if_match: Optional[str] = Header(None),
     db: Session = Depends(get_db)
 ):
     """Update a status effect."""
-    db_effect = db.query(StatusEffect).filter(StatusEffect.status_id == status_id).first()
-    if not db_effect:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail=f"Status effect with id {status_id} not found"
-        )
+    db_effect = get_or_404(db, StatusEffect, status_id, "Status effect", if_match=if_match)
     
     update_data = effect_update.model_dump(exclude_unset=True)
     for field, value in update_data.items():
@@ -85,18 +99,18 @@ def update_status_effect(
     
     db.commit()
     db.refresh(db_effect)
+    set_etag(response, db_effect)
     return db_effect
 
 
 @router.delete("/{status_id}", status_code=status.HTTP_204_NO_CONTENT)
-def delete_status_effect(status_id: int, db: Session = Depends(get_db)):
+def delete_status_effect(
+    status_id: int,
+    if_match: Optional[str] = Header(None),
+    db: Session = Depends(get_db)
+):
     """Delete a status effect."""
-    db_effect = db.query(StatusEffect).filter(StatusEffect.status_id == status_id).first()
-    if not db_effect:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail=f"Status effect with id {status_id} not found"
-        )
+    db_effect = get_or_404(db, StatusEffect, status_id, "Status effect", if_match=if_match)
     
     db.delete(db_effect)
     db.commit()
@@ -126,4 +140,4 @@ def get_character_status_effects(character_id: int, db: Session = Depends(get_db
     effects = db.query(CharacterStatusEffect).filter(
         CharacterStatusEffect.character_id == character_id
     ).all()
-    return effects
+    return list_response(effects, CharacterStatusEffectResponse)
@@ -1,25 +1,45 @@
 """Switch endpoints."""
-from fastapi import APIRouter, Depends, HTTPException, status, Query
+from fastapi import APIRouter, Depends, HTTPException, Header, Response, status, Query
 from sqlalchemy.orm import Session
 from typing import List, Optional
+from datetime import datetime
 
+from concurrency import set_etag
 from config import get_db
+from fast_json import list_response
+from last_modified import list_not_modified, modified_since_filter, not_modified, table_state
+from lookups import get_or_404
 from models import Switch
+from replicas import use_primary
 from schemas.switches import SwitchCreate, SwitchResponse, SwitchUpdate
+from switch_solver import SwitchGraph
+from table_versions import VersionedCache
 
 router = APIRouter(prefix="/switches", tags=["Switches"])
 
+# One graph per version of its tables, so its memoized closures carry over
+# between requests until a location, navigation object or switch changes
+_graph_cache = VersionedCache(("locations", "navigation_objects", "switches"), maxsize=1)
+
 
 @router.get("/", response_model=List[SwitchResponse])
 def get_switches(
+    response: Response,
     skip: int = 0,
     limit: int = None,
     location_id: Optional[int] = Query(None, description="Filter by location"),
     switch_type: Optional[str] = Query(None, description="Filter by switch type"),
+    modified_since: Optional[datetime] = Query(None, description="Only rows created or updated at or after this time (UTC)"),
+    if_modified_since: Optional[str] = Header(None),
+    if_none_match: Optional[str] = Header(None),
     db: Session = Depends(get_db)
 ):
     """Get all switches with optional filtering. Use skip/limit for pagination (optional)."""
-    query = db.query(Switch)
+    unchanged = list_not_modified(response, table_state(db, Switch), if_modified_since, if_none_match)
+    if unchanged is not None:
+        return unchanged
+
+    query = modified_since_filter(db.query(Switch), Switch, modified_since)
     
     if location_id:
         query = query.filter(Switch.location_id == location_id)
@@ -30,18 +50,129 @@ def get_switches(
     if limit is not None:
         query = query.limit(limit)
     switches = query.all()
-    return switches
+    return list_response(switches, SwitchResponse, response)
 
 
-@router.get("/{switch_id}", response_model=SwitchResponse)
-def get_switch(switch_id: int, db: Session = Depends(get_db)):
-    """Get a specific switch by ID."""
-    switch = db.query(Switch).filter(Switch.switch_id == switch_id).first()
-    if not switch:
+def _load_graph(
+    db: Session,
+    start_location_id: Optional[List[int]],
+    on: Optional[List[int]]
+):
+    """Get the (cached) switch graph and encode the start locations and switch states."""
+    def compute():
+        # Cached under the primary's table versions, so read from the primary
+        with use_primary(db):
+            return SwitchGraph.from_db(db)
+
+    graph = _graph_cache.get_or_compute("graph", compute)
+
+    start_ids = start_location_id or graph.hub_location_ids()
+    if not start_ids:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="No start location given and no hub locations exist"
+        )
+    for location_id in start_ids:
+        if not graph.has_location(location_id):
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail=f"Location with id {location_id} not found"
+            )
+    for switch_id in on or []:
+        if not graph.has_switch(switch_id):
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail=f"Switch with id {switch_id} not found"
+            )
+
+    return graph, graph.encode_locations(start_ids), graph.encode_switches(on or [])
+
+
+@router.get("/reachability")
+def get_reachability(
+    start_location_id: Optional[List[int]] = Query(None, description="Start locations (defaults to hubs)"),
+    on: Optional[List[int]] = Query(None, description="IDs of switches that are flipped on"),
+    db: Session = Depends(get_db)
+):
+    """Get the locations and navigation objects reachable with the given switches on."""
+    graph, starts, state = _load_graph(db, start_location_id, on)
+    reached, _ = graph.closure(state, starts)
+
+    return {
+        "state": state,
+        "switches_on": graph.decode_switches(state),
+        "reachable_location_ids": graph.decode_locations(reached),
+        "reachable_navobj_ids": graph.open_navobj_ids(state, reached)
+    }
+
+
+@router.get("/solve")
+def solve_switches(
+    target_location_id: Optional[int] = Query(None, description="Location that must become reachable"),
+    target_navobj_id: Optional[int] = Query(None, description="Navigation object that must become usable"),
+    start_location_id: Optional[List[int]] = Query(None, description="Start locations (defaults to hubs)"),
+    on: Optional[List[int]] = Query(None, description="IDs of switches that are already on"),
+    max_states: int = Query(100000, gt=0, le=1000000, description="Search budget in switch states"),
+    db: Session = Depends(get_db)
+):
+    """Find the minimal set of additional switches needed to reach a location or navigation object."""
+    if target_location_id is None and target_navobj_id is None:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Provide target_location_id or target_navobj_id"
+        )
+
+    graph, starts, state = _load_graph(db, start_location_id, on)
+    if target_location_id is not None and not graph.has_location(target_location_id):
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
-            detail=f"Switch with id {switch_id} not found"
+            detail=f"Location with id {target_location_id} not found"
         )
+    if target_navobj_id is not None and not graph.has_navobj(target_navobj_id):
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Navigation object with id {target_navobj_id} not found"
+        )
+
+    result = graph.solve(
+        starts,
+        initial_state=state,
+        target_location_id=target_location_id,
+        target_navobj_id=target_navobj_id,
+        max_states=max_states
+    )
+
+    solution = result["state"]
+    response = {
+        "solvable": solution is not None,
+        "states_explored": result["states_explored"],
+        "limit_reached": result["limit_reached"]
+    }
+    if solution is not None:
+        reached, _ = graph.closure(solution, starts)
+        response.update({
+            "state": solution,
+            "switches_needed": graph.decode_switches(solution & ~state),
+            "switches_on": graph.decode_switches(solution),
+            "reachable_location_ids": graph.decode_locations(reached),
+            "reachable_navobj_ids": graph.open_navobj_ids(solution, reached)
+        })
+    return response
+
+
+@router.get("/{switch_id}", response_model=SwitchResponse)
+def get_switch(
+    switch_id: int,
+    response: Response,
+    if_modified_since: Optional[str] = Header(None),
+    db: Session = Depends(get_db)
+):
+    """Get a specific switch by ID."""
+    switch = get_or_404(db, Switch, switch_id, "Switch")
+    set_etag(response, switch)
+    unchanged = not_modified(response, switch.updated_at, if_modified_since)
+    if unchanged is not None:
+        return unchanged
     return switch
 
 
@@ -59,15 +190,12 @@ def create_switch(switch: SwitchCreate, db: Session = Depends(get_db)):
 def update_switch(
     switch_id: int,
     switch_update: SwitchUpdate,
+    response: Response,
+    if_match: Optional[str] = Header(None),
     db: Session = Depends(get_db)
 ):
     """Update a switch."""
-    db_switch = db.query(Switch).filter(Switch.switch_id == switch_id).first()
-    if not db_switch:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail=f"Switch with id {switch_id} not found"
-        )
+    db_switch = get_or_404(db, Switch, switch_id, "Switch", if_match=if_match)
     
     update_data = switch_update.model_dump(exclude_unset=True)
     for field, value in update_data.items():
@@ -75,18 +203,18 @@ def update_switch(
     
     db.commit()
     db.refresh(db_switch)
+    set_etag(response, db_switch)
     return db_switch
 
 
 @router.delete("/{switch_id}", status_code=status.HTTP_204_NO_CONTENT)
-def delete_switch(switch_id: int, db: Session = Depends(get_db)):
+def delete_switch(
+    switch_id: int,
+    if_match: Optional[str] = Header(None),
+    db: Session = Depends(get_db)
+):
     """Delete a switch."""
-    db_switch = db.query(Switch).filter(Switch.switch_id == switch_id).first()
-    if not db_switch:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail=f"Switch with id {switch_id} not found"
-        )
+    db_switch = get_or_404(db, Switch, switch_id, "Switch", if_match=if_match)
     
     db.delete(db_switch)
     db.commit()
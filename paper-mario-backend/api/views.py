@@ -1,22 +1,29 @@
 """API endpoints for database views."""
-from fastapi import APIRouter, Depends
+from fastapi import APIRouter, Depends, Request
 from sqlalchemy.orm import Session
 from typing import List
 
+from compression import CompressedBody
 from config import get_db
+from fast_json import dumps, list_response, serializer_for
 from models.views import (
     EnemyDetailsView, BossDetailsView, LocationSummaryView,
     PlayableCharacterDetailsView, BlockInventoryView,
     QuestOverviewView, ChapterStatisticsView
 )
+from replicas import use_primary
 from schemas.views import (
     EnemyDetailsResponse, BossDetailsResponse, LocationSummaryResponse,
     PlayableCharacterDetailsResponse, BlockInventoryResponse,
     QuestOverviewResponse, ChapterStatisticsResponse
 )
+from table_versions import VersionedCache
 
 router = APIRouter(prefix="/views", tags=["Database Views"])
 
+# Compressed block inventory pages, valid until a table behind the view changes
+_block_inventory_cache = VersionedCache(("blocks_containers", "locations", "chapters", "items"), maxsize=64)
+
 
 @router.get("/enemy-details", response_model=List[EnemyDetailsResponse])
 def get_enemy_details(
@@ -31,7 +38,7 @@ def get_enemy_details(
     query = db.query(EnemyDetailsView).offset(skip)
     if limit is not None:
         query = query.limit(limit)
-    return query.all()
+    return list_response(query.all(), EnemyDetailsResponse)
 
 
 @router.get("/boss-details", response_model=List[BossDetailsResponse])
@@ -47,7 +54,7 @@ def get_boss_details(
     query = db.query(BossDetailsView).offset(skip)
     if limit is not None:
         query = query.limit(limit)
-    return query.all()
+    return list_response(query.all(), BossDetailsResponse)
 
 
 @router.get("/location-summary", response_model=List[LocationSummaryResponse])
@@ -63,7 +70,7 @@ def get_location_summary(
     query = db.query(LocationSummaryView).offset(skip)
     if limit is not None:
         query = query.limit(limit)
-    return query.all()
+    return list_response(query.all(), LocationSummaryResponse)
 
 
 @router.get("/playable-character-details", response_model=List[PlayableCharacterDetailsResponse])
@@ -79,11 +86,12 @@ def get_playable_character_details(
     query = db.query(PlayableCharacterDetailsView).offset(skip)
     if limit is not None:
         query = query.limit(limit)
-    return query.all()
+    return list_response(query.all(), PlayableCharacterDetailsResponse)
 
 
 @router.get("/block-inventory", response_model=List[BlockInventoryResponse])
 def get_block_inventory(
+    request: Request,
     skip: int = 0,
     limit: int = None,
     db: Session = Depends(get_db)
@@ -91,11 +99,18 @@ def get_block_inventory(
     """
     Get block inventory from view.
     Shows all blocks with their items and location details.
+    Cached until blocks, locations, chapters or items change.
     """
-    query = db.query(BlockInventoryView).offset(skip)
-    if limit is not None:
-        query = query.limit(limit)
-    return query.all()
+    def compute():
+        # Cached under the primary's table versions, so read from the primary
+        with use_primary(db):
+            query = db.query(BlockInventoryView).offset(skip)
+            if limit is not None:
+                query = query.limit(limit)
+            rows = serializer_for(BlockInventoryResponse).rows(query.all())
+        return CompressedBody(dumps(rows))
+
+    return _block_inventory_cache.get_or_compute((skip, limit), compute).response(request)
 
 
 @router.get("/quest-overview", response_model=List[QuestOverviewResponse])
@@ -111,7 +126,7 @@ def get_quest_overview(
     query = db.query(QuestOverviewView).offset(skip)
     if limit is not None:
         query = query.limit(limit)
-    return query.all()
+    return list_response(query.all(), QuestOverviewResponse)
 
 
 @router.get("/chapter-statistics", response_model=List[ChapterStatisticsResponse])
@@ -127,15 +142,13 @@ def get_chapter_statistics(
     query = db.query(ChapterStatisticsView).offset(skip)
     if limit is not None:
         query = query.limit(limit)
-    return query.all()
+    return list_response(query.all(), ChapterStatisticsResponse)
 
 
 @router.get("/chapter-statistics/{chapter_id}", response_model=ChapterStatisticsResponse)
 def get_chapter_statistics_by_id(chapter_id: int, db: Session = Depends(get_db)):
     """Get statistics for a specific chapter from view."""
-    result = db.query(ChapterStatisticsView).filter(
-        ChapterStatisticsView.chapter_id == chapter_id
-    ).first()
+    result = db.get(ChapterStatisticsView, chapter_id)
     
     if not result:
         from fastapi import HTTPException, status
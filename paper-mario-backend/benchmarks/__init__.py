@@ -0,0 +1 @@
+"""Micro-benchmarks and query-plan checks. Run from the backend directory, e.g. ``python -m benchmarks.lookups``."""
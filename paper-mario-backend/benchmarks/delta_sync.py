@@ -0,0 +1,94 @@
+"""Regression check: list revalidation never hides a write made in the same second.
+
+Serves ``GET /obstacles/`` from a private in-memory SQLite database, writes a
+row within the second of a fetch and asserts that revalidating with that
+fetch's ``If-Modified-Since`` and ``If-None-Match`` returns the new list, not
+``304 Not Modified``. Once the second has passed, both validators of a fresh
+fetch must answer 304. Exits non-zero listing the failed checks otherwise.
+
+    python -m benchmarks.delta_sync
+"""
+import sys
+import time
+
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from config import Base, get_db
+from main import app
+from models import Chapter, Location
+from models.locations import LocationType
+
+
+def start_of_second():
+    """Sleep until early in the next second, so a fetch and a write share it."""
+    time.sleep(1 - time.time() % 1 + 0.01)
+
+
+def main() -> int:
+    engine = create_engine(
+        "sqlite://",
+        connect_args={"check_same_thread": False},
+        poolclass=StaticPool
+    )
+    Base.metadata.create_all(bind=engine)
+    Session = sessionmaker(bind=engine, autoflush=False)
+    with Session() as db:
+        db.add(Chapter(chapter_id=1, name="Chapter 1", world_number=1))
+        db.add(Location(location_id=1, chapter_id=1, name="Port Prisma", type=LocationType.hub))
+        db.commit()
+
+    def get_test_db():
+        session = Session()
+        try:
+            yield session
+        finally:
+            session.close()
+
+    app.dependency_overrides[get_db] = get_test_db
+    client = TestClient(app)
+    failures = []
+
+    def check(label, response, expected):
+        ok = response.status_code == expected
+        print(f"  {'✓' if ok else '✗'} {label}: {response.status_code}")
+        if not ok:
+            failures.append(label)
+
+    def revalidate(label, first, expected):
+        if first.headers.get("last-modified"):
+            check(f"{label}, If-Modified-Since", client.get(
+                "/obstacles/", headers={"If-Modified-Since": first.headers["last-modified"]}
+            ), expected)
+        check(f"{label}, If-None-Match", client.get(
+            "/obstacles/", headers={"If-None-Match": first.headers["etag"]}
+        ), expected)
+
+    try:
+        start_of_second()
+        client.post("/obstacles/", json={"location_id": 1, "type": "Paper Streamer"})
+        first = client.get("/obstacles/")
+        client.post("/obstacles/", json={"location_id": 1, "type": "Fold"})
+        revalidate("write in the second of the fetch", first, 200)
+
+        start_of_second()
+        first = client.get("/obstacles/")
+        if "last-modified" not in first.headers:
+            failures.append("Last-Modified missing once the second has passed")
+        revalidate("no write since the fetch", first, 304)
+        client.post("/obstacles/", json={"location_id": 1, "type": "Spike Trap"})
+        revalidate("write after the fetch", first, 200)
+    finally:
+        app.dependency_overrides.pop(get_db, None)
+
+    if failures:
+        print(f"✗ {len(failures)} revalidation checks failed")
+        return 1
+    print("✓ Revalidation saw every write")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
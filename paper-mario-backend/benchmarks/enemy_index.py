@@ -0,0 +1,168 @@
+"""Benchmark: enemy stat filters through SQL vs. the columnar enemy index.
+
+Runs every filter shape of ``benchmarks.enemy_query_plans`` (random bounds,
+every sort column and direction, a page of 20) against a private in-memory
+SQLite database, first through ``api.enemies.filter_enemies`` and then
+through ``enemy_index``, and exits non-zero if any answer differs. Also
+times the stat summary against the equivalent SQL aggregate, and single-row
+updates against a full reload.
+
+    python -m benchmarks.enemy_index [--rows 20000] [--requests 2000] [--seed 1]
+"""
+import argparse
+import random
+import sys
+import time
+
+from sqlalchemy import create_engine, func
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+import enemy_index
+from api.enemies import SortOrder, filter_enemies
+from benchmarks.enemy_query_plans import query_shapes
+from config import Base
+from models import Character, Enemy
+
+PAGE = 20
+
+
+def build_session_factory(rows: int, seed: int):
+    engine = create_engine(
+        "sqlite://",
+        connect_args={"check_same_thread": False},
+        poolclass=StaticPool
+    )
+    Base.metadata.create_all(bind=engine)
+    Session = sessionmaker(bind=engine, autoflush=False)
+    rng = random.Random(seed)
+    with Session() as db:
+        db.add_all(Character(name=f"Character {i}") for i in range(1, rows + 1))
+        db.flush()
+        db.add_all(
+            Enemy(
+                character_id=i,
+                hp=rng.randint(1, 100),
+                attack=rng.randint(0, 10),
+                defense=rng.randint(0, 5),
+                card_score=rng.randint(0, 60),
+            )
+            for i in range(1, rows + 1)
+        )
+        db.commit()
+    return Session
+
+
+def random_ranges(rng: random.Random, shape):
+    """The shape's bounded stats with random bounds of the same kind."""
+    ranges = {}
+    for stat, (low, high) in shape.items():
+        a, b = sorted((rng.randint(0, 60), rng.randint(0, 60)))
+        ranges[stat] = (a if low is not None else None, b if high is not None else None)
+    return ranges
+
+
+def sql_page(db, ranges, sort_by, order, skip):
+    query = filter_enemies(db.query(Enemy), ranges, sort_by, order).offset(skip).limit(PAGE)
+    return [
+        enemy_index.EnemyRow(e.enemy_id, e.character_id, e.hp, e.attack, e.defense, e.card_score)
+        for e in query
+    ]
+
+
+def index_page(db, ranges, sort_by, order, skip):
+    return enemy_index.index.state(db).select(ranges, sort_by.value, order == SortOrder.desc, skip, PAGE)
+
+
+def sql_summary(db, ranges):
+    stats = [getattr(Enemy, stat) for stat in enemy_index.STATS]
+    query = db.query(func.count(Enemy.enemy_id), *(func.coalesce(func.sum(column), 0) for column in stats))
+    for column, (low, high) in zip(stats, (ranges.get(stat, (None, None)) for stat in enemy_index.STATS)):
+        if low is not None:
+            query = query.filter(column >= low)
+        if high is not None:
+            query = query.filter(column <= high)
+    count, *sums = query.one()
+    return count, sums
+
+
+def index_summary(db, ranges):
+    summary = enemy_index.index.state(db).summary(ranges)
+    return summary["count"], [summary["sum"][stat] for stat in enemy_index.STATS]
+
+
+def timed(label: str, Session, cases, handler) -> float:
+    start = time.perf_counter()
+    with Session() as db:
+        for case in cases:
+            handler(db, *case)
+    per_request = (time.perf_counter() - start) / len(cases) * 1e6
+    print(f"  {label:<44} {per_request:8.1f} µs/request")
+    return per_request
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=20000)
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+
+    Session = build_session_factory(args.rows, args.seed)
+    rng = random.Random(args.seed)
+    shapes = list(query_shapes())
+    cases = [
+        (random_ranges(rng, shape), sort_by, order, rng.choice((0, 0, PAGE, 5 * PAGE)))
+        for shape, sort_by, order in (rng.choice(shapes) for _ in range(args.requests))
+    ]
+
+    with Session() as db:
+        backend = enemy_index.index.metrics()["backend"]
+        mismatches = [case for case in cases if sql_page(db, *case) != index_page(db, *case)]
+        mismatches += [case for case in cases if sql_summary(db, case[0]) != index_summary(db, case[0])]
+    if mismatches:
+        print(f"✗ {len(mismatches)} of {2 * len(cases)} answers differ between SQL and the index:")
+        for ranges, sort_by, order, skip in mismatches[:10]:
+            print(f"  ranges={ranges} sort_by={sort_by.value} order={order.value} skip={skip}")
+        return 1
+    print(f"✓ SQL and the index ({backend}) agree on {2 * len(cases)} answers")
+
+    print(f"\nFiltered pages of {PAGE} ({args.rows} enemies, {len(cases)} requests)")
+    before = timed("filter_enemies(...) through SQL", Session, cases, sql_page)
+    after = timed("enemy_index select", Session, cases, index_page)
+    print(f"  {'speed-up':<44} {before / after:8.1f}×")
+
+    summaries = [(case[0],) for case in cases]
+    print("\nCount and sums per stat")
+    before = timed("SQL aggregate", Session, summaries, sql_summary)
+    after = timed("enemy_index summary", Session, summaries, index_summary)
+    print(f"  {'speed-up':<44} {before / after:8.1f}×")
+
+    print("\nSingle-row writes")
+    updates = max(1, min(200, args.requests // 10))
+    start = time.perf_counter()
+    with Session() as db:
+        for _ in range(updates):
+            enemy = db.get(Enemy, rng.randint(1, args.rows))
+            enemy.hp = rng.randint(1, 100)
+            db.commit()
+            enemy_index.index.state(db)
+    incremental = (time.perf_counter() - start) / updates * 1e6
+    print(f"  {'commit + incremental index update':<44} {incremental:8.1f} µs/write")
+    start = time.perf_counter()
+    with Session() as db:
+        for _ in range(updates):
+            enemy_index.index.apply(enemy_index._UNTRACKED)
+            enemy_index.index.state(db)
+    reload = (time.perf_counter() - start) / updates * 1e6
+    print(f"  {'full index reload':<44} {reload:8.1f} µs/write")
+
+    with Session() as db:
+        if index_page(db, {}, cases[0][1], cases[0][2], 0) != sql_page(db, {}, cases[0][1], cases[0][2], 0):
+            print("✗ The index diverged from the table after the writes")
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,70 @@
+"""Regression check: enemy stat range queries never fall back to a table scan.
+
+Builds every combination of stat range filters, sort column and direction
+through ``api.enemies.filter_enemies`` and asserts that SQLite's
+``EXPLAIN QUERY PLAN`` searches or scans an index for each of them. Exits
+non-zero listing the offending query shapes otherwise.
+
+    python -m benchmarks.enemy_query_plans
+"""
+import itertools
+import sys
+
+from sqlalchemy import create_engine, text
+from sqlalchemy.orm import Session
+
+from api.enemies import EnemySortField, SortOrder, filter_enemies
+from config import Base
+from models import Enemy
+
+STATS = ("hp", "attack", "defense", "card_score")
+
+# (min, max) bound shapes for one filtered stat
+BOUNDS = ((1, None), (None, 50), (1, 50))
+
+
+def query_shapes():
+    """Yield (ranges, sort_by, order) for every filtered query shape."""
+    for count in range(1, len(STATS) + 1):
+        for stats in itertools.combinations(STATS, count):
+            for bounds in itertools.product(BOUNDS, repeat=count):
+                ranges = dict(zip(stats, bounds))
+                for sort_by in EnemySortField:
+                    for order in SortOrder:
+                        yield ranges, sort_by, order
+
+
+def is_table_scan(detail: str) -> bool:
+    return detail.startswith("SCAN enemies") and "INDEX" not in detail
+
+
+def main() -> int:
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(bind=engine)
+
+    failures = []
+    checked = 0
+    with Session(engine) as db:
+        dialect = engine.dialect
+        for ranges, sort_by, order in query_shapes():
+            query = filter_enemies(db.query(Enemy), ranges, sort_by, order).offset(0).limit(20)
+            sql = str(query.statement.compile(dialect=dialect, compile_kwargs={"literal_binds": True}))
+            plan = [row[3] for row in db.execute(text(f"EXPLAIN QUERY PLAN {sql}"))]
+            checked += 1
+            if any(is_table_scan(detail) for detail in plan):
+                failures.append((ranges, sort_by.value, order.value, plan))
+
+    if failures:
+        print(f"✗ {len(failures)} of {checked} enemy query shapes scan the table:")
+        for ranges, sort_by, order, plan in failures:
+            print(f"  ranges={ranges} sort_by={sort_by} order={order}")
+            for detail in plan:
+                print(f"    {detail}")
+        return 1
+
+    print(f"✓ All {checked} enemy query shapes use an index")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,104 @@
+"""Benchmark: one commit per write vs. group commit.
+
+Applies status effects from many concurrent threads to a file-backed SQLite
+database (commits must reach the disk, unlike an in-memory database). It
+runs once with every call committing its own transaction, as
+``/procedures/apply-status-effect`` does by default, and once through
+``group_commit.WriteQueue`` (``GROUP_COMMIT=1``). Both runs must leave the
+same rows behind.
+
+    python -m benchmarks.group_commit [--writes 2000] [--threads 32] [--window-ms 5]
+"""
+import argparse
+import os
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from sqlalchemy import create_engine, func, insert, select
+from sqlalchemy.orm import Session, sessionmaker
+
+from config import Base
+from group_commit import WriteQueue
+from models import Character, CharacterStatusEffect, StatusEffect
+from models.status_effects import EffectType
+from stored_procedures import StoredProcedures
+
+CHARACTERS = 500
+EFFECTS = 8
+
+
+def populate(db: Session) -> None:
+    db.execute(insert(Character), [
+        {"character_id": c, "name": f"Character {c}"} for c in range(1, CHARACTERS + 1)
+    ])
+    db.execute(insert(StatusEffect), [
+        {"status_id": s, "name": f"Effect {s}", "effect_type": EffectType.buff, "duration_seconds": 60}
+        for s in range(1, EFFECTS + 1)
+    ])
+    db.commit()
+
+
+def write_args(writes: int):
+    return [(w % CHARACTERS + 1, w // CHARACTERS % EFFECTS + 1) for w in range(writes)]
+
+
+def run(mode: str, writes: int, threads: int, window_ms: float, directory: str):
+    engine = create_engine(f"sqlite:///{os.path.join(directory, mode + '.db')}",
+                           connect_args={"timeout": 60})
+    Base.metadata.create_all(bind=engine)
+    sessions = sessionmaker(bind=engine)
+    with sessions() as db:
+        populate(db)
+
+    queue = WriteQueue(window_ms, 256, session_factory=sessions)
+
+    def direct(args):
+        with sessions() as db:
+            return StoredProcedures.apply_status_effect_to_character(db, *args, duration_seconds=60)
+
+    def grouped(args):
+        return queue.run(lambda db: StoredProcedures.stage_status_effect(db, *args, duration_seconds=60))
+
+    if mode == "grouped":
+        queue.start()
+    start = time.perf_counter()
+    with ThreadPoolExecutor(threads) as pool:
+        results = list(pool.map(grouped if mode == "grouped" else direct, write_args(writes)))
+    seconds = time.perf_counter() - start
+    queue.stop()
+
+    assert all(result["success"] for result in results), results[0]
+    with sessions() as db:
+        rows = db.execute(
+            select(CharacterStatusEffect.character_id, CharacterStatusEffect.status_id)
+        ).all()
+        applied = db.scalar(select(func.count()).select_from(CharacterStatusEffect))
+    engine.dispose()
+    return seconds, sorted(rows), applied, queue.metrics()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--writes", type=int, default=2000)
+    parser.add_argument("--threads", type=int, default=32)
+    parser.add_argument("--window-ms", type=float, default=5)
+    args = parser.parse_args()
+
+    print(f"{args.writes} status effect applications from {args.threads} threads")
+    with tempfile.TemporaryDirectory() as directory:
+        direct_seconds, direct_rows, direct_count, _ = run(
+            "direct", args.writes, args.threads, args.window_ms, directory
+        )
+        grouped_seconds, grouped_rows, grouped_count, metrics = run(
+            "grouped", args.writes, args.threads, args.window_ms, directory
+        )
+    assert direct_rows == grouped_rows and direct_count == grouped_count
+    print(f"  commit per write: {direct_seconds:7.2f} s  {args.writes / direct_seconds:8.0f} writes/s")
+    print(f"  group commit:     {grouped_seconds:7.2f} s  {args.writes / grouped_seconds:8.0f} writes/s  "
+          f"({metrics['batches']} commits, {metrics['mean_batch_size']:.1f} writes each)")
+    print(f"  speedup:          {direct_seconds / grouped_seconds:7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,129 @@
+"""Benchmark: FastAPI response-model serialization vs. the fast JSON path.
+
+Times only the work done after a list endpoint returns its rows, for the
+widest list schemas. The default path mirrors FastAPI's own handling of a
+``response_model=List[...]`` route: validate every row from attributes, dump
+the models to JSON-compatible data and render a ``JSONResponse``. The fast
+path is ``fast_json.RowSerializer`` plus ``FastJSONResponse``, measured with
+orjson (if installed) and with the pure-Python fallback.
+
+    python -m benchmarks.json_encoding [--rows 5000] [--repeat 5]
+"""
+import argparse
+import datetime
+import json
+import time
+from typing import List
+
+from fastapi.responses import JSONResponse
+from pydantic import TypeAdapter
+
+import fast_json
+from models import CharacterStatusEffect, Enemy, Location
+from models.locations import LocationType
+from models.views import BossDetailsView, EnemyDetailsView
+from schemas.enemies import EnemyResponse
+from schemas.locations import LocationResponse
+from schemas.status_effects import CharacterStatusEffectResponse
+from schemas.views import BossDetailsResponse, EnemyDetailsResponse
+
+
+def build_rows(rows: int):
+    """Transient ORM instances; attribute access is the same as for loaded rows."""
+    now = datetime.datetime(2024, 1, 1, 12, 0, 0)
+    location_types = list(LocationType)
+    return [
+        (EnemyResponse, [
+            Enemy(enemy_id=i, character_id=i, hp=i % 90 + 1, attack=i % 7,
+                  defense=i % 5, card_score=i % 50)
+            for i in range(rows)
+        ]),
+        (EnemyDetailsResponse, [
+            EnemyDetailsView(enemy_id=i, hp=i % 90 + 1, attack=i % 7, defense=i % 5,
+                             card_score=i % 50, character_id=i,
+                             character_name=f"Character {i}",
+                             description="A very ordinary enemy " * 3)
+            for i in range(rows)
+        ]),
+        (BossDetailsResponse, [
+            BossDetailsView(boss_id=i, character_id=i, chapter_id=i % 8 + 1,
+                            phase_count=i % 3 + 1, special_mechanics="Flips the arena",
+                            boss_name=f"Boss {i}", boss_description="Big and angry",
+                            chapter_name=f"Chapter {i % 8 + 1}", world_number=i % 8 + 1)
+            for i in range(rows)
+        ]),
+        (LocationResponse, [
+            Location(location_id=i, chapter_id=i % 8 + 1, name=f"Location {i}",
+                     type=location_types[i % len(location_types)], description=None)
+            for i in range(rows)
+        ]),
+        (CharacterStatusEffectResponse, [
+            CharacterStatusEffect(character_id=i, status_id=i % 10 + 1, applied_at=now,
+                                  expires_at=now + datetime.timedelta(minutes=i))
+            for i in range(rows)
+        ]),
+    ]
+
+
+def response_model_path(schema):
+    adapter = TypeAdapter(List[schema])
+
+    def render(rows):
+        validated = adapter.validate_python(rows, from_attributes=True)
+        return JSONResponse(adapter.dump_python(validated, mode="json")).body
+    return render
+
+
+def fast_path(schema, dumps):
+    serializer = fast_json.RowSerializer(schema)
+
+    def render(rows):
+        return dumps(serializer.rows(rows))
+    return render
+
+
+def stdlib_dumps(content) -> bytes:
+    return json.dumps(
+        content, ensure_ascii=False, allow_nan=False, separators=(",", ":"),
+        default=fast_json._default
+    ).encode("utf-8")
+
+
+def rows_per_second(render, rows, repeat: int) -> float:
+    render(rows)  # warm-up
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        render(rows)
+        best = min(best, time.perf_counter() - start)
+    return len(rows) / best
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=5000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    paths = [("response_model (current)", response_model_path)]
+    if fast_json.orjson is not None:
+        paths.append(("fast path, orjson", lambda schema: fast_path(schema, fast_json.dumps)))
+    else:
+        print("orjson not installed; only the pure-Python fast path is measured")
+    paths.append(("fast path, stdlib json", lambda schema: fast_path(schema, stdlib_dumps)))
+
+    for schema, rows in build_rows(args.rows):
+        # Both paths must produce the same document
+        expected = json.loads(response_model_path(schema)(rows))
+        assert json.loads(fast_path(schema, stdlib_dumps)(rows)) == expected, schema.__name__
+
+        print(f"\n{schema.__name__} ({len(schema.model_fields)} fields, {len(rows)} rows)")
+        baseline = None
+        for label, make in paths:
+            rate = rows_per_second(make(schema), rows, args.repeat)
+            baseline = baseline or rate
+            print(f"  {label:<26} {rate:12,.0f} rows/s  {rate / baseline:5.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,140 @@
+"""Benchmark: location statistics with join fan-out vs. pre-aggregated counts.
+
+For a growing number of children per location in each of the five counted
+tables (objects, blocks, navigation objects, obstacles, switches), fills an
+in-memory SQLite database and times ``GET /queries/locations-with-everything``.
+The previous query left-joined all five tables at once, producing k^5
+intermediate rows per location before ``COUNT(DISTINCT ...)`` collapsed them;
+it is only run while that stays below ``--fanout-limit`` rows. The current
+query counts each table in its own grouped subquery, so its time per child
+row should stay flat as k grows. Both must return the same statistics.
+
+    python -m benchmarks.location_stats [--locations 200] [--children 2,4,8,32,128,512,2048]
+"""
+import argparse
+import time
+
+from sqlalchemy import create_engine, func, insert
+from sqlalchemy.orm import Session
+
+from api.complex_queries import LocationSortField, get_locations_with_everything
+from api.enemies import SortOrder
+from config import Base
+from models import (
+    BlockContainer, Chapter, Location, NavigationObject, Object, Obstacle, Switch
+)
+from models.blocks_containers import BlockType
+from models.locations import LocationType
+from models.navigation_objects import NavigationType
+
+# Required columns of each counted table
+CHILD_TABLES = {
+    Object: {"name": "Sign", "object_type": "sign"},
+    BlockContainer: {"block_type": BlockType.breakable},
+    NavigationObject: {"type": NavigationType.door},
+    Obstacle: {"type": "wall"},
+    Switch: {"switch_type": "floor"},
+}
+
+
+def populate(db: Session, locations: int, children: int) -> None:
+    db.execute(insert(Chapter), [
+        {"chapter_id": c, "name": f"Chapter {c}", "world_number": c} for c in range(1, 9)
+    ])
+    db.execute(insert(Location), [
+        {"location_id": l, "chapter_id": l % 8 + 1, "name": f"Location {l}", "type": LocationType.level}
+        for l in range(1, locations + 1)
+    ])
+    for model, columns in CHILD_TABLES.items():
+        db.execute(insert(model), [
+            {"location_id": l, **columns}
+            for l in range(1, locations + 1)
+            for _ in range(children)
+        ])
+    db.commit()
+
+
+def fan_out(db: Session):
+    """The previous implementation's query."""
+    counts = [
+        func.count(Object.object_id.distinct()),
+        func.count(BlockContainer.block_id.distinct()),
+        func.count(NavigationObject.navobj_id.distinct()),
+        func.count(Obstacle.obstacle_id.distinct()),
+        func.count(Switch.switch_id.distinct()),
+    ]
+    rows = db.query(Location.location_id, *counts).join(
+        Chapter, Location.chapter_id == Chapter.chapter_id
+    ).outerjoin(
+        Object, Location.location_id == Object.location_id
+    ).outerjoin(
+        BlockContainer, Location.location_id == BlockContainer.location_id
+    ).outerjoin(
+        NavigationObject, Location.location_id == NavigationObject.location_id
+    ).outerjoin(
+        Obstacle, Location.location_id == Obstacle.location_id
+    ).outerjoin(
+        Switch, Location.location_id == Switch.location_id
+    ).group_by(Location.location_id).all()
+    return {r[0]: list(r[1:]) for r in rows}
+
+
+def pre_aggregated(db: Session):
+    rows = get_locations_with_everything(
+        skip=0, limit=None, chapter_id=None, location_type=None,
+        sort_by=LocationSortField.location_id, order=SortOrder.asc, db=db
+    )
+    return {
+        r["location_id"]: [
+            r["statistics"][name]
+            for name in ("objects", "blocks", "navigation_objects", "obstacles", "switches")
+        ]
+        for r in rows
+    }
+
+
+def best_time(run, db: Session, repeat: int):
+    best, result = float("inf"), None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = run(db)
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--locations", type=int, default=200)
+    parser.add_argument("--children", default="2,4,8,32,128,512,2048",
+                        help="Comma-separated children per location per table")
+    parser.add_argument("--fanout-limit", type=float, default=2e7,
+                        help="Skip the fan-out query above this many intermediate rows")
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    print(f"{args.locations} locations, 5 child tables")
+    print(f"  {'k':>5} {'child rows':>11} {'fan-out rows':>26} {'fan-out':>11} "
+          f"{'pre-aggregated':>15} {'per child row':>14}")
+    for k in (int(value) for value in args.children.split(",")):
+        engine = create_engine("sqlite://")
+        Base.metadata.create_all(bind=engine)
+        with Session(engine) as db:
+            populate(db, args.locations, k)
+            child_rows = 5 * k * args.locations
+            fan_out_rows = k ** 5 * args.locations
+
+            seconds, result = best_time(pre_aggregated, db, args.repeat)
+            assert all(counts == [k] * 5 for counts in result.values())
+            if fan_out_rows <= args.fanout_limit:
+                old_seconds, old_result = best_time(fan_out, db, 1)
+                assert old_result == result
+                old = f"{old_seconds * 1000:8.1f} ms"
+            else:
+                old = "skipped"
+            print(f"  {k:>5} {child_rows:>11,} {fan_out_rows:>26,} {old:>11} "
+                  f"{seconds * 1000:12.1f} ms {seconds / child_rows * 1e6:11.3f} µs")
+        engine.dispose()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,91 @@
+"""Benchmark: Query-based PK/name lookups vs. the shared lookup layer.
+
+Runs against a private in-memory SQLite database, so it never touches the
+configured DATABASE_URL.
+
+    python -m benchmarks.lookups [--rows 2000] [--requests 5000]
+"""
+import argparse
+import time
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from config import Base
+from lookups import get_by_name
+from models import Character, Enemy
+
+
+def build_session_factory(rows: int):
+    engine = create_engine(
+        "sqlite://",
+        connect_args={"check_same_thread": False},
+        poolclass=StaticPool
+    )
+    Base.metadata.create_all(bind=engine)
+    Session = sessionmaker(bind=engine, autoflush=False)
+    with Session() as db:
+        db.add_all(Character(name=f"Character {i}") for i in range(1, rows + 1))
+        db.flush()
+        db.add_all(
+            Enemy(character_id=i, hp=i % 90 + 1, attack=i % 7, defense=i % 5, card_score=i % 50)
+            for i in range(1, rows + 1)
+        )
+        db.commit()
+    return Session
+
+
+def run(label: str, Session, requests: int, rows: int, handler, report: bool = True) -> float:
+    """Time ``requests`` simulated requests, each with a fresh session."""
+    start = time.perf_counter()
+    for i in range(requests):
+        with Session() as db:
+            handler(db, i % rows + 1)
+    elapsed = time.perf_counter() - start
+    per_request = elapsed / requests * 1e6
+    if report:
+        print(f"  {label:<44} {per_request:8.1f} µs/request")
+    return per_request
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=2000)
+    parser.add_argument("--requests", type=int, default=5000)
+    args = parser.parse_args()
+
+    Session = build_session_factory(args.rows)
+
+    # Detail/update handlers look the same row up; procedures often repeat lookups
+    def query_pk(db, pk):
+        db.query(Enemy).filter(Enemy.enemy_id == pk).first()
+        db.query(Enemy).filter(Enemy.enemy_id == pk).first()
+
+    def session_get(db, pk):
+        db.get(Enemy, pk)
+        db.get(Enemy, pk)
+
+    def query_name(db, pk):
+        db.query(Character).filter(Character.name == f"Character {pk}").first()
+
+    def cached_name(db, pk):
+        get_by_name(db, Character, f"Character {pk}")
+
+    # Warm up compiled caches so both sides are measured steady-state
+    for handler in (query_pk, session_get, query_name, cached_name):
+        run("warm-up", Session, 200, args.rows, handler, report=False)
+
+    print(f"\nPK lookups ({args.requests} requests, 2 lookups each)")
+    before = run("db.query(...).filter(pk == id).first()", Session, args.requests, args.rows, query_pk)
+    after = run("Session.get (lookups.get_or_404)", Session, args.requests, args.rows, session_get)
+    print(f"  saved {before - after:.1f} µs/request ({(1 - after / before) * 100:.0f}%)")
+
+    print(f"\nUnique-name lookups ({args.requests} requests)")
+    before = run("db.query(...).filter(name == n).first()", Session, args.requests, args.rows, query_name)
+    after = run("lookups.get_by_name", Session, args.requests, args.rows, cached_name)
+    print(f"  saved {before - after:.1f} µs/request ({(1 - after / before) * 100:.0f}%)")
+
+
+if __name__ == "__main__":
+    main()
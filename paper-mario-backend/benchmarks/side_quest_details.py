@@ -0,0 +1,174 @@
+"""Benchmark: side-quest details regrouped in Python vs. aggregated to JSON in SQL.
+
+Fills an in-memory SQLite database with ``--quests`` side quests (each with
+zero to three characters, most with a start location and reward) and times
+``GET /queries/side-quests-full-details`` for the whole table, one page and
+one chapter. The previous implementation outer-joined every quest-character
+pair, regrouped the rows in a dict and let FastAPI encode the result; the
+current one returns one JSON document per quest from the database. Both must
+produce the same documents.
+
+    python -m benchmarks.side_quest_details [--quests 100000] [--repeat 3]
+"""
+import argparse
+import json
+import time
+import tracemalloc
+
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+from sqlalchemy import create_engine, insert
+from sqlalchemy.orm import Session
+
+from api.complex_queries import get_side_quests_full_details
+from config import Base
+from models import Chapter, Character, Item, Location, QuestCharacter, SideQuest
+from models.locations import LocationType
+from models.side_quests import QuestRole
+
+CHAPTERS = 8
+LOCATIONS_PER_CHAPTER = 25
+ITEMS = 200
+CHARACTERS = 2000
+
+
+def populate(db: Session, quests: int) -> None:
+    db.execute(insert(Chapter), [
+        {"chapter_id": c, "name": f"Chapter {c}", "world_number": c} for c in range(1, CHAPTERS + 1)
+    ])
+    db.execute(insert(Location), [
+        {"location_id": l, "chapter_id": l % CHAPTERS + 1, "name": f"Location {l}", "type": LocationType.level}
+        for l in range(1, CHAPTERS * LOCATIONS_PER_CHAPTER + 1)
+    ])
+    db.execute(insert(Item), [{"item_id": i, "name": f"Item {i}"} for i in range(1, ITEMS + 1)])
+    db.execute(insert(Character), [
+        {"character_id": c, "name": f"Character {c}"} for c in range(1, CHARACTERS + 1)
+    ])
+    db.execute(insert(SideQuest), [
+        {
+            "quest_id": q,
+            "name": f"Quest {q}",
+            "description": "Find the thing and bring it back",
+            "start_location_id": q % (CHAPTERS * LOCATIONS_PER_CHAPTER) + 1 if q % 10 else None,
+            "reward_item_id": q % ITEMS + 1 if q % 4 else None,
+        }
+        for q in range(1, quests + 1)
+    ])
+    roles = list(QuestRole)
+    db.execute(insert(QuestCharacter), [
+        {"quest_id": q, "character_id": (q * 7 + n * 131) % CHARACTERS + 1, "role": roles[n]}
+        for q in range(1, quests + 1)
+        for n in range(q % 4)
+    ])
+    db.commit()
+
+
+def python_regroup(db: Session, chapter_id=None, skip=0, limit=None) -> bytes:
+    """The previous implementation, with the same filters and pagination added."""
+    query = db.query(
+        SideQuest.quest_id,
+        SideQuest.name.label("quest_name"),
+        SideQuest.description,
+        Location.name.label("start_location"),
+        Chapter.name.label("chapter"),
+        Item.name.label("reward"),
+        Character.name.label("character_name"),
+        QuestCharacter.role
+    ).outerjoin(
+        Location, SideQuest.start_location_id == Location.location_id
+    ).outerjoin(
+        Chapter, Location.chapter_id == Chapter.chapter_id
+    ).outerjoin(
+        Item, SideQuest.reward_item_id == Item.item_id
+    ).outerjoin(
+        QuestCharacter, SideQuest.quest_id == QuestCharacter.quest_id
+    ).outerjoin(
+        Character, QuestCharacter.character_id == Character.character_id
+    )
+    if chapter_id is not None:
+        query = query.filter(Location.chapter_id == chapter_id)
+
+    quests_dict = {}
+    for r in query.order_by(SideQuest.quest_id).all():
+        if r.quest_id not in quests_dict:
+            quests_dict[r.quest_id] = {
+                "quest_id": r.quest_id,
+                "name": r.quest_name,
+                "description": r.description,
+                "start_location": r.start_location,
+                "chapter": r.chapter,
+                "reward": r.reward,
+                "characters": []
+            }
+        if r.character_name:
+            quests_dict[r.quest_id]["characters"].append({
+                "name": r.character_name,
+                "role": r.role.value if r.role else None
+            })
+    # Pagination has to happen after regrouping, since rows are per character
+    quests = list(quests_dict.values())[skip:None if limit is None else skip + limit]
+    return JSONResponse(jsonable_encoder(quests)).body
+
+
+def sql_aggregation(db: Session, chapter_id=None, skip=0, limit=None) -> bytes:
+    return get_side_quests_full_details(
+        skip=skip, limit=limit, chapter_id=chapter_id, reward_item_id=None, db=db
+    ).body
+
+
+def measure(render, db: Session, repeat: int, **params):
+    """Best wall time and peak traced memory for one rendering."""
+    best = float("inf")
+    for _ in range(repeat):
+        db.expire_all()
+        start = time.perf_counter()
+        render(db, **params)
+        best = min(best, time.perf_counter() - start)
+    tracemalloc.start()
+    render(db, **params)
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return best, peak
+
+
+def normalize(body: bytes):
+    # Characters within a quest have no defined order
+    quests = json.loads(body)
+    for quest in quests:
+        quest["characters"].sort(key=lambda c: (c["name"], c["role"]))
+    return quests
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--quests", type=int, default=100_000)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(bind=engine)
+    with Session(engine) as db:
+        populate(db, args.quests)
+
+        cases = {
+            "all quests": {},
+            "page of 50": {"skip": args.quests // 2, "limit": 50},
+            "one chapter": {"chapter_id": 3},
+        }
+        print(f"{args.quests:,} side quests")
+        for label, params in cases.items():
+            expected = normalize(python_regroup(db, **params))
+            assert normalize(sql_aggregation(db, **params)) == expected, label
+
+            print(f"\n{label} ({len(expected):,} quests)")
+            baseline = None
+            for name, render in (("python regroup (previous)", python_regroup),
+                                 ("SQL JSON aggregation", sql_aggregation)):
+                seconds, peak = measure(render, db, args.repeat, **params)
+                baseline = baseline or seconds
+                print(f"  {name:<26} {seconds * 1000:10.1f} ms  {baseline / seconds:5.1f}x"
+                      f"  peak {peak / 2**20:7.1f} MiB")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,113 @@
+"""Benchmark: worker cold start with lazy and eager router loading.
+
+Each measurement runs in a fresh interpreter against a throwaway SQLite file,
+so nothing is shared with the configured DATABASE_URL or the OpenAPI cache.
+Reports the slowest project modules from ``python -X importtime``, the time
+to import ``main``, and the time from interpreter start to the first response
+for a simple router, for ``/openapi.json`` with a cold cache and with a warm
+one.
+
+    python -m benchmarks.startup [--runs 5] [--top 15]
+"""
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+from pathlib import Path
+
+BASE_DIR = Path(__file__).resolve().parent.parent
+
+# Top-level modules and packages of the project, as named in -X importtime
+PROJECT_PREFIXES = frozenset(
+    [path.stem for path in BASE_DIR.glob("*.py")]
+    + [path.parent.name for path in BASE_DIR.glob("*/__init__.py")]
+)
+
+FIRST_REQUEST = """
+import time
+start = time.perf_counter()
+from fastapi.testclient import TestClient
+import main
+imported = time.perf_counter()
+response = TestClient(main.app).get({path!r})
+assert response.status_code == 200, response.status_code
+print(imported - start, time.perf_counter() - start)
+"""
+
+
+def run_python(args, env):
+    result = subprocess.run(
+        [sys.executable, *args], cwd=BASE_DIR, env=env,
+        capture_output=True, text=True, check=True
+    )
+    return result
+
+
+def import_times(env):
+    """Cumulative import time in µs per project module, from -X importtime."""
+    stderr = run_python(["-X", "importtime", "-c", "import main"], env).stderr
+    times = {}
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        _, cumulative, name = line[len("import time:"):].split("|")
+        name = name.strip()
+        if name.split(".")[0] in PROJECT_PREFIXES:
+            try:
+                times[name] = int(cumulative)
+            except ValueError:
+                continue
+    return times
+
+
+def first_request(env, path: str, runs: int):
+    """Median (import main, first response) seconds over ``runs`` fresh processes."""
+    imports, totals = [], []
+    for _ in range(runs):
+        out = run_python(["-c", FIRST_REQUEST.format(path=path)], env).stdout.split()
+        imports.append(float(out[-2]))
+        totals.append(float(out[-1]))
+    return statistics.median(imports), statistics.median(totals)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--top", type=int, default=15)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        env = dict(
+            os.environ,
+            DATABASE_URL=f"sqlite:///{tmp}/startup.db",
+            OPENAPI_CACHE=f"{tmp}/openapi.json",
+            PYTHONWARNINGS="ignore",
+        )
+        run_python(["-c", "from config import Base, engine; import models; Base.metadata.create_all(engine)"], env)
+
+        modes = {"lazy": dict(env, LAZY_ROUTERS="1"), "eager": dict(env, LAZY_ROUTERS="0")}
+
+        for mode, mode_env in modes.items():
+            times = import_times(mode_env)
+            print(f"\nSlowest project imports, {mode} routers (cumulative)")
+            for name, us in sorted(times.items(), key=lambda item: -item[1])[:args.top]:
+                print(f"  {name:<36} {us / 1000:8.1f} ms")
+
+        print(f"\nTime to first response (median of {args.runs} fresh processes)")
+        print(f"  {'':<32} {'import main':>12} {'first response':>15}")
+        for mode, mode_env in modes.items():
+            imported, total = first_request(mode_env, "/characters/", args.runs)
+            print(f"  {mode + ' GET /characters/':<32} {imported * 1000:9.1f} ms {total * 1000:12.1f} ms")
+
+        for mode, mode_env in modes.items():
+            Path(env["OPENAPI_CACHE"]).unlink(missing_ok=True)
+            _, cold = first_request(mode_env, "/openapi.json", 1)
+            _, warm = first_request(mode_env, "/openapi.json", args.runs)
+            print(f"  {mode + ' GET /openapi.json':<32} {'cold cache':>12} {cold * 1000:12.1f} ms")
+            print(f"  {'':<32} {'warm cache':>12} {warm * 1000:12.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
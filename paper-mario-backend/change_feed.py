@@ -0,0 +1,215 @@
+"""Append-only change log for incremental sync.
+
+Every ORM insert, update and delete of a domain row (the models that are
+``config.Versioned``) appends a ``change_log`` entry in the same
+transaction. Each entry holds the table, the primary key, the operation and a
+compact diff: the full row for inserts, only the changed columns for updates,
+nothing for deletes. Updates and deletes also carry the row's foreign keys.
+Entries roll back with the write that produced them. Their ``seq`` is
+assigned while the transaction holds SQLite's single write lock, so sequence
+order is commit order and a reader never sees a later sequence number appear
+before an earlier one.
+
+Consumers download a table once, note ``latest_seq`` from ``GET /changes``,
+then poll ``GET /changes?since=<seq>`` and apply the entries in order.
+Entries older than ``CHANGE_FEED_RETENTION_SECONDS`` (default seven days) are
+compacted every ``CHANGE_FEED_COMPACT_SECONDS``. A client that falls further
+behind than that gets 410 Gone and must download again.
+
+Writes issued as bulk SQL (``session.execute(update(...))``) bypass the ORM
+flush and are not recorded; the API's write paths all go through the ORM.
+"""
+import json
+import logging
+import os
+import threading
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional
+
+from sqlalchemy import delete, event, func, insert, inspect, select
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.orm import Session
+
+from config import Versioned
+from fast_json import dumps
+from models import ChangeLogEntry
+from models.change_log import ChangeOp
+
+logger = logging.getLogger("paper_mario.change_feed")
+
+ENABLED = os.getenv("CHANGE_FEED", "1") != "0"
+RETENTION_SECONDS = int(os.getenv("CHANGE_FEED_RETENTION_SECONDS", str(7 * 24 * 60 * 60)))
+COMPACT_SECONDS = float(os.getenv("CHANGE_FEED_COMPACT_SECONDS", "3600"))
+
+
+# Engines whose database has the change_log table (checked once per engine)
+_ready: Dict[Any, bool] = {}
+
+
+def _has_log(connection) -> bool:
+    # Databases created before the table existed are not logged until init_db.py is run
+    engine = connection.engine
+    if engine not in _ready:
+        _ready[engine] = inspect(connection).has_table(ChangeLogEntry.__tablename__)
+        if not _ready[engine]:
+            logger.warning("change_log table missing; run init_db.py to record changes")
+    return _ready[engine]
+
+
+def _json(value: Any) -> str:
+    return dumps(value).decode("utf-8")
+
+
+def _columns(mapper) -> List:
+    # (attribute key, column name) of every mapped column
+    return [(attr.key, attr.columns[0].name) for attr in mapper.column_attrs]
+
+
+def _foreign_keys(mapper) -> List:
+    return [(key, name) for key, name in _columns(mapper) if mapper.columns[key].foreign_keys]
+
+
+def _primary_key(mapper, state) -> Dict[str, Any]:
+    identity = state.identity or mapper.primary_key_from_instance(state.obj())
+    return {column.name: value for column, value in zip(mapper.primary_key, identity)}
+
+
+def _entry(state, op: ChangeOp, now: datetime) -> Optional[Dict[str, Any]]:
+    mapper = state.mapper
+    if op is ChangeOp.insert:
+        changes = {name: state.dict.get(key) for key, name in _columns(mapper)}
+    else:
+        changes = {}
+        if op is ChangeOp.update:
+            for key, name in _columns(mapper):
+                history = state.attrs[key].history
+                if history.added:
+                    changes[name] = history.added[0]
+            if not changes:
+                return None
+            # The new version tells consumers which ETag the row now has
+            version = mapper.version_id_col
+            if version is not None and version.name not in changes:
+                changes[version.name] = state.dict.get(mapper.get_property_by_column(version).key)
+        # Foreign keys let consumers route the change (e.g. by location or chapter)
+        for key, name in _foreign_keys(mapper):
+            if name not in changes and key in state.dict:
+                changes[name] = state.dict[key]
+    return {
+        "table_name": mapper.local_table.name,
+        "pk": _json(_primary_key(mapper, state)),
+        "op": op,
+        "changes": _json(changes) if changes else None,
+        "changed_at": now,
+    }
+
+
+@event.listens_for(Session, "after_flush")
+def _record_changes(session, flush_context):
+    if not ENABLED:
+        return
+    now = datetime.utcnow()
+    entries = []
+    for objects, op in (
+        (session.new, ChangeOp.insert), (session.dirty, ChangeOp.update), (session.deleted, ChangeOp.delete)
+    ):
+        for obj in objects:
+            if isinstance(obj, Versioned):
+                entry = _entry(inspect(obj), op, now)
+                if entry is not None:
+                    entries.append(entry)
+    if entries:
+        connection = session.connection()
+        if _has_log(connection):
+            connection.execute(insert(ChangeLogEntry), entries)
+
+
+def as_dict(entry: ChangeLogEntry) -> Dict[str, Any]:
+    return {
+        "seq": entry.seq,
+        "table": entry.table_name,
+        "pk": json.loads(entry.pk),
+        "op": entry.op.value,
+        "changes": None if entry.changes is None else json.loads(entry.changes),
+        "changed_at": entry.changed_at,
+    }
+
+
+def latest_seq(db: Session) -> int:
+    return db.scalar(select(func.max(ChangeLogEntry.seq))) or 0
+
+
+def oldest_seq(db: Session) -> Optional[int]:
+    return db.scalar(select(func.min(ChangeLogEntry.seq)))
+
+
+def changes_since(db: Session, since: int, limit: int, table: Optional[str] = None) -> Optional[Dict[str, Any]]:
+    """
+    Up to ``limit`` entries with ``seq > since`` in sequence order.
+
+    Returns None if entries after ``since`` were already compacted away.
+    """
+    oldest = oldest_seq(db)
+    if oldest is not None and since < oldest - 1:
+        return None
+
+    query = select(ChangeLogEntry).where(ChangeLogEntry.seq > since)
+    if table is not None:
+        query = query.where(ChangeLogEntry.table_name == table)
+    # One extra row tells whether another page follows
+    rows = db.scalars(query.order_by(ChangeLogEntry.seq).limit(limit + 1)).all()
+    page = rows[:limit]
+    return {
+        "changes": [as_dict(entry) for entry in page],
+        "next_since": page[-1].seq if page else since,
+        "has_more": len(rows) > limit,
+        "latest_seq": latest_seq(db),
+    }
+
+
+def compact(retention_seconds: int = RETENTION_SECONDS) -> int:
+    """Delete entries older than the retention window; returns how many were removed."""
+    from config import SessionLocal
+
+    cutoff = datetime.utcnow() - timedelta(seconds=retention_seconds)
+    with SessionLocal() as db:
+        # Keep the newest entry so latest_seq and the 410 check survive a quiet period
+        newest = latest_seq(db)
+        removed = db.execute(
+            delete(ChangeLogEntry).where(
+                ChangeLogEntry.changed_at < cutoff, ChangeLogEntry.seq < newest
+            )
+        ).rowcount
+        db.commit()
+    return removed
+
+
+class Compactor:
+    """Background thread compacting the change log."""
+
+    def __init__(self, interval: float):
+        self.interval = interval
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval):
+            try:
+                compact()
+            except SQLAlchemyError:
+                # Busy database or table not created yet; the next round retries
+                logger.exception("Compacting the change log failed")
+
+    def start(self) -> None:
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="change-feed-compactor", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+
+compactor = Compactor(COMPACT_SECONDS)
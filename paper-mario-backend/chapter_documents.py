@@ -0,0 +1,377 @@
+"""Precompiled per-chapter JSON documents.
+
+``GET /queries/chapter-summary/{id}`` and ``GET /procedures/chapter-info/{id}``
+used to run five queries each for nearly the same data on every request. Both
+renderings are now built together from one set of queries and stored
+gzip-compressed in ``chapter_documents``, one row per chapter and view.
+
+Any flush that touches a contributing table marks the affected chapters'
+documents stale, in the same transaction as the write, and bumps their
+version. After the commit a background thread rebuilds stale documents. The
+new body is only stored if the version is unchanged, so a document
+invalidated mid-build stays stale. A missing document first gets a stale,
+empty row, committed before the build reads anything, so there is always a
+row for such a write to invalidate. A request that finds its document stale
+or missing builds it inline, so a stale body is never served.
+"""
+import gzip
+import logging
+import threading
+from datetime import datetime
+from typing import Dict, Iterable, Optional, Set, Tuple
+
+from fastapi import Request
+from fastapi.responses import Response
+from sqlalchemy import and_, delete, event, inspect, select, update
+from sqlalchemy.exc import IntegrityError, SQLAlchemyError
+from sqlalchemy.orm import Session
+from sqlalchemy.orm.attributes import get_history
+
+import compression
+import reference_cache
+import snapshot
+import table_versions
+from fast_json import dumps
+from models import Boss, Chapter, Character, Location, Pixl, PlayableCharacter
+from models.chapter_documents import ChapterDocument
+from replicas import use_primary
+
+logger = logging.getLogger("paper_mario.chapter_documents")
+
+SUMMARY = "summary"
+COMPLETE = "complete"
+VIEWS = (SUMMARY, COMPLETE)
+
+CONTRIBUTING_TABLES = {
+    "chapters", "locations", "bosses", "characters", "playable_characters", "pixls"
+}
+
+# Attribute holding the chapter a row belongs to, per contributing model
+_CHAPTER_ATTRIBUTE = {
+    Chapter: "chapter_id",
+    Location: "chapter_id",
+    Boss: "chapter_id",
+    PlayableCharacter: "unlock_chapter_id",
+    Pixl: "unlock_chapter_id",
+}
+
+_documents = ChapterDocument.__table__
+_table_ready = False
+
+# Bodies built while serving a read-only snapshot (SNAPSHOT_MODE=1)
+_snapshot_bodies = table_versions.VersionedCache(CONTRIBUTING_TABLES, maxsize=1024)
+
+
+def _has_table(connection) -> bool:
+    # Databases created before this table existed skip the store until init_db.py runs
+    global _table_ready
+    if not _table_ready:
+        _table_ready = inspect(connection).has_table(_documents.name)
+    return _table_ready
+
+
+def build(db: Session, chapter_id: int) -> Optional[Dict[str, dict]]:
+    """Both renderings of one chapter, or None if it does not exist."""
+    chapter = reference_cache.chapters.get(db, chapter_id)
+    if chapter is None:
+        return None
+
+    locations = db.execute(
+        select(Location.location_id, Location.name, Location.type)
+        .where(Location.chapter_id == chapter_id)
+    ).all()
+    bosses = db.execute(
+        select(Boss.boss_id, Character.name, Boss.phase_count, Boss.special_mechanics)
+        .join(Character, Character.character_id == Boss.character_id)
+        .where(Boss.chapter_id == chapter_id)
+    ).all()
+    playable_chars = db.execute(
+        select(PlayableCharacter.character_id, Character.name, PlayableCharacter.special_ability)
+        .join(Character, Character.character_id == PlayableCharacter.character_id)
+        .where(PlayableCharacter.unlock_chapter_id == chapter_id)
+    ).all()
+    pixls = [pixl for pixl in reference_cache.pixls.all(db) if pixl.unlock_chapter_id == chapter_id]
+
+    chapter_info = {
+        "chapter_id": chapter.chapter_id,
+        "name": chapter.name,
+        "world_number": chapter.world_number,
+        "description": chapter.description
+    }
+    summary = {
+        **chapter_info,
+        "statistics": {
+            "location_count": len(locations)
+        },
+        "bosses": [
+            {"name": b.name, "phase_count": b.phase_count, "special_mechanics": b.special_mechanics}
+            for b in bosses
+        ],
+        "playable_characters_unlocked": [
+            {"name": pc.name, "special_ability": pc.special_ability}
+            for pc in playable_chars
+        ],
+        "pixls_unlocked": [
+            {"name": p.name, "ability": p.ability, "is_optional": p.is_optional}
+            for p in pixls
+        ]
+    }
+    complete = {
+        "success": True,
+        "chapter": chapter_info,
+        "locations": [
+            {"location_id": loc.location_id, "name": loc.name, "type": loc.type}
+            for loc in locations
+        ],
+        "bosses": [
+            {
+                "boss_id": b.boss_id,
+                "name": b.name,
+                "phase_count": b.phase_count,
+                "special_mechanics": b.special_mechanics
+            }
+            for b in bosses
+        ],
+        "pixls": [
+            {"pixl_id": p.pixl_id, "name": p.name, "ability": p.ability, "is_optional": p.is_optional}
+            for p in pixls
+        ],
+        "playable_characters": [
+            {"character_id": pc.character_id, "name": pc.name, "special_ability": pc.special_ability}
+            for pc in playable_chars
+        ],
+        "statistics": {
+            "total_locations": len(locations),
+            "total_bosses": len(bosses),
+            "total_pixls": len(pixls),
+            "total_playable_characters": len(playable_chars)
+        }
+    }
+    return {SUMMARY: summary, COMPLETE: complete}
+
+
+def _versions(db: Session, chapter_id: int) -> Dict[str, Tuple[int, bool]]:
+    """(version, stale) of each stored view of one chapter."""
+    return {
+        row.view: (row.version, row.stale)
+        for row in db.execute(
+            select(_documents.c.view, _documents.c.version, _documents.c.stale)
+            .where(_documents.c.chapter_id == chapter_id)
+        )
+    }
+
+
+def _add_placeholders(db: Session, chapter_id: int, views: Iterable[str]) -> None:
+    """
+    Insert and commit stale, empty rows for views without one. A build that
+    starts afterwards may be invalidated by a concurrent write like any other.
+    """
+    for view in views:
+        try:
+            with db.begin_nested():
+                db.execute(_documents.insert().values(
+                    chapter_id=chapter_id, view=view, version=1, stale=True,
+                    body=None, built_at=datetime.utcnow()
+                ))
+        except IntegrityError:
+            pass  # another worker added it first
+    db.commit()
+
+
+def _store(db: Session, chapter_id: int, expected: Dict[str, Optional[int]],
+           bodies: Optional[Dict[str, bytes]]) -> None:
+    """
+    Store compressed bodies for the views of one chapter.
+
+    ``expected`` maps each view to the version of its row when the build
+    started; a row invalidated since then (or missing) is left as it is.
+    """
+    now = datetime.utcnow()
+    if bodies is None:
+        db.execute(delete(_documents).where(_documents.c.chapter_id == chapter_id))
+        return
+    for view, body in bodies.items():
+        version = expected.get(view)
+        if version is not None:
+            db.execute(
+                update(_documents)
+                .where(and_(
+                    _documents.c.chapter_id == chapter_id,
+                    _documents.c.view == view,
+                    _documents.c.version == version
+                ))
+                .values(stale=False, body=body, built_at=now)
+            )
+
+
+def _compress(document: dict) -> bytes:
+    return gzip.compress(dumps(document), compresslevel=6)
+
+
+def rebuild(chapter_ids: Optional[Iterable[int]] = None) -> int:
+    """Build missing and stale documents (of ``chapter_ids`` or all chapters)."""
+    from config import SessionLocal
+
+    rebuilt = 0
+    with SessionLocal() as db:
+        if not _has_table(db.connection()):
+            return 0
+        if chapter_ids is None:
+            chapter_ids = [chapter.chapter_id for chapter in reference_cache.chapters.all(db)]
+            chapter_ids += db.execute(
+                select(_documents.c.chapter_id).distinct()
+                .where(_documents.c.chapter_id.notin_(chapter_ids))
+            ).scalars().all()
+
+        for chapter_id in chapter_ids:
+            rows = _versions(db, chapter_id)
+            if all(view in rows and not rows[view][1] for view in VIEWS):
+                continue
+            missing = [view for view in VIEWS if view not in rows]
+            if missing and reference_cache.chapters.get(db, chapter_id) is not None:
+                _add_placeholders(db, chapter_id, missing)
+                rows = _versions(db, chapter_id)
+            documents = build(db, chapter_id)
+            bodies = {view: _compress(doc) for view, doc in documents.items()} if documents else None
+            _store(db, chapter_id, {view: rows.get(view, (None,))[0] for view in VIEWS}, bodies)
+            db.commit()
+            rebuilt += 1
+    return rebuilt
+
+
+def get_compressed(db: Session, chapter_id: int, view: str) -> Optional[bytes]:
+    """Stored compressed body for one view, building it first if stale or missing."""
+    if snapshot.ENABLED:
+        # A read-only snapshot cannot store documents; keep them in memory instead
+        return _snapshot_bodies.get_or_compute(
+            (chapter_id, view), lambda: _get_compressed(db, chapter_id, view)
+        )
+    return _get_compressed(db, chapter_id, view)
+
+
+def _get_compressed(db: Session, chapter_id: int, view: str) -> Optional[bytes]:
+    with use_primary(db):
+        if not _has_table(db.connection()):
+            documents = build(db, chapter_id)
+            return _compress(documents[view]) if documents else None
+        row = db.execute(
+            select(_documents.c.body, _documents.c.stale, _documents.c.version)
+            .where(and_(_documents.c.chapter_id == chapter_id, _documents.c.view == view))
+        ).first()
+        if row is not None and not row.stale and row.body is not None:
+            return row.body
+        if snapshot.ENABLED or (row is None and reference_cache.chapters.get(db, chapter_id) is None):
+            documents = build(db, chapter_id)
+            return _compress(documents[view]) if documents else None
+
+    from config import SessionLocal
+    with SessionLocal() as writer, use_primary(writer):
+        try:
+            if row is None:
+                _add_placeholders(writer, chapter_id, (view,))
+            version = _versions(writer, chapter_id).get(view, (None,))[0]
+            # Built in a transaction started after any placeholder was committed
+            documents = build(writer, chapter_id)
+            body = _compress(documents[view]) if documents else None
+            _store(writer, chapter_id, {view: version}, {view: body} if documents else None)
+            writer.commit()
+            return body
+        except SQLAlchemyError:
+            writer.rollback()
+            logger.exception("Could not store chapter %s document", chapter_id)
+
+    # Serving a freshly built body matters more than caching it
+    with use_primary(db):
+        documents = build(db, chapter_id)
+    return _compress(documents[view]) if documents else None
+
+
+def response(request: Request, body: bytes) -> Response:
+    """Serve a stored body as-is to gzip-capable clients, decompressed otherwise."""
+    headers = {"Vary": "Accept-Encoding"}
+    if compression.negotiate(request.headers.get("accept-encoding"), (compression.GZIP,)):
+        headers["Content-Encoding"] = "gzip"
+        return Response(content=body, media_type="application/json", headers=headers)
+    return Response(content=gzip.decompress(body), media_type="application/json", headers=headers)
+
+
+def _affected_chapters(session: Session) -> Optional[Set[int]]:
+    """Chapters whose documents the pending flush changes; None means all of them."""
+    affected: Set[int] = set()
+    for instance in (*session.new, *session.dirty, *session.deleted):
+        if isinstance(instance, Character):
+            if instance in session.new:
+                continue  # not referenced by any chapter yet
+            return None
+        attribute = _CHAPTER_ATTRIBUTE.get(type(instance))
+        if attribute is None:
+            continue
+        history = get_history(instance, attribute)
+        for value in (*history.added, *history.unchanged, *history.deleted):
+            if value is not None:
+                affected.add(value)
+    return affected
+
+
+@event.listens_for(Session, "before_flush")
+def _collect_affected_chapters(session, flush_context, instances):
+    # History is only available before the flush resets it
+    affected = _affected_chapters(session)
+    pending = session.info.get("stale_chapters", set())
+    session.info["stale_chapters"] = None if affected is None or pending is None else pending | affected
+
+
+@event.listens_for(Session, "after_flush")
+def _mark_stale(session, flush_context):
+    affected = session.info.get("stale_chapters", set())
+    session.info["stale_chapters"] = set()
+    if affected is not None and not affected:
+        return
+    connection = session.connection()
+    if not _has_table(connection):
+        return
+    statement = update(_documents).values(stale=True, version=_documents.c.version + 1)
+    if affected is not None:
+        statement = statement.where(_documents.c.chapter_id.in_(sorted(affected)))
+    connection.execute(statement)
+
+
+class Rebuilder:
+    """Background thread rebuilding stale documents after contributing commits."""
+
+    def __init__(self):
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def schedule(self, changed_tables: Set[str]) -> None:
+        if changed_tables & CONTRIBUTING_TABLES:
+            self._wake.set()
+
+    def _run(self) -> None:
+        while True:
+            self._wake.wait()
+            if self._stop.is_set():
+                return
+            self._wake.clear()
+            try:
+                rebuild()
+            except SQLAlchemyError:
+                logger.exception("Rebuilding chapter documents failed")
+
+    def start(self) -> None:
+        self._stop.clear()
+        self._wake.set()  # build whatever is missing or stale at startup
+        self._thread = threading.Thread(target=self._run, name="chapter-documents", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        self._wake.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+
+rebuilder = Rebuilder()
+table_versions.subscribe(rebuilder.schedule)
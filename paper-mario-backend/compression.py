@@ -0,0 +1,215 @@
+"""Negotiated response compression.
+
+JSON from the joined endpoints (``/views/block-inventory``,
+``/queries/side-quests-full-details``, ...) repeats the same chapter names,
+location types and keys on every row. It shrinks severalfold when compressed.
+
+``CompressionMiddleware`` compresses responses of at least
+``COMPRESSION_MIN_BYTES`` with the best encoding the client accepts
+(``Accept-Encoding``, honouring ``q`` values). ``zstd`` is preferred when the
+optional ``zstandard`` package is installed, otherwise ``gzip`` is used.
+Streamed responses (for example NDJSON) are compressed chunk by chunk, each
+chunk flushed so the client can decode it on arrival. Server-Sent Events,
+already-encoded bodies and non-text media types are passed through.
+
+Cached responses are stored as a ``CompressedBody``, which compresses once
+in every supported encoding when the entry is created. A cache hit then
+sends stored bytes and is never compressed again; the middleware skips it
+because it already carries ``Content-Encoding``.
+"""
+import gzip
+import os
+import zlib
+from typing import Dict, Iterable, Optional, Tuple
+
+from fastapi import Request
+from fastapi.responses import Response
+from starlette.datastructures import Headers, MutableHeaders
+
+try:
+    import zstandard
+except ImportError:  # pragma: no cover - optional dependency
+    zstandard = None
+
+ENABLED = os.getenv("COMPRESSION", "1") != "0"
+MIN_BYTES = int(os.getenv("COMPRESSION_MIN_BYTES", "1024"))
+GZIP_LEVEL = int(os.getenv("COMPRESSION_GZIP_LEVEL", "6"))
+ZSTD_LEVEL = int(os.getenv("COMPRESSION_ZSTD_LEVEL", "3"))
+
+GZIP = "gzip"
+ZSTD = "zstd"
+
+# Supported encodings, preferred first
+ENCODINGS: Tuple[str, ...] = (ZSTD, GZIP) if zstandard is not None else (GZIP,)
+
+_COMPRESSIBLE = ("application/json", "application/x-ndjson", "application/javascript", "application/xml", "text/")
+_EVENT_STREAM = "text/event-stream"
+# Statuses that never have a body to compress
+_NO_BODY = (204, 304)
+
+
+def negotiate(accept_encoding: Optional[str], available: Iterable[str] = ENCODINGS) -> Optional[str]:
+    """The encoding to use for an ``Accept-Encoding`` value; None means identity."""
+    if not accept_encoding:
+        return None
+    weights: Dict[str, float] = {}
+    for part in accept_encoding.lower().split(","):
+        coding, _, params = part.partition(";")
+        coding = coding.strip()
+        weight = 1.0
+        for param in params.split(";"):
+            name, _, value = param.partition("=")
+            if name.strip() == "q":
+                try:
+                    weight = float(value)
+                except ValueError:
+                    weight = 0.0
+        if coding:
+            weights[coding] = weight
+    best, best_weight = None, 0.0
+    for encoding in available:
+        weight = weights.get(encoding, weights.get("*", 0.0))
+        # Ties keep the earlier (preferred) encoding
+        if weight > best_weight:
+            best, best_weight = encoding, weight
+    return best
+
+
+def compress(body: bytes, encoding: str) -> bytes:
+    if encoding == ZSTD:
+        return zstandard.ZstdCompressor(level=ZSTD_LEVEL).compress(body)
+    # mtime=0 keeps the output identical for identical bodies
+    return gzip.compress(body, compresslevel=GZIP_LEVEL, mtime=0)
+
+
+def decompress(body: bytes, encoding: str) -> bytes:
+    if encoding == ZSTD:
+        return zstandard.ZstdDecompressor().decompress(body)
+    return gzip.decompress(body)
+
+
+class _StreamEncoder:
+    """Incremental compressor whose every chunk can be decoded as soon as it arrives."""
+
+    def __init__(self, encoding: str):
+        if encoding == ZSTD:
+            self._compressor = zstandard.ZstdCompressor(level=ZSTD_LEVEL).compressobj()
+            self._sync = zstandard.COMPRESSOBJ_FLUSH_BLOCK
+        else:
+            # wbits 31: deflate with a gzip header and trailer
+            self._compressor = zlib.compressobj(GZIP_LEVEL, zlib.DEFLATED, 31)
+            self._sync = zlib.Z_SYNC_FLUSH
+
+    def chunk(self, data: bytes) -> bytes:
+        if not data:
+            return b""
+        return self._compressor.compress(data) + self._compressor.flush(self._sync)
+
+    def finish(self) -> bytes:
+        return self._compressor.flush()
+
+
+class CompressedBody:
+    """A response body compressed once, in every supported encoding, for caching."""
+
+    def __init__(self, body: bytes, media_type: str = "application/json"):
+        self.media_type = media_type
+        self.identity: Optional[bytes] = None
+        self.encoded: Dict[str, bytes] = {}
+        if ENABLED and len(body) >= MIN_BYTES:
+            self.encoded = {encoding: compress(body, encoding) for encoding in ENCODINGS}
+        else:
+            self.identity = body
+
+    def response(self, request: Request) -> Response:
+        """Serve the stored bytes in the encoding the client accepts."""
+        if self.identity is not None:
+            return Response(content=self.identity, media_type=self.media_type)
+        headers = {"Vary": "Accept-Encoding"}
+        encoding = negotiate(request.headers.get("accept-encoding"), self.encoded)
+        if encoding is None:
+            # Rare: a client without compression support pays for decompressing
+            return Response(content=decompress(self.encoded[GZIP], GZIP), media_type=self.media_type, headers=headers)
+        headers["Content-Encoding"] = encoding
+        return Response(content=self.encoded[encoding], media_type=self.media_type, headers=headers)
+
+
+def _compressible(headers: Headers) -> bool:
+    if "content-encoding" in headers:
+        return False
+    content_type = headers.get("content-type", "")
+    return content_type.startswith(_COMPRESSIBLE) and not content_type.startswith(_EVENT_STREAM)
+
+
+class _Responder:
+    """Compresses one response's ASGI messages on their way out."""
+
+    def __init__(self, send, encoding: str, minimum_size: int):
+        self._send = send
+        self.encoding = encoding
+        self.minimum_size = minimum_size
+        self._start: Optional[dict] = None
+        self._encoder: Optional[_StreamEncoder] = None
+        self._passthrough = False
+
+    def _encode_headers(self) -> MutableHeaders:
+        headers = MutableHeaders(raw=self._start["headers"])
+        headers["Content-Encoding"] = self.encoding
+        headers.add_vary_header("Accept-Encoding")
+        return headers
+
+    async def send(self, message) -> None:
+        if message["type"] == "http.response.start":
+            self._start = {**message, "headers": list(message.get("headers", []))}
+            if message["status"] in _NO_BODY or not _compressible(Headers(raw=self._start["headers"])):
+                self._passthrough = True
+                await self._send(message)
+            return
+        if message["type"] != "http.response.body" or self._passthrough:
+            await self._send(message)
+            return
+
+        body = message.get("body", b"")
+        more_body = message.get("more_body", False)
+        if self._encoder is not None:
+            data = self._encoder.chunk(body)
+            if not more_body:
+                data += self._encoder.finish()
+            await self._send({**message, "body": data})
+            return
+
+        if not more_body:
+            # The whole body in one message
+            if len(body) < self.minimum_size:
+                await self._send(self._start)
+                await self._send(message)
+                return
+            body = compress(body, self.encoding)
+            self._encode_headers()["Content-Length"] = str(len(body))
+            await self._send(self._start)
+            await self._send({**message, "body": body})
+            return
+
+        # A streamed body: its length is unknown, so compress as it goes
+        del self._encode_headers()["Content-Length"]
+        self._encoder = _StreamEncoder(self.encoding)
+        await self._send(self._start)
+        await self._send({**message, "body": self._encoder.chunk(body)})
+
+
+class CompressionMiddleware:
+    """Compress responses with the best encoding the client accepts."""
+
+    def __init__(self, app, minimum_size: int = MIN_BYTES):
+        self.app = app
+        self.minimum_size = minimum_size
+
+    async def __call__(self, scope, receive, send):
+        if not ENABLED or scope["type"] != "http" or scope["method"] == "HEAD":
+            await self.app(scope, receive, send)
+            return
+        encoding = negotiate(Headers(scope=scope).get("accept-encoding"))
+        if encoding is None:
+            await self.app(scope, receive, send)
+            return
+        await self.app(scope, receive, _Responder(send, encoding, self.minimum_size).send)
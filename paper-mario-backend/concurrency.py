@@ -0,0 +1,61 @@
+"""HTTP side of optimistic concurrency control.
+
+Every mutable model carries a ``version`` column (see ``config.Versioned``).
+Single-resource GET and PUT responses send it as a strong ``ETag``. PUT and
+DELETE honour ``If-Match``: a request whose tag does not match the row's
+current version fails with 412 Precondition Failed before anything is written.
+Because the ORM update is itself conditional on the version that was loaded
+(and matched), a concurrent write that lands between the check and the commit
+is also caught: it raises ``StaleDataError``, answered with 412 when the
+request carried ``If-Match`` and 409 Conflict otherwise.
+"""
+from typing import Any, Optional
+
+from fastapi import HTTPException, Request, Response, status
+from fastapi.responses import JSONResponse
+from sqlalchemy.orm.exc import StaleDataError
+
+# Attempts for a procedure whose rows keep changing under it (stored
+# procedures and group-commit batches re-run on StaleDataError)
+CAS_ATTEMPTS = 3
+
+
+def etag(obj: Any) -> Optional[str]:
+    """Strong entity tag for a versioned row (or reference snapshot row)."""
+    version = getattr(obj, "version", None)
+    return None if version is None else f'"{version}"'
+
+
+def set_etag(response: Response, obj: Any) -> None:
+    tag = etag(obj)
+    if tag is not None:
+        response.headers["ETag"] = tag
+
+
+def check_if_match(obj: Any, if_match: Optional[str]) -> None:
+    """Raise 412 unless ``If-Match`` is absent, ``*`` or lists the row's current tag."""
+    if if_match is None:
+        return
+    current = etag(obj)
+    candidates = [candidate.strip() for candidate in if_match.split(",")]
+    # If-Match uses strong comparison, so weak tags (W/"...") never match
+    if "*" in candidates or current in candidates:
+        return
+    raise HTTPException(
+        status_code=status.HTTP_412_PRECONDITION_FAILED,
+        detail=f"Resource has changed; current version is {current}",
+        headers={"ETag": current} if current else None
+    )
+
+
+async def stale_data_handler(request: Request, exc: StaleDataError) -> JSONResponse:
+    """A conditional UPDATE/DELETE matched no row: someone else wrote it first."""
+    if request.headers.get("if-match") is not None:
+        return JSONResponse(
+            status_code=status.HTTP_412_PRECONDITION_FAILED,
+            content={"detail": "Resource was modified concurrently; fetch it again and retry"}
+        )
+    return JSONResponse(
+        status_code=status.HTTP_409_CONFLICT,
+        content={"detail": "Resource was modified concurrently; retry the request"}
+    )
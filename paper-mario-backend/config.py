@@ -1,8 +1,15 @@
 """Database configuration."""
 import os
+from datetime import datetime
 from dotenv import load_dotenv
-from sqlalchemy import create_engine
-from sqlalchemy.orm import sessionmaker, declarative_base
+from fastapi import Request
+from sqlalchemy import Column, DateTime, Index, Integer, create_engine, func
+from sqlalchemy.orm import declarative_base, declared_attr, sessionmaker
+
+import replicas
+import slow_query_log
+import snapshot
+import table_versions
 
 # Load environment variables
 load_dotenv()
@@ -10,27 +17,77 @@ load_dotenv()
 # Get database URL from environment or use default SQLite
 DATABASE_URL = os.getenv("DATABASE_URL", "sqlite:///paper_mario.db")
 
-# Create engine
+# Create engine; SQL_ECHO=1 prints every statement while debugging, slow
+# statements are always recorded by slow_query_log
 engine = create_engine(
     DATABASE_URL,
-    echo=True,  # Set to False in production
+    echo=os.getenv("SQL_ECHO", "0").lower() in ("1", "true", "yes"),
     future=True
 )
+slow_query_log.install(engine)
+
+# Read replicas for GET traffic (REPLICA_URLS or SQLITE_REPLICAS); none by default
+replica_set = replicas.ReplicaSet.from_env(engine)
 
 # Create sessionmaker
 SessionLocal = sessionmaker(
+    class_=replicas.RoutingSession,
     autocommit=False,
     autoflush=False,
-    bind=engine
+    bind=engine,
+    replicas=replica_set
 )
 
 # Create declarative base
 Base = declarative_base()
 
 
-def get_db():
-    """Get database session."""
+class Versioned:
+    """
+    Optimistic concurrency for a mutable model.
+
+    Every ORM UPDATE or DELETE of the row is issued with ``WHERE version = <the
+    version that was loaded>`` and bumps it, so a row changed by someone else in
+    the meantime raises ``StaleDataError`` instead of being overwritten.
+    """
+    version = Column(Integer, nullable=False, server_default="1")
+
+    @declared_attr
+    def __mapper_args__(cls):
+        return {"version_id_col": cls.version}
+
+
+class Timestamped:
+    """
+    When a row was created and last modified (UTC), kept current by every ORM
+    and Core insert or update. ``updated_at`` is indexed so ``modified_since``
+    filters and ``Last-Modified`` lookups are range scans.
+    """
+    created_at = Column(
+        DateTime, nullable=False, default=datetime.utcnow, server_default=func.current_timestamp()
+    )
+
+    @declared_attr
+    def updated_at(cls):
+        column = Column(
+            DateTime, nullable=False, default=datetime.utcnow, onupdate=datetime.utcnow,
+            server_default=func.current_timestamp()
+        )
+        Index(f"idx_{cls.__tablename__}_updated_at", column)  # INDEX for delta sync
+        return column
+
+# Keep in-process caches coherent across workers through a shared
+# table_versions table (SHARED_CACHE_VERSIONS=0 for a single worker). A
+# worker serving a read-only snapshot only changes data by reloading it.
+if os.getenv("SHARED_CACHE_VERSIONS", "1") != "0" and not snapshot.ENABLED:
+    table_versions.install_shared(engine, Base.metadata)
+
+
+def get_db(request: Request = None):
+    """Get database session; read-only requests read from a replica if configured."""
+    table_versions.sync()
     db = SessionLocal()
+    replicas.bind_request(db, request.scope if request is not None else None)
     try:
         yield db
     finally:
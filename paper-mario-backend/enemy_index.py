@@ -0,0 +1,391 @@
+"""Columnar in-memory index of enemy stats.
+
+``GET /enemies/`` filters and sorts by hp, attack, defense and card_score.
+Through SQL every request pays for the query and for an ORM object per row,
+although the table is small and read far more often than written. Each
+worker therefore keeps the enemies in contiguous int64 arrays (NumPy when
+installed, the ``array`` module otherwise):
+
+- ``ids`` in ascending order, with ``character_id`` and the four stats in
+  parallel columns;
+- per stat, the sorted keys ``stat << 32 | enemy_id``. A range filter on that
+  stat is two binary searches, and the slice between them holds the matching
+  ids already in ``sort_by=<stat>`` order.
+
+A filter starts from the narrowest stat range and checks the other bounds on
+those candidates with vectorized comparisons; counts and sums are taken over
+the same candidates. Nothing is read from the database until the table
+changes.
+
+ORM writes to enemies update the arrays incrementally once their transaction
+commits, by removing and reinserting the changed rows' keys. Anything the
+index cannot follow exactly (a commit by another worker, concurrent local
+commits, a rolled-back savepoint) makes it reload from the database on next
+use, like the other version-keyed caches (see ``table_versions``).
+"""
+import os
+import threading
+from array import array
+from bisect import bisect_left, bisect_right
+from typing import Dict, Iterable, List, NamedTuple, Optional, Sequence, Tuple
+
+from sqlalchemy import event, inspect, select
+from sqlalchemy.orm import Session
+
+import table_versions
+from models import Enemy
+from replicas import use_primary
+
+try:
+    import numpy as np
+except ImportError:  # pragma: no cover - optional dependency
+    np = None
+
+ENABLED = os.getenv("ENEMY_INDEX", "1") != "0"
+
+STATS = ("hp", "attack", "defense", "card_score")
+COLUMNS = ("character_id",) + STATS
+TABLE = Enemy.__table__.name
+
+_SHIFT = 32
+_ID_MASK = (1 << _SHIFT) - 1
+# Stat bounds are clamped to 32 bits so every key fits in an int64
+_LOWEST = -(1 << 31)
+_HIGHEST = (1 << 31) - 1
+
+# Batches larger than this fraction of the table are applied by rebuilding
+_REBUILD_FRACTION = 8
+
+_PENDING_KEY = "enemy_index_changes"
+# Marks a transaction whose changes the index cannot replay
+_UNTRACKED = object()
+
+Ranges = Dict[str, Tuple[Optional[int], Optional[int]]]
+
+
+class EnemyRow(NamedTuple):
+    """One enemy as served by ``GET /enemies/``."""
+    enemy_id: int
+    character_id: int
+    hp: int
+    attack: int
+    defense: int
+    card_score: int
+
+
+# Array primitives: NumPy when available, the array module otherwise
+
+def _array(values: Iterable[int]):
+    if np is not None:
+        return np.fromiter(values, dtype=np.int64)
+    return array("q", values)
+
+
+def _copy(values):
+    return values.copy() if np is not None else array("q", values)
+
+
+def _search(values, value: int, right: bool = False) -> int:
+    """Index of the first element >= ``value`` (> ``value`` if ``right``) in a sorted array."""
+    if np is not None:
+        return int(np.searchsorted(values, value, side="right" if right else "left"))
+    return (bisect_right if right else bisect_left)(values, value)
+
+
+def _insert(values, index: int, value: int):
+    if np is not None:
+        return np.insert(values, index, value)
+    values.insert(index, value)
+    return values
+
+
+def _delete(values, index: int):
+    if np is not None:
+        return np.delete(values, index)
+    del values[index]
+    return values
+
+
+def _key(value: int, enemy_id: int) -> int:
+    return (int(value) << _SHIFT) | enemy_id
+
+
+def _keys(values, ids):
+    if np is not None:
+        return np.sort((values << _SHIFT) | ids)
+    return array("q", sorted(_key(value, enemy_id) for value, enemy_id in zip(values, ids)))
+
+
+def _clamp(bound: int) -> int:
+    return min(max(bound, _LOWEST), _HIGHEST)
+
+
+class _State:
+    """One immutable version of the index; replaced, never modified, once published."""
+
+    def __init__(self, ids, columns: Dict[str, Sequence[int]], keys: Dict[str, Sequence[int]], version: int):
+        self.ids = ids
+        self.columns = columns
+        self.keys = keys
+        self.version = version
+
+    @classmethod
+    def build(cls, rows: Iterable[EnemyRow], version: int) -> "_State":
+        rows = sorted(rows)
+        ids = _array(row.enemy_id for row in rows)
+        columns = {name: _array(getattr(row, name) for row in rows) for name in COLUMNS}
+        keys = {stat: _keys(columns[stat], ids) for stat in STATS}
+        return cls(ids, columns, keys, version)
+
+    def rows(self) -> List[EnemyRow]:
+        return self._rows(range(len(self.ids)))
+
+    def with_changes(self, changes: Dict[int, Optional[EnemyRow]], version: int) -> "_State":
+        """A new state with rows upserted (or deleted, for None)."""
+        if len(changes) > len(self.ids) // _REBUILD_FRACTION:
+            rows = {row.enemy_id: row for row in self.rows()}
+            for enemy_id, row in changes.items():
+                if row is None:
+                    rows.pop(enemy_id, None)
+                else:
+                    rows[enemy_id] = row
+            return _State.build(rows.values(), version)
+
+        ids = _copy(self.ids)
+        columns = {name: _copy(values) for name, values in self.columns.items()}
+        keys = {stat: _copy(values) for stat, values in self.keys.items()}
+        for enemy_id, row in changes.items():
+            position = _search(ids, enemy_id)
+            if position < len(ids) and ids[position] == enemy_id:
+                for stat in STATS:
+                    old = _key(columns[stat][position], enemy_id)
+                    keys[stat] = _delete(keys[stat], _search(keys[stat], old))
+                if row is None:
+                    ids = _delete(ids, position)
+                    for name in COLUMNS:
+                        columns[name] = _delete(columns[name], position)
+                    continue
+                for name in COLUMNS:
+                    columns[name][position] = getattr(row, name)
+            elif row is None:
+                continue
+            else:
+                ids = _insert(ids, position, enemy_id)
+                for name in COLUMNS:
+                    columns[name] = _insert(columns[name], position, getattr(row, name))
+            for stat in STATS:
+                new = _key(getattr(row, stat), enemy_id)
+                keys[stat] = _insert(keys[stat], _search(keys[stat], new), new)
+        return _State(ids, columns, keys, version)
+
+    # Queries
+
+    def _range(self, stat: str, low: Optional[int], high: Optional[int]) -> Tuple[int, int]:
+        """Slice of ``keys[stat]`` whose stat lies within [low, high]."""
+        keys = self.keys[stat]
+        start = 0 if low is None else _search(keys, _clamp(low) << _SHIFT)
+        stop = len(keys) if high is None else _search(keys, _key(_clamp(high), _ID_MASK), right=True)
+        return start, max(start, stop)
+
+    def _positions(self, ids):
+        if np is not None:
+            return np.searchsorted(self.ids, ids)
+        return [bisect_left(self.ids, enemy_id) for enemy_id in ids]
+
+    def _matching(self, ranges: Ranges):
+        """
+        Ids within every bound, and the stat they are ordered by ("enemy_id"
+        when no stat is bounded).
+        """
+        bounded = {
+            stat: bounds for stat, bounds in ranges.items()
+            if bounds[0] is not None or bounds[1] is not None
+        }
+        if not bounded:
+            return self.ids, "enemy_id"
+        slices = {stat: self._range(stat, *bounds) for stat, bounds in bounded.items()}
+        lead = min(slices, key=lambda stat: slices[stat][1] - slices[stat][0])
+        start, stop = slices[lead]
+        others = [(stat, bounds) for stat, bounds in bounded.items() if stat != lead]
+
+        if np is not None:
+            ids = self.keys[lead][start:stop] & _ID_MASK
+            if others and len(ids):
+                positions = self._positions(ids)
+                keep = np.ones(len(ids), dtype=bool)
+                for stat, (low, high) in others:
+                    values = self.columns[stat][positions]
+                    if low is not None:
+                        keep &= values >= low
+                    if high is not None:
+                        keep &= values <= high
+                ids = ids[keep]
+            return ids, lead
+
+        ids = [key & _ID_MASK for key in self.keys[lead][start:stop]]
+        if others and ids:
+            positions = self._positions(ids)
+            keep = [True] * len(ids)
+            for stat, (low, high) in others:
+                column = self.columns[stat]
+                for i, position in enumerate(positions):
+                    value = column[position]
+                    if (low is not None and value < low) or (high is not None and value > high):
+                        keep[i] = False
+            ids = [enemy_id for enemy_id, kept in zip(ids, keep) if kept]
+        return ids, lead
+
+    def _ordered(self, ids, ordered_by: str, sort_by: str):
+        """``ids`` in (sort_by, enemy_id) order."""
+        if ordered_by == sort_by:
+            return ids
+        if sort_by == "enemy_id":
+            return np.sort(ids) if np is not None else sorted(ids)
+        column = self.columns[sort_by]
+        if np is not None:
+            return _keys(column[self._positions(ids)], ids) & _ID_MASK
+        positions = self._positions(ids)
+        return [key & _ID_MASK for key in sorted(_key(column[p], i) for p, i in zip(positions, ids))]
+
+    def _rows(self, positions) -> List[EnemyRow]:
+        if np is not None:
+            positions = np.asarray(positions, dtype=np.int64)
+            values = [self.ids[positions].tolist()] + [self.columns[name][positions].tolist() for name in COLUMNS]
+            return [EnemyRow(*row) for row in zip(*values)]
+        columns = [self.ids] + [self.columns[name] for name in COLUMNS]
+        return [EnemyRow(*(column[p] for column in columns)) for p in positions]
+
+    def select(self, ranges: Ranges, sort_by: str, descending: bool,
+               skip: int, limit: Optional[int]) -> List[EnemyRow]:
+        ids, ordered_by = self._matching(ranges)
+        ids = self._ordered(ids, ordered_by, sort_by)
+        if descending:
+            ids = ids[::-1]
+        # Same as SQL: a negative offset is none, a negative limit no limit
+        skip = max(skip, 0)
+        page = ids[skip:] if limit is None or limit < 0 else ids[skip:skip + limit]
+        return self._rows(self._positions(page))
+
+    def summary(self, ranges: Ranges) -> Dict:
+        ids, _ = self._matching(ranges)
+        count = len(ids)
+        if np is not None:
+            positions = self._positions(ids)
+            sums = {stat: int(self.columns[stat][positions].sum()) for stat in STATS}
+        else:
+            positions = self._positions(ids)
+            sums = {stat: sum(self.columns[stat][p] for p in positions) for stat in STATS}
+        return {
+            "count": count,
+            "sum": sums,
+            "mean": {stat: total / count if count else None for stat, total in sums.items()},
+        }
+
+
+class EnemyIndex:
+    """The current index state, loaded lazily and kept up to date by commits."""
+
+    def __init__(self):
+        self._state: Optional[_State] = None
+        self._lock = threading.Lock()
+        self.loads = 0
+        self.incremental_updates = 0
+
+    def state(self, db: Session) -> _State:
+        """The up-to-date index, (re)loaded from the primary if the table changed."""
+        version = table_versions.current(TABLE)
+        state = self._state
+        if state is not None and state.version == version:
+            return state
+        with self._lock:
+            state = self._state
+            version = table_versions.current(TABLE)
+            if state is not None and state.version == version:
+                return state
+            # A commit during the load bumps the version past ``version``, so
+            # the next use loads again
+            with use_primary(db):
+                rows = db.execute(select(Enemy.enemy_id, *(getattr(Enemy, name) for name in COLUMNS))).all()
+            state = _State.build((EnemyRow(*row) for row in rows), version)
+            self._state = state
+            self.loads += 1
+            return state
+
+    def usable(self, db: Session) -> bool:
+        """Whether ``db`` may read enemies from the index: it has no uncommitted enemy writes."""
+        return TABLE not in table_versions.pending_tables(db)
+
+    def apply(self, changes) -> None:
+        """Replay a committed transaction's enemy writes (after table_versions bumped it)."""
+        with self._lock:
+            state = self._state
+            if state is None:
+                return
+            version = table_versions.current(TABLE)
+            if changes is _UNTRACKED or state.version + 1 != version:
+                # Another commit landed in between; start over on next use
+                self._state = None
+                return
+            self._state = state.with_changes(changes, version)
+            self.incremental_updates += 1
+
+    def metrics(self) -> Dict:
+        state = self._state
+        return {
+            "enabled": ENABLED,
+            "backend": "numpy" if np is not None else "array",
+            "rows": len(state.ids) if state is not None else None,
+            "version": state.version if state is not None else None,
+            "loads": self.loads,
+            "incremental_updates": self.incremental_updates,
+        }
+
+
+index = EnemyIndex()
+
+
+def _row(obj: Enemy) -> Optional[EnemyRow]:
+    # Reading an expired attribute here would emit SQL mid-flush
+    values = inspect(obj).dict
+    if any(values.get(name) is None for name in ("enemy_id",) + COLUMNS):
+        return None
+    return EnemyRow(values["enemy_id"], *(values[name] for name in COLUMNS))
+
+
+@event.listens_for(Session, "after_flush")
+def _collect_enemy_changes(session, flush_context):
+    changes = session.info.get(_PENDING_KEY)
+    if changes is _UNTRACKED:
+        return
+    for obj in (*session.new, *session.dirty, *session.deleted):
+        if not isinstance(obj, Enemy):
+            continue
+        if changes is None:
+            changes = session.info[_PENDING_KEY] = {}
+        if obj in session.deleted:
+            changes[inspect(obj).identity[0]] = None
+            continue
+        row = _row(obj)
+        if row is None:
+            session.info[_PENDING_KEY] = _UNTRACKED
+            return
+        changes[row.enemy_id] = row
+
+
+@event.listens_for(Session, "after_commit")
+def _apply_enemy_changes(session):
+    changes = session.info.pop(_PENDING_KEY, None)
+    if changes is not None:
+        index.apply(changes)
+
+
+@event.listens_for(Session, "after_soft_rollback")
+def _untrack_rolled_back_savepoint(session, previous_transaction):
+    # Writes undone by a savepoint rollback were already collected
+    if previous_transaction.nested and _PENDING_KEY in session.info:
+        session.info[_PENDING_KEY] = _UNTRACKED
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_enemy_changes(session):
+    session.info.pop(_PENDING_KEY, None)
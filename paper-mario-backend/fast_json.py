@@ -0,0 +1,112 @@
+"""Opt-in fast JSON path for large list responses.
+
+By default FastAPI validates every returned ORM row against the route's
+``response_model`` and then re-encodes the validated models with
+``jsonable_encoder`` and the stdlib encoder. Rows loaded straight from our own
+tables already satisfy the response schema, so for list endpoints that work
+is redundant. With ``FAST_JSON=1`` those endpoints instead copy each row's
+schema fields into a plain dict with a precompiled getter and encode the whole
+list once with orjson (or the stdlib encoder when orjson is not installed).
+Returning a ``Response`` makes FastAPI skip response-model validation; the
+``response_model`` is still used for the OpenAPI document.
+"""
+import datetime
+import decimal
+import enum
+import json
+import os
+import uuid
+from operator import attrgetter
+from typing import Any, Callable, Dict, Iterable, List, Optional, Type
+
+from fastapi.responses import Response
+from pydantic import BaseModel
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - optional dependency
+    orjson = None
+
+FAST_JSON_ENABLED = os.getenv("FAST_JSON", "0").lower() in ("1", "true", "yes")
+
+
+def _default(value: Any) -> Any:
+    """Encode the non-JSON types our models produce, matching Pydantic's output."""
+    if isinstance(value, enum.Enum):
+        return value.value
+    if isinstance(value, (datetime.datetime, datetime.date, datetime.time)):
+        return value.isoformat()
+    if isinstance(value, decimal.Decimal):
+        return float(value)
+    if isinstance(value, uuid.UUID):
+        return str(value)
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+if orjson is not None:
+    def dumps(content: Any) -> bytes:
+        return orjson.dumps(content, default=_default)
+else:
+    _encoder = json.JSONEncoder(
+        ensure_ascii=False, allow_nan=False, separators=(",", ":"), default=_default
+    )
+
+    def dumps(content: Any) -> bytes:
+        return _encoder.encode(content).encode("utf-8")
+
+
+class FastJSONResponse(Response):
+    """JSON response encoded with orjson when available, stdlib json otherwise."""
+    media_type = "application/json"
+
+    def render(self, content: Any) -> bytes:
+        return dumps(content)
+
+
+class RowSerializer:
+    """Precompiled ORM-row-to-dict converter for one response schema."""
+
+    def __init__(self, schema: Type[BaseModel]):
+        self.schema = schema
+        self.fields = tuple(schema.model_fields)
+        getter = attrgetter(*self.fields)
+        if len(self.fields) == 1:
+            # attrgetter with one name returns the bare value, not a tuple
+            self._values: Callable[[Any], tuple] = lambda row: (getter(row),)
+        else:
+            self._values = getter
+
+    def row(self, row: Any) -> Dict[str, Any]:
+        return dict(zip(self.fields, self._values(row)))
+
+    def rows(self, rows: Iterable[Any]) -> List[Dict[str, Any]]:
+        fields, values = self.fields, self._values
+        return [dict(zip(fields, values(row))) for row in rows]
+
+
+_serializers: Dict[Type[BaseModel], RowSerializer] = {}
+
+
+def serializer_for(schema: Type[BaseModel]) -> RowSerializer:
+    serializer = _serializers.get(schema)
+    if serializer is None:
+        serializer = _serializers[schema] = RowSerializer(schema)
+    return serializer
+
+
+def list_response(rows: List[Any], schema: Type[BaseModel], response: Optional[Response] = None):
+    """
+    Return ``rows`` from a list endpoint.
+
+    With the fast path enabled the rows are serialized without validation into
+    a ``FastJSONResponse``; otherwise they are returned unchanged for FastAPI's
+    usual ``response_model`` handling. Only use for rows read from the database.
+    Headers set on the endpoint's injected ``response`` (e.g. ``Last-Modified``)
+    are carried over, since FastAPI drops them when a ``Response`` is returned.
+    """
+    if not FAST_JSON_ENABLED:
+        return rows
+    headers = dict(response.headers) if response is not None else None
+    if headers is not None:
+        headers.pop("content-length", None)
+    return FastJSONResponse(serializer_for(schema).rows(rows), headers=headers)
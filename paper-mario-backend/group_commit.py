@@ -0,0 +1,227 @@
+"""Group commit for high-frequency small writes.
+
+SQLite has a single writer, and every commit waits for the journal to reach
+the disk. When each request commits its own transaction, a burst of small
+writes (for example ``POST /procedures/apply-status-effect``) is limited by
+commits per second, not by the work each one does.
+
+With ``GROUP_COMMIT=1`` those writes are handed to one background writer.
+It collects the operations submitted within ``GROUP_COMMIT_WINDOW_MS`` of
+the first one, up to ``GROUP_COMMIT_MAX_BATCH``. It runs each operation in
+its own SAVEPOINT and then commits them all in a single transaction. An
+operation that raises is rolled back to its savepoint without affecting the
+others in the batch. Each caller blocks until the batch has committed and
+gets its own result or exception. If the commit itself fails, the batch is
+retried one operation per transaction, so errors stay with their caller.
+
+An operation is a callable taking the writer's session. It must stage its
+changes without committing (see ``StoredProcedures.stage_status_effect``).
+Stopping the writer on shutdown commits everything already queued; writes
+submitted after that run in their own transaction on the caller's thread.
+"""
+import logging
+import os
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from typing import Any, Callable, Dict, List, Optional
+
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.orm import Session
+from sqlalchemy.orm.exc import StaleDataError
+
+from concurrency import CAS_ATTEMPTS
+
+logger = logging.getLogger("paper_mario.group_commit")
+
+ENABLED = os.getenv("GROUP_COMMIT", "0") == "1"
+WINDOW_MS = float(os.getenv("GROUP_COMMIT_WINDOW_MS", "5"))
+MAX_BATCH = int(os.getenv("GROUP_COMMIT_MAX_BATCH", "256"))
+
+Operation = Callable[[Session], Any]
+
+_STOP = object()
+
+
+class _Pending:
+    """A submitted operation and the future its caller waits on."""
+
+    def __init__(self, operation: Operation):
+        self.operation = operation
+        self.future: Future = Future()
+
+
+class WriteQueue:
+    """Background writer committing queued operations in batches."""
+
+    def __init__(self, window_ms: float, max_batch: int,
+                 session_factory: Optional[Callable[[], Session]] = None):
+        self.window = window_ms / 1000
+        self.max_batch = max_batch
+        self._session_factory = session_factory
+        self._queue: "queue.Queue" = queue.Queue()
+        self._lock = threading.Lock()
+        self._accepting = False
+        self._thread: Optional[threading.Thread] = None
+        self._stats_lock = threading.Lock()
+        self.reset()
+
+    @property
+    def running(self) -> bool:
+        return self._accepting
+
+    def run(self, operation: Operation) -> Any:
+        """Execute ``operation`` in the next batch and return its result (or raise its error)."""
+        pending = _Pending(operation)
+        with self._lock:
+            queued = self._accepting
+            if queued:
+                self._queue.put(pending)
+        if not queued:
+            # Not started or already stopped: commit it on its own
+            self._commit([pending])
+        return pending.future.result()
+
+    def _sessions(self) -> Session:
+        if self._session_factory is None:
+            from config import SessionLocal
+
+            self._session_factory = SessionLocal
+        return self._session_factory()
+
+    def _next_batch(self) -> Optional[List[_Pending]]:
+        """Block for the first operation, then gather more until the window closes; None on stop."""
+        first = self._queue.get()
+        if first is _STOP:
+            return None
+        batch = [first]
+        deadline = time.monotonic() + self.window
+        while len(batch) < self.max_batch:
+            remaining = deadline - time.monotonic()
+            try:
+                pending = self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if pending is _STOP:
+                # Requeue the sentinel so the loop exits after this batch
+                self._queue.put(_STOP)
+                break
+            batch.append(pending)
+        return batch
+
+    def _run(self) -> None:
+        while True:
+            batch = self._next_batch()
+            if batch is None:
+                return
+            try:
+                self._commit(batch)
+            except Exception as e:
+                # e.g. no connection could be opened; never leave a caller waiting
+                logger.exception("Group commit failed")
+                for pending in batch:
+                    if not pending.future.done():
+                        pending.future.set_exception(e)
+
+    @staticmethod
+    def _apply(db: Session, pending: _Pending):
+        """Run one operation inside a savepoint; returns (succeeded, result or exception)."""
+        error: BaseException = RuntimeError("operation was not attempted")
+        for _ in range(CAS_ATTEMPTS):
+            savepoint = db.begin_nested()
+            try:
+                result = pending.operation(db)
+                savepoint.commit()
+                return True, result
+            except StaleDataError as e:
+                # A row changed under it since it was loaded; run it again on fresh rows
+                savepoint.rollback()
+                db.expire_all()
+                error = e
+            except Exception as e:
+                savepoint.rollback()
+                return False, e
+        return False, error
+
+    @staticmethod
+    def _begin(db: Session) -> None:
+        connection = db.connection()
+        if connection.dialect.name == "sqlite":
+            # pysqlite does not open a transaction for SAVEPOINT, so each RELEASE
+            # would commit its operation on its own. Open it explicitly, taking
+            # the write lock up front.
+            connection.exec_driver_sql("BEGIN IMMEDIATE")
+
+    def _commit(self, batch: List[_Pending]) -> None:
+        with self._sessions() as db:
+            self._begin(db)
+            outcomes = [self._apply(db, pending) for pending in batch]
+            try:
+                db.commit()
+            except SQLAlchemyError as e:
+                db.rollback()
+                if len(batch) > 1:
+                    logger.warning("Group commit of %d operations failed; retrying one by one", len(batch))
+                    for pending in batch:
+                        self._commit([pending])
+                    return
+                outcomes = [(False, e)]
+        self._count(batch, outcomes)
+        for pending, (succeeded, value) in zip(batch, outcomes):
+            if succeeded:
+                pending.future.set_result(value)
+            else:
+                pending.future.set_exception(value)
+
+    def _count(self, batch: List[_Pending], outcomes) -> None:
+        with self._stats_lock:
+            self._batches += 1
+            self._operations += len(batch)
+            self._failed += sum(1 for succeeded, _ in outcomes if not succeeded)
+            self._largest_batch = max(self._largest_batch, len(batch))
+
+    def metrics(self) -> Dict:
+        """Committed batches, operations per batch and failed operations."""
+        with self._stats_lock:
+            return {
+                "enabled": self.running,
+                "window_ms": self.window * 1000,
+                "max_batch": self.max_batch,
+                "queued": self._queue.qsize(),
+                "batches": self._batches,
+                "operations": self._operations,
+                "failed_operations": self._failed,
+                "mean_batch_size": self._operations / self._batches if self._batches else 0.0,
+                "largest_batch": self._largest_batch,
+            }
+
+    def reset(self) -> None:
+        with self._stats_lock:
+            self._batches = 0
+            self._operations = 0
+            self._failed = 0
+            self._largest_batch = 0
+
+    def start(self) -> None:
+        with self._lock:
+            self._accepting = True
+        self._thread = threading.Thread(target=self._run, name="group-commit", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        """Stop accepting work, commit what is already queued and wait for the writer."""
+        with self._lock:
+            if not self._accepting:
+                return
+            self._accepting = False
+            self._queue.put(_STOP)
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        # Leave the queue empty for a later start()
+        while not self._queue.empty():
+            self._queue.get_nowait()
+
+
+writer = WriteQueue(WINDOW_MS, MAX_BATCH)
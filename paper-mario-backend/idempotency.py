@@ -0,0 +1,179 @@
+"""Idempotency-Key support for non-idempotent POST endpoints.
+
+A client that retries a POST after a timeout cannot tell whether the first
+attempt was applied. If it sends the same ``Idempotency-Key`` header on every
+attempt, only the first one executes; later ones get the stored response
+back, marked with ``Idempotent-Replayed: true``.
+
+``begin`` records the key in the request's own transaction before the
+procedure runs. A keyed request runs its procedure with ``commit=False``,
+and ``complete`` stores the response and commits. The writes, the key and
+the response are thus committed together, or not at all, in which case a
+retry executes again. Reusing a key with a different request is rejected
+with 422. A duplicate that arrives while the first is still running gets
+409 with ``Retry-After``: on SQLite the first holds the write lock until it
+commits, so the duplicate's claim waits out the busy timeout and is then
+answered the same way.
+
+Keys expire after ``IDEMPOTENCY_TTL_SECONDS`` (default one day). A background
+thread prunes expired keys every ``IDEMPOTENCY_PRUNE_SECONDS``.
+"""
+import hashlib
+import json
+import logging
+import os
+import threading
+from datetime import datetime, timedelta
+from typing import Any, Optional
+
+from fastapi import HTTPException, status
+from fastapi.responses import Response
+from pydantic import BaseModel
+from sqlalchemy import delete
+from sqlalchemy.exc import IntegrityError, OperationalError, SQLAlchemyError
+from sqlalchemy.orm import Session
+
+from fast_json import dumps
+from models import IdempotencyKey
+
+logger = logging.getLogger("paper_mario.idempotency")
+
+TTL_SECONDS = int(os.getenv("IDEMPOTENCY_TTL_SECONDS", str(24 * 60 * 60)))
+PRUNE_SECONDS = float(os.getenv("IDEMPOTENCY_PRUNE_SECONDS", "300"))
+
+MAX_KEY_LENGTH = IdempotencyKey.key.type.length
+
+
+def request_hash(operation: str, body: BaseModel) -> str:
+    """Fingerprint of a request, so a key cannot be reused for a different one."""
+    payload = json.dumps(body.model_dump(mode="json"), sort_keys=True, separators=(",", ":"))
+    return hashlib.sha256(f"{operation}\n{payload}".encode("utf-8")).hexdigest()
+
+
+def _in_progress() -> HTTPException:
+    return HTTPException(
+        status_code=status.HTTP_409_CONFLICT,
+        detail="A request with this Idempotency-Key is still being processed",
+        headers={"Retry-After": "1"}
+    )
+
+
+def _replay(record: Optional[IdempotencyKey], fingerprint: str) -> Response:
+    if record is not None and record.request_hash != fingerprint:
+        raise HTTPException(
+            # HTTP_422_UNPROCESSABLE_ENTITY is deprecated, and older Starlette
+            # releases lack its replacement
+            status_code=422,
+            detail="Idempotency-Key was already used for a different request"
+        )
+    if record is None or record.status_code is None:
+        raise _in_progress()
+    return Response(
+        content=record.response_body,
+        status_code=record.status_code,
+        media_type="application/json",
+        headers={"Idempotent-Replayed": "true"}
+    )
+
+
+def begin(db: Session, key: Optional[str], operation: str, body: BaseModel) -> Optional[Response]:
+    """
+    Claim ``key`` for this ``operation`` (endpoint) and request body, or return
+    the stored response of an earlier request with the same key.
+
+    Returns None when the request should execute (also when no key was sent).
+    """
+    if key is None:
+        return None
+    if not key or len(key) > MAX_KEY_LENGTH:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Idempotency-Key must be 1 to {MAX_KEY_LENGTH} characters"
+        )
+
+    fingerprint = request_hash(operation, body)
+    now = datetime.utcnow()
+    record = db.get(IdempotencyKey, key)
+    if record is not None and record.expires_at <= now:
+        db.delete(record)
+        record = None
+    if record is not None:
+        return _replay(record, fingerprint)
+
+    db.add(IdempotencyKey(
+        key=key, request_hash=fingerprint, created_at=now,
+        expires_at=now + timedelta(seconds=TTL_SECONDS)
+    ))
+    try:
+        db.flush()
+    except IntegrityError:
+        # A concurrent request with the same key committed first
+        db.rollback()
+        return _replay(db.get(IdempotencyKey, key), fingerprint)
+    except OperationalError as error:
+        # SQLite: another writer, typically the first request with this key,
+        # held the write lock past the busy timeout
+        if "database is locked" not in str(error.orig):
+            raise
+        db.rollback()
+        raise _in_progress()
+    return None
+
+
+def complete(db: Session, key: Optional[str], operation: str, body: BaseModel,
+             result: Any, status_code: int = status.HTTP_200_OK) -> None:
+    """Store the response of a request that executed under ``key``, committing it with the request's writes."""
+    if key is None:
+        return
+    now = datetime.utcnow()
+    # merge: a procedure that rolled back and retried (compare-and-swap) also
+    # discarded the row added by begin()
+    db.merge(IdempotencyKey(
+        key=key, request_hash=request_hash(operation, body),
+        status_code=status_code, response_body=dumps(result),
+        created_at=now, expires_at=now + timedelta(seconds=TTL_SECONDS)
+    ))
+    db.commit()
+
+
+def prune() -> int:
+    """Delete expired keys; returns how many were removed."""
+    from config import SessionLocal
+
+    with SessionLocal() as db:
+        removed = db.execute(
+            delete(IdempotencyKey).where(IdempotencyKey.expires_at <= datetime.utcnow())
+        ).rowcount
+        db.commit()
+    return removed
+
+
+class Pruner:
+    """Background thread deleting expired idempotency keys."""
+
+    def __init__(self, interval: float):
+        self.interval = interval
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval):
+            try:
+                prune()
+            except SQLAlchemyError:
+                # Busy database or table not created yet; the next round retries
+                logger.exception("Pruning idempotency keys failed")
+
+    def start(self) -> None:
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="idempotency-pruner", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+
+pruner = Pruner(PRUNE_SECONDS)
@@ -0,0 +1,449 @@
+"""Index advisor: audit the model indexes against a replayed workload.
+
+Copies a SQLite database into memory, replays a workload against the copy and
+reports, from SQLite's own query plans:
+
+- missing indexes: statements that scan a table although a predicate column
+  could be searched; every candidate index is created on the copy and kept
+  only if the planner then actually uses it
+- unused indexes: indexes no replayed statement's plan mentions
+- redundant indexes: indexes whose columns duplicate, or are a leading prefix
+  of, another index or the primary key on the same table
+
+Each index is reported with its measured write amplification: the extra time
+per inserted row it costs, relative to inserting into the bare table, measured
+on a constraint-free scratch copy of the table's rows.
+
+The workload is every GET endpoint of the API, called once plainly and once
+per optional filter parameter, and/or statements recorded by the slow-query
+log (the JSON from ``GET /admin/slow-queries``).
+
+    python index_advisor.py [--database paper_mario.db] [--slow-queries dump.json]
+                            [--no-endpoints] [--rows 5000] [--json]
+"""
+import argparse
+import json
+import re
+import sqlite3
+import time
+from collections import Counter, defaultdict
+from typing import Dict, List, Optional, Tuple
+
+from sqlalchemy import create_engine, event
+from sqlalchemy.engine import make_url
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from config import DATABASE_URL
+
+CANDIDATE_PREFIX = "advisor_candidate"
+
+# Plan details naming an index: "SEARCH t USING INDEX idx (a=?)", "SCAN t USING COVERING INDEX idx"
+_PLAN_INDEX = re.compile(r"USING (?:COVERING )?INDEX (\w+)")
+_PLAN_SCAN = re.compile(r"^SCAN (\w+)(?: AS (\w+))?$")
+_TABLE_REF = re.compile(r"\b(?:FROM|JOIN)\s+(\w+)(?:\s+(?:AS\s+)?(?!ON\b|WHERE\b|JOIN\b|LEFT\b|INNER\b|GROUP\b|ORDER\b|LIMIT\b)(\w+))?", re.I)
+_PREDICATE_CLAUSE = re.compile(r"\b(?:WHERE|ON|ORDER BY|GROUP BY)\b(.*)", re.I | re.S)
+
+
+class Database:
+    """In-memory copy of the database being audited."""
+
+    def __init__(self, path: str):
+        self.engine = create_engine(
+            "sqlite://",
+            connect_args={"check_same_thread": False},
+            poolclass=StaticPool
+        )
+        self.raw = self.engine.raw_connection().dbapi_connection
+        source = sqlite3.connect(path)
+        source.backup(self.raw)
+        source.close()
+        self.raw.execute("ANALYZE")
+
+    def tables(self) -> List[str]:
+        return [row[0] for row in self.raw.execute(
+            "SELECT name FROM sqlite_master WHERE type = 'table' AND name NOT LIKE 'sqlite_%' ORDER BY name"
+        )]
+
+    def views(self) -> Dict[str, str]:
+        return dict(self.raw.execute("SELECT name, sql FROM sqlite_master WHERE type = 'view'"))
+
+    def columns(self, table: str) -> List[str]:
+        return [row[1] for row in self.raw.execute(f'PRAGMA table_info("{table}")')]
+
+    def rowid_pk(self, table: str) -> Optional[str]:
+        """The INTEGER PRIMARY KEY column aliasing the rowid, if any."""
+        pk = [row for row in self.raw.execute(f'PRAGMA table_info("{table}")') if row[5]]
+        if len(pk) == 1 and pk[0][2].upper() == "INTEGER":
+            return pk[0][1]
+        return None
+
+    def indexes(self) -> List[Dict]:
+        """Every index with its table, columns, uniqueness and origin (c, u or pk)."""
+        result = []
+        for table in self.tables():
+            for _, name, unique, origin, partial in self.raw.execute(f'PRAGMA index_list("{table}")'):
+                columns = [row[2] for row in self.raw.execute(f'PRAGMA index_info("{name}")')]
+                result.append({
+                    "name": name, "table": table, "columns": columns,
+                    "unique": bool(unique), "origin": origin, "partial": bool(partial)
+                })
+        return result
+
+    def plan(self, statement: str, parameters=()) -> List[str]:
+        return [row[3] for row in self.raw.execute(f"EXPLAIN QUERY PLAN {statement}", parameters)]
+
+
+def replay_endpoints(db: Database) -> List[Tuple[str, tuple]]:
+    """Call every GET endpoint against the copy and capture the SQL it runs."""
+    from fastapi.testclient import TestClient
+
+    from config import get_db
+    from main import app, routers
+
+    captured = []
+
+    @event.listens_for(db.engine, "before_cursor_execute")
+    def capture(conn, cursor, statement, parameters, context, executemany):
+        if not executemany:
+            captured.append((statement, tuple(parameters) if isinstance(parameters, (list, tuple)) else parameters))
+
+    Session = sessionmaker(bind=db.engine, autoflush=False)
+
+    def get_copy_db():
+        session = Session()
+        try:
+            yield session
+        finally:
+            session.close()
+
+    routers.load_all()
+    app.dependency_overrides[get_db] = get_copy_db
+    client = TestClient(app)
+    schema = app.openapi()
+
+    def enum_value(param_schema):
+        for option in param_schema.get("anyOf", [param_schema]):
+            ref = option.get("$ref")
+            if ref:
+                values = schema["components"]["schemas"][ref.rsplit("/", 1)[-1]].get("enum")
+                if values:
+                    return values[0]
+            if option.get("type") == "integer":
+                return 1
+            if option.get("type") == "boolean":
+                return "true"
+        return None
+
+    def streams(operation):
+        # Server-Sent Events streams never end, so they cannot be replayed
+        content = operation.get("responses", {}).get("200", {}).get("content", {})
+        return "text/event-stream" in content
+
+    try:
+        for path, operations in schema["paths"].items():
+            operation = operations.get("get")
+            if operation is None or path.startswith("/admin") or streams(operation):
+                continue
+            params = operation.get("parameters", [])
+            url = re.sub(r"\{\w+\}", "1", path)
+            variants = [{}]
+            for param in params:
+                if param["in"] == "query" and not param.get("required") and param["name"] not in ("skip", "limit"):
+                    value = enum_value(param["schema"])
+                    if value is not None:
+                        variants.append({param["name"]: value})
+            for query in variants:
+                client.get(url, params=query)
+    finally:
+        app.dependency_overrides.pop(get_db, None)
+        event.remove(db.engine, "before_cursor_execute", capture)
+
+    return [(s, p) for s, p in captured if s.lstrip()[:6].upper() in ("SELECT", "WITH")]
+
+
+def load_slow_queries(path: str) -> List[Tuple[str, tuple]]:
+    with open(path, encoding="utf-8") as f:
+        data = json.load(f)
+    records = data.get("queries", []) if isinstance(data, dict) else data
+    statements = []
+    for record in records:
+        params = record.get("parameters") or ()
+        if isinstance(params, list):
+            params = tuple(params)
+        statements.append((record["statement"], params))
+    return statements
+
+
+def _aliases(statement: str, views: Dict[str, str]) -> Dict[str, str]:
+    """Map every table name and alias in the statement (and views it reads) to its table."""
+    sources = [statement] + [sql for name, sql in views.items() if re.search(rf"\b{name}\b", statement)]
+    aliases = {}
+    for sql in sources:
+        for table, alias in _TABLE_REF.findall(sql):
+            aliases[table] = table
+            if alias:
+                aliases[alias] = table
+    return aliases
+
+
+def _predicate_columns(statement: str, views: Dict[str, str], names: List[str],
+                       table_columns: Optional[List[str]] = None) -> List[str]:
+    """
+    Columns of one table referenced in WHERE/ON/ORDER BY/GROUP BY clauses.
+
+    References are qualified by one of ``names``; ``table_columns`` also
+    accepts bare column names, for statements that read a single table.
+    """
+    sources = [statement] + [sql for name, sql in views.items() if re.search(rf"\b{name}\b", statement)]
+    columns = []
+    for sql in sources:
+        match = _PREDICATE_CLAUSE.search(sql)
+        if not match:
+            continue
+        clause = match.group(1)
+        found = [column for name in names for column in re.findall(rf"\b{re.escape(name)}\.(\w+)", clause)]
+        for column in table_columns or ():
+            if re.search(rf"(?<![.\w]){re.escape(column)}\b", clause):
+                found.append(column)
+        for column in found:
+            if column not in columns:
+                columns.append(column)
+    return columns
+
+
+def find_missing(db: Database, workload: Counter) -> List[Dict]:
+    """Table scans the planner would turn into index searches given a new index."""
+    views = db.views()
+    tables = set(db.tables())
+    findings = {}
+    for (statement, params), count in workload.items():
+        try:
+            plan = db.plan(statement, params)
+        except sqlite3.Error:
+            continue
+        aliases = _aliases(statement, views)
+        for detail in plan:
+            scan = _PLAN_SCAN.match(detail)
+            if not scan:
+                continue
+            table = aliases.get(scan.group(2) or scan.group(1), scan.group(1))
+            if table not in tables:
+                continue
+            names = [name for name, target in aliases.items() if target == table]
+            single_table = len(set(aliases.values())) == 1
+            columns = [c for c in _predicate_columns(statement, views, names,
+                                                     db.columns(table) if single_table else None)
+                       if c != db.rowid_pk(table)]
+            candidates = [[c] for c in columns] + [[a, b] for a in columns for b in columns if a != b]
+            best = _best_candidate(db, table, candidates, statement, params)
+            if best is None:
+                continue
+            key = (table, tuple(best["columns"]))
+            name = f"idx_{table}_{'_'.join(best['columns'])}"
+            finding = findings.setdefault(key, {
+                "table": table,
+                "columns": best["columns"],
+                "ddl": f"CREATE INDEX {name} ON {table} ({', '.join(best['columns'])})",
+                "statements": 0,
+                "executions": 0,
+                "example": statement,
+                "plan_before": plan,
+                "plan_after": [re.sub(rf"\b{CANDIDATE_PREFIX}_\d\b", name, d) for d in best["plan"]],
+            })
+            finding["statements"] += 1
+            finding["executions"] += count
+    return sorted(findings.values(), key=lambda f: -f["executions"])
+
+
+def _best_candidate(db: Database, table: str, candidates, statement, params) -> Optional[Dict]:
+    """Smallest candidate index the planner uses to search instead of scan ``table``."""
+    for columns in candidates:
+        name = f"{CANDIDATE_PREFIX}_{len(columns)}"
+        db.raw.execute(f'CREATE INDEX {name} ON "{table}" ({", ".join(columns)})')
+        try:
+            plan = db.plan(statement, params)
+        finally:
+            db.raw.execute(f"DROP INDEX {name}")
+        if any(detail.startswith("SEARCH") and f"INDEX {name}" in detail for detail in plan):
+            return {"columns": columns, "plan": plan}
+    return None
+
+
+def index_usage(db: Database, workload: Counter) -> Counter:
+    """How many replayed executions each index appears in the plan of."""
+    usage = Counter()
+    for (statement, params), count in workload.items():
+        try:
+            plan = db.plan(statement, params)
+        except sqlite3.Error:
+            continue
+        for name in {m for detail in plan for m in _PLAN_INDEX.findall(detail)}:
+            usage[name] += count
+    return usage
+
+
+def find_redundant(db: Database, indexes: List[Dict]) -> Dict[str, str]:
+    """Map redundant index name -> the index or key that already provides it."""
+    redundant = {}
+    by_table = defaultdict(list)
+    for index in indexes:
+        if not index["partial"]:
+            by_table[index["table"]].append(index)
+
+    for table, table_indexes in by_table.items():
+        pk = db.rowid_pk(table)
+        for index in table_indexes:
+            if index["origin"] != "c":
+                continue  # backs a UNIQUE or PRIMARY KEY constraint
+            if pk and index["columns"] == [pk]:
+                redundant[index["name"]] = f"INTEGER PRIMARY KEY {table}.{pk}"
+                continue
+            for other in table_indexes:
+                if other is index or other["name"] in redundant:
+                    continue
+                same = other["columns"] == index["columns"]
+                prefix = other["columns"][:len(index["columns"])] == index["columns"]
+                if (same and (other["origin"] != "c" or other["unique"] >= index["unique"])) or \
+                        (prefix and not same and not index["unique"]):
+                    redundant[index["name"]] = f"{other['name']} ({', '.join(other['columns'])})"
+                    break
+    return redundant
+
+
+def _time_inserts(db: Database, scratch: str, source: str, rows: int, repeat: int) -> float:
+    """Best seconds to insert ``rows`` copies of ``source`` rows into ``scratch``."""
+    best = float("inf")
+    for _ in range(repeat):
+        db.raw.execute("SAVEPOINT advisor_insert")
+        start = time.perf_counter()
+        db.raw.execute(
+            f'INSERT INTO {scratch} SELECT s.* FROM "{source}" AS s, '
+            f"(WITH RECURSIVE n(i) AS (SELECT 1 UNION ALL SELECT i + 1 FROM n LIMIT ?) SELECT i FROM n) "
+            f"LIMIT ?",
+            (rows, rows)
+        )
+        best = min(best, time.perf_counter() - start)
+        db.raw.execute("ROLLBACK TO advisor_insert")
+        db.raw.execute("RELEASE advisor_insert")
+    return best
+
+
+def write_amplification(db: Database, indexes: List[Dict], rows: int, repeat: int = 3) -> Dict[str, Dict]:
+    """Extra insert cost per index, measured one index at a time on a scratch table."""
+    results = {}
+    for table in db.tables():
+        if not db.raw.execute(f'SELECT 1 FROM "{table}" LIMIT 1').fetchone():
+            continue
+        scratch = f"advisor_scratch_{table}"
+        db.raw.execute(f'CREATE TEMP TABLE {scratch} AS SELECT * FROM "{table}" WHERE 0')
+        try:
+            base = _time_inserts(db, scratch, table, rows, repeat)
+            for index in indexes:
+                if index["table"] != table or not index["columns"] or None in index["columns"]:
+                    continue
+                db.raw.execute(f'CREATE INDEX temp.advisor_scratch_index ON {scratch} ({", ".join(index["columns"])})')
+                try:
+                    with_index = _time_inserts(db, scratch, table, rows, repeat)
+                finally:
+                    db.raw.execute("DROP INDEX temp.advisor_scratch_index")
+                results[index["name"]] = {
+                    "extra_us_per_row": round(max(0.0, with_index - base) / rows * 1e6, 3),
+                    "amplification": round(with_index / base, 2) if base else None,
+                }
+        finally:
+            db.raw.execute(f"DROP TABLE {scratch}")
+    return results
+
+
+def audit(db: Database, statements: List[Tuple[str, tuple]], rows: int) -> Dict:
+    workload = Counter(statements)
+    indexes = db.indexes()
+    usage = index_usage(db, workload)
+    redundant = find_redundant(db, indexes)
+    amplification = write_amplification(db, indexes, rows)
+
+    report_indexes = []
+    for index in indexes:
+        report_indexes.append({
+            **index,
+            "uses": usage.get(index["name"], 0),
+            "redundant_with": redundant.get(index["name"]),
+            **amplification.get(index["name"], {"extra_us_per_row": None, "amplification": None}),
+        })
+
+    return {
+        "workload": {"executions": sum(workload.values()), "distinct_statements": len(workload)},
+        "missing": find_missing(db, workload),
+        "unused": [i for i in report_indexes if not i["uses"] and i["origin"] == "c"],
+        "redundant": [i for i in report_indexes if i["redundant_with"]],
+        "indexes": report_indexes,
+    }
+
+
+def _cost(index: Dict) -> str:
+    if index["amplification"] is None:
+        return "write cost n/a (empty table)"
+    return f"+{index['extra_us_per_row']:.2f} µs/row insert, {index['amplification']:.2f}x"
+
+
+def print_report(report: Dict, rows: int) -> None:
+    workload = report["workload"]
+    print(f"Replayed {workload['executions']} statement executions "
+          f"({workload['distinct_statements']} distinct)")
+    print(f"Write cost: inserting {rows} rows per table, each index alone vs. no index\n")
+
+    print(f"Missing indexes ({len(report['missing'])})")
+    for finding in report["missing"]:
+        print(f"  {finding['ddl']}")
+        print(f"    {finding['executions']} executions of {finding['statements']} statements, e.g.")
+        print(f"      {' '.join(finding['example'].split())[:160]}")
+        print(f"    before: {'; '.join(finding['plan_before'])}")
+        print(f"    after:  {'; '.join(finding['plan_after'])}")
+
+    print(f"\nRedundant indexes ({len(report['redundant'])})")
+    for index in report["redundant"]:
+        print(f"  {index['name']} ({', '.join(index['columns'])}) duplicated by "
+              f"{index['redundant_with']}; {_cost(index)}")
+
+    print(f"\nUnused indexes ({len(report['unused'])})")
+    for index in report["unused"]:
+        print(f"  {index['name']} on {index['table']} ({', '.join(index['columns'])}); {_cost(index)}")
+
+    print("\nAll indexes")
+    for index in sorted(report["indexes"], key=lambda i: (i["table"], i["name"])):
+        flags = "unique " if index["unique"] else ""
+        print(f"  {index['table']:<26} {index['name']:<46} {flags}uses={index['uses']:<5} {_cost(index)}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    default_db = make_url(DATABASE_URL).database if DATABASE_URL.startswith("sqlite") else None
+    parser.add_argument("--database", default=default_db, help="SQLite database file to audit (copied, never modified)")
+    parser.add_argument("--slow-queries", help="JSON saved from GET /admin/slow-queries to replay")
+    parser.add_argument("--no-endpoints", action="store_true", help="Do not replay the API's GET endpoints")
+    parser.add_argument("--rows", type=int, default=5000, help="Rows inserted per table to measure write cost")
+    parser.add_argument("--json", action="store_true", help="Print the report as JSON")
+    args = parser.parse_args()
+
+    if not args.database:
+        parser.error("the index advisor reads SQLite query plans; pass --database with a SQLite file")
+
+    db = Database(args.database)
+    statements = []
+    if not args.no_endpoints:
+        statements += replay_endpoints(db)
+    if args.slow_queries:
+        statements += load_slow_queries(args.slow_queries)
+    if not statements:
+        parser.error("no workload: replay endpoints or pass --slow-queries")
+
+    report = audit(db, statements, args.rows)
+    if args.json:
+        print(json.dumps(report, indent=2))
+    else:
+        print_report(report, args.rows)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,4 +1,6 @@
 """Initialize the database with all tables."""
+from sqlalchemy import inspect, select, text
+
 from config import Base, engine
 from models import (
     Character, PlayableCharacter, Chapter, Location, Pixl,
@@ -8,6 +10,42 @@ from models import (
 )
 
 
+def create_missing_indexes():
+    """Create any model index that is missing from an existing database."""
+    for table in Base.metadata.sorted_tables:
+        for index in table.indexes:
+            index.create(bind=engine, checkfirst=True)
+
+
+def add_missing_columns():
+    """
+    Add model columns missing from existing tables (e.g. ``version``).
+
+    Only columns with a server default can be added this way, which is how
+    such columns are declared. SQLite cannot add a column whose default is an
+    expression, so existing rows get the expression's current value instead
+    (``updated_at``: the time of the migration).
+    """
+    inspector = inspect(engine)
+    with engine.begin() as conn:
+        for table in Base.metadata.sorted_tables:
+            if not inspector.has_table(table.name):
+                continue
+            existing = {column["name"] for column in inspector.get_columns(table.name)}
+            for column in table.columns:
+                if column.name in existing or column.server_default is None:
+                    continue
+                column_type = column.type.compile(dialect=engine.dialect)
+                default = column.server_default.arg
+                if not isinstance(default, str):
+                    default = "'{}'".format(conn.scalar(select(default)))
+                nullability = "" if column.nullable else " NOT NULL"
+                conn.execute(text(
+                    f"ALTER TABLE {table.name} ADD COLUMN {column.name} "
+                    f"{column_type}{nullability} DEFAULT {default}"
+                ))
+
+
 def init_database():
     """Create all tables in the database."""
     print("Creating database tables...")
@@ -18,6 +56,10 @@ def init_database():
     # Create all tables
     Base.metadata.create_all(bind=engine)
     
+    # Create columns and indexes added to models after their tables already existed
+    add_missing_columns()
+    create_missing_indexes()
+    
     print("✓ Database tables created successfully!")
     print("\nTables created:")
     print("  - characters")
@@ -37,6 +79,10 @@ def init_database():
     print("  - switches")
     print("  - side_quests")
     print("  - quest_character")
+    print("  - table_versions")
+    print("  - chapter_documents")
+    print("  - idempotency_keys")
+    print("  - change_log")
     print("\n✓ All constraints and indexes have been applied!")
 
 
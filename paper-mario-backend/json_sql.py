@@ -0,0 +1,97 @@
+"""Build nested JSON documents in the database.
+
+One-to-many endpoints used to outer-join the "many" side, receive one row per
+child and regroup the rows into nested dicts in Python. With these helpers the
+query instead returns one JSON text per parent, with its children already
+aggregated into an array, and ``array_body`` joins the texts into the
+response body without decoding them. The expressions are typed as text so
+SQLAlchemy does not decode them either.
+
+``json_object`` and ``json_array_agg`` compile to ``json_object`` /
+``json_group_array`` on SQLite, ``json_build_object`` / ``json_agg`` on
+PostgreSQL and ``JSON_OBJECT`` / ``JSON_ARRAYAGG`` on MySQL.
+"""
+from typing import Iterable
+
+from sqlalchemy import literal
+from sqlalchemy.ext.compiler import compiles
+from sqlalchemy.sql.functions import FunctionElement
+from sqlalchemy.types import Text
+
+from fast_json import dumps
+
+
+class json_object(FunctionElement):
+    """``json_object(key, value, ...)`` from alternating keys and column expressions."""
+    type = Text()
+    inherit_cache = True
+
+    def __init__(self, *pairs):
+        if len(pairs) % 2:
+            raise ValueError("json_object takes alternating keys and values")
+        clauses = [
+            literal(item) if i % 2 == 0 else item
+            for i, item in enumerate(pairs)
+        ]
+        super().__init__(*clauses)
+
+
+class json_array_agg(FunctionElement):
+    """Aggregate an expression into a JSON array; ``[]`` (not NULL) for no rows."""
+    type = Text()
+    inherit_cache = True
+
+
+class json_value(FunctionElement):
+    """Embed JSON text produced by a subquery as JSON rather than as a string."""
+    type = Text()
+    inherit_cache = True
+
+
+@compiles(json_object)
+def _json_object(element, compiler, **kw):
+    return f"json_object({compiler.process(element.clauses, **kw)})"
+
+
+@compiles(json_object, "postgresql")
+def _json_object_postgresql(element, compiler, **kw):
+    return f"json_build_object({compiler.process(element.clauses, **kw)})"
+
+
+@compiles(json_array_agg)
+def _json_array_agg(element, compiler, **kw):
+    # json_group_array already returns '[]' for an empty group
+    return f"json_group_array({compiler.process(element.clauses, **kw)})"
+
+
+@compiles(json_array_agg, "postgresql")
+def _json_array_agg_postgresql(element, compiler, **kw):
+    return f"coalesce(json_agg({compiler.process(element.clauses, **kw)}), '[]'::json)"
+
+
+@compiles(json_array_agg, "mysql")
+def _json_array_agg_mysql(element, compiler, **kw):
+    return f"coalesce(JSON_ARRAYAGG({compiler.process(element.clauses, **kw)}), JSON_ARRAY())"
+
+
+@compiles(json_value)
+def _json_value(element, compiler, **kw):
+    # A subquery result loses SQLite's JSON subtype; json() restores it
+    return f"json({compiler.process(element.clauses, **kw)})"
+
+
+@compiles(json_value, "postgresql")
+@compiles(json_value, "mysql")
+def _json_value_passthrough(element, compiler, **kw):
+    return compiler.process(element.clauses, **kw)
+
+
+def array_body(documents: Iterable) -> bytes:
+    """A JSON array from already-encoded JSON documents."""
+    # Drivers that decode JSON columns themselves (psycopg2) hand back objects
+    parts = [
+        document.encode("utf-8") if isinstance(document, str) else dumps(document)
+        for document in documents
+    ]
+    return b"[" + b",".join(parts) + b"]"
+
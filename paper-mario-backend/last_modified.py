@@ -0,0 +1,133 @@
+"""Modification times over HTTP, for incremental sync of the CRUD routers.
+
+Every model carries ``created_at`` / ``updated_at`` (see ``config.Timestamped``).
+
+- ``GET /<collection>/?modified_since=<ISO time>`` returns only the rows
+  created or updated at or after that time, using the ``updated_at`` index.
+- Single-resource GETs send ``Last-Modified`` (the row's ``updated_at``).
+  List GETs send the time of the table's latest change, deletes included,
+  taken from the change log, and a weak ``ETag`` naming that change's
+  ``seq``.
+- A GET whose ``If-None-Match`` names the current tag, or (without
+  ``If-None-Match``) whose ``If-Modified-Since`` is not older than the
+  modification time, answers ``304 Not Modified`` without a body.
+
+HTTP dates have one-second resolution, so a date in the current second is
+only a weak validator (RFC 9110 8.8.2.2): a write later in that second would
+share it. Such a date is not sent, and clients revalidate with the next
+response's date or with the ``ETag``, which changes with every write.
+
+Deleted rows never match ``modified_since``; clients that must see deletions
+follow ``/changes`` instead. Times are UTC; ``modified_since`` keeps
+microseconds.
+"""
+from datetime import datetime, timezone
+from email.utils import format_datetime, parsedate_to_datetime
+from typing import NamedTuple, Optional, Type
+
+from fastapi import Response, status
+from sqlalchemy import func, select
+from sqlalchemy.orm import Query, Session
+
+from config import Base
+from models import ChangeLogEntry
+
+# Response headers a 304 repeats from the response it stands for
+_VALIDATORS = ("etag", "last-modified")
+
+
+def _naive_utc(value: datetime) -> datetime:
+    if value.tzinfo is not None:
+        value = value.astimezone(timezone.utc).replace(tzinfo=None)
+    return value
+
+
+def http_date(value: datetime) -> str:
+    return format_datetime(value.replace(tzinfo=timezone.utc, microsecond=0), usegmt=True)
+
+
+def parse_http_date(value: Optional[str]) -> Optional[datetime]:
+    """Parse an If-Modified-Since value; None if absent or malformed (the header is then ignored)."""
+    if not value:
+        return None
+    try:
+        return _naive_utc(parsedate_to_datetime(value))
+    except (TypeError, ValueError):
+        return None
+
+
+def modified_since_filter(query: Query, model: Type[Base], modified_since: Optional[datetime]) -> Query:
+    """Restrict a list query to rows created or updated at or after ``modified_since``."""
+    if modified_since is None:
+        return query
+    return query.filter(model.updated_at >= _naive_utc(modified_since))
+
+
+class TableState(NamedTuple):
+    """Validators of a table's list endpoint."""
+    last_modified: Optional[datetime]
+    # Latest change-log entry for the table; None if the log holds none
+    seq: Optional[int]
+
+    @property
+    def etag(self) -> Optional[str]:
+        if self.last_modified is None:
+            return None
+        # updated_at covers writes the log missed (disabled, or compacted)
+        return f'W/"{self.seq or 0}-{self.last_modified:%Y%m%d%H%M%S%f}"'
+
+
+def table_state(db: Session, model: Type[Base]) -> TableState:
+    """When anything in the model's table last changed, including deletes."""
+    logged = db.execute(
+        select(ChangeLogEntry.seq, ChangeLogEntry.changed_at)
+        .where(ChangeLogEntry.table_name == model.__table__.name)
+        .order_by(ChangeLogEntry.seq.desc())
+        .limit(1)
+    ).first()
+    # The log may be disabled or compacted; rows still carry their own times
+    updated = db.scalar(select(func.max(model.updated_at)))
+    times = [time for time in (logged.changed_at if logged else None, updated) if time is not None]
+    return TableState(max(times) if times else None, logged.seq if logged else None)
+
+
+def _etag_matches(if_none_match: str, etag: str) -> bool:
+    # Weak comparison, as If-None-Match requires
+    if if_none_match.strip() == "*":
+        return True
+    candidates = {tag.strip().removeprefix("W/") for tag in if_none_match.split(",")}
+    return etag.removeprefix("W/") in candidates
+
+
+def not_modified(response: Response, last_modified: Optional[datetime],
+                 if_modified_since: Optional[str], etag: Optional[str] = None,
+                 if_none_match: Optional[str] = None) -> Optional[Response]:
+    """
+    Set ``Last-Modified`` (and ``etag``, if given) on the endpoint's response;
+    return a 304 to send instead if nothing changed since the validators the
+    client sent.
+    """
+    if etag is not None:
+        response.headers["ETag"] = etag
+    if last_modified is not None and last_modified.replace(microsecond=0) < datetime.utcnow().replace(microsecond=0):
+        response.headers["Last-Modified"] = http_date(last_modified)
+    else:
+        last_modified = None  # none yet, or weak (see the module docstring)
+
+    if if_none_match is not None:
+        # If-None-Match takes precedence over If-Modified-Since (RFC 9110 13.2.2)
+        unchanged = etag is not None and _etag_matches(if_none_match, etag)
+    else:
+        since = parse_http_date(if_modified_since)
+        unchanged = last_modified is not None and since is not None and last_modified.replace(microsecond=0) <= since
+    if not unchanged:
+        return None
+    headers = {name: value for name, value in response.headers.items() if name in _VALIDATORS}
+    return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+
+
+def list_not_modified(response: Response, state: TableState, if_modified_since: Optional[str],
+                      if_none_match: Optional[str]) -> Optional[Response]:
+    """``not_modified`` for a list endpoint, validated by its table's state."""
+    return not_modified(response, state.last_modified, if_modified_since, state.etag, if_none_match)
+
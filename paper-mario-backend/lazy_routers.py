@@ -0,0 +1,151 @@
+"""Lazily mounted API routers and a cached OpenAPI document.
+
+Importing every router module at startup also imports every schema and the
+rarely used ``stored_procedures`` / complex query code, which dominates a
+worker's cold start. ``LazyRouters`` instead maps each URL prefix to the module
+that defines its router and imports and mounts that module the first time a
+request for the prefix arrives.
+
+The OpenAPI document needs every router, so it is built once, written to
+``OPENAPI_CACHE`` together with a hash of the source files it was
+generated from, and served from that file by later workers until the source
+changes.
+"""
+import hashlib
+import importlib
+import json
+import os
+import threading
+from pathlib import Path
+from typing import Dict, Iterable, Tuple
+
+from fastapi import FastAPI
+
+BASE_DIR = Path(__file__).resolve().parent
+OPENAPI_CACHE = Path(os.getenv("OPENAPI_CACHE", BASE_DIR / ".cache" / "openapi.json"))
+
+
+class LazyRouters:
+    """Import and mount routers on the first request under their prefix."""
+
+    def __init__(self, app: FastAPI, modules: Iterable[Tuple[str, str]]):
+        self.app = app
+        # (prefix, module name) in declaration order; mounted order follows demand
+        self.modules: Dict[str, str] = dict(modules)
+        self._loaded: set = set()
+        self._lock = threading.Lock()
+
+    def prefix_for(self, path: str):
+        for prefix in self.modules:
+            if path == prefix or path.startswith(prefix + "/"):
+                return prefix
+        return None
+
+    def load(self, prefix: str) -> None:
+        if prefix in self._loaded:
+            return
+        with self._lock:
+            if prefix in self._loaded:
+                return
+            module = importlib.import_module(self.modules[prefix])
+            self.app.include_router(module.router)
+            self._loaded.add(prefix)
+
+    def load_all(self) -> None:
+        for prefix in self.modules:
+            self.load(prefix)
+
+    def install(self) -> None:
+        """Wrap the app's middleware stack and serve OpenAPI from the cache."""
+        self.app.add_middleware(_LazyRouterMiddleware, routers=self)
+        self.app.openapi = self.openapi
+
+    def openapi(self) -> dict:
+        """Return the OpenAPI document, from memory, the cache file, or built fresh."""
+        if self.app.openapi_schema:
+            return self.app.openapi_schema
+
+        fingerprint = source_fingerprint()
+        schema = _read_cache(fingerprint)
+        if schema is None:
+            schema = self.build_openapi()
+            _write_cache(fingerprint, schema)
+        self.app.openapi_schema = schema
+        return schema
+
+    def build_openapi(self) -> dict:
+        self.load_all()
+        # FastAPI's own generator, bypassing the cache-aware override above
+        schema = FastAPI.openapi(self.app)
+        # Routers were mounted in request order; list paths in declaration order
+        order = {prefix: i for i, prefix in enumerate(self.modules)}
+        paths = list(schema["paths"].items())
+        paths.sort(key=lambda item: order.get(self.prefix_for(item[0]), len(order)))
+        schema["paths"] = dict(paths)
+        return schema
+
+
+class _LazyRouterMiddleware:
+    """Mount the router for a request's path before the app routes it."""
+
+    def __init__(self, app, routers: LazyRouters):
+        self.app = app
+        self.routers = routers
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] in ("http", "websocket"):
+            prefix = self.routers.prefix_for(scope["path"])
+            if prefix is not None and prefix not in self.routers._loaded:
+                self.routers.load(prefix)
+        await self.app(scope, receive, send)
+
+
+def source_fingerprint() -> str:
+    """
+    Content hash of every project source file, since any module a router
+    imports can change the OpenAPI document.
+    """
+    digest = hashlib.sha256()
+    paths = sorted(
+        path for path in BASE_DIR.rglob("*.py")
+        # Skip hidden trees such as .cache or a .venv
+        if not any(part.startswith(".") for part in path.relative_to(BASE_DIR).parts)
+    )
+    for path in paths:
+        try:
+            content = path.read_bytes()
+        except FileNotFoundError:
+            continue
+        digest.update(f"{path.relative_to(BASE_DIR)}\0".encode())
+        digest.update(content)
+    return digest.hexdigest()
+
+
+def _read_cache(fingerprint: str):
+    try:
+        with open(OPENAPI_CACHE, encoding="utf-8") as f:
+            cached = json.load(f)
+    except (OSError, ValueError):
+        return None
+    if cached.get("fingerprint") != fingerprint:
+        return None
+    return cached.get("openapi")
+
+
+def _write_cache(fingerprint: str, schema: dict) -> None:
+    try:
+        OPENAPI_CACHE.parent.mkdir(parents=True, exist_ok=True)
+        tmp = OPENAPI_CACHE.with_suffix(f".{os.getpid()}.tmp")
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump({"fingerprint": fingerprint, "openapi": schema}, f)
+        os.replace(tmp, OPENAPI_CACHE)
+    except OSError:
+        # A read-only deployment just rebuilds the document once per worker
+        pass
+
+
+if __name__ == "__main__":
+    # Prebuild the cached OpenAPI document, e.g. during a deploy
+    from main import routers
+    routers.openapi()
+    print(f"Wrote {OPENAPI_CACHE}")
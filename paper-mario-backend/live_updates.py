@@ -0,0 +1,309 @@
+"""Live change subscriptions over Server-Sent Events.
+
+Instead of polling ``/status-effects/character/{id}`` or ``/blocks/`` every
+second, a dashboard opens ``GET /live/changes`` with filters (table, entity
+id, location, chapter, character). It then receives each matching
+``/changes`` entry as an SSE event whose id is the entry's ``seq``.
+
+One ``Hub`` per worker tails the ``change_log`` table. It is woken by
+``table_versions`` right after each local commit, and also polls every
+``LIVE_POLL_SECONDS`` to pick up commits from other workers. Each new entry
+is encoded as an SSE frame once. It is then handed to the matching
+subscribers on the event loop; subscribers are indexed by table, so an
+entry only visits the subscribers that could want it. A row that carries a
+``location_id`` but no ``chapter_id`` (blocks, objects, switches, ...)
+matches the chapter of its location, looked up in a map cached per version
+of the ``locations`` table.
+
+Each subscriber has a bounded queue (``LIVE_QUEUE_SIZE``). When a slow
+client's queue is full, ``on_overflow=drop_oldest`` discards its oldest
+pending events. The default ``disconnect`` instead ends the stream with an
+``overflow`` event; the browser's EventSource then reconnects with
+``Last-Event-ID`` and misses nothing, because reconnects replay from the
+change log before switching to live events.
+"""
+import asyncio
+import enum
+import logging
+import os
+import threading
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+from sqlalchemy import select
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.orm import Session
+from starlette.concurrency import run_in_threadpool
+
+import change_feed
+import table_versions
+from fast_json import dumps
+from models import Location
+from replicas import use_primary
+
+logger = logging.getLogger("paper_mario.live_updates")
+
+POLL_SECONDS = float(os.getenv("LIVE_POLL_SECONDS", "1"))
+QUEUE_SIZE = int(os.getenv("LIVE_QUEUE_SIZE", "256"))
+MAX_SUBSCRIBERS = int(os.getenv("LIVE_MAX_SUBSCRIBERS", "10000"))
+HEARTBEAT_SECONDS = float(os.getenv("LIVE_HEARTBEAT_SECONDS", "15"))
+
+# change_log entries read per query while catching up
+BATCH = 500
+
+# Queue markers ending a stream
+_CLOSE = (0, b"")
+_OVERFLOW = (0, b"event: overflow\ndata: {}\n\n")
+
+# Columns subscribers can filter on besides the primary key
+REF_COLUMNS = ("location_id", "chapter_id", "character_id")
+
+_location_chapters = table_versions.VersionedCache(("locations",), maxsize=1)
+
+
+class OverflowPolicy(str, enum.Enum):
+    """What to do when a subscriber's queue is full."""
+    disconnect = "disconnect"
+    drop_oldest = "drop_oldest"
+
+
+def frame(entry: Dict[str, Any]) -> bytes:
+    """SSE encoding of a change entry."""
+    return b"id: %d\nevent: change\ndata: %s\n\n" % (entry["seq"], dumps(entry))
+
+
+def _chapters_by_location(db: Session) -> Dict[int, int]:
+    def load():
+        # Cached under the primary's table versions, so read from the primary
+        with use_primary(db):
+            return dict(db.execute(select(Location.location_id, Location.chapter_id)).all())
+
+    return _location_chapters.get_or_compute("all", load)
+
+
+def entry_refs(db: Session, entries: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """Location, chapter and character of each entry's row (None where it has none)."""
+    chapters = None
+    result = []
+    for entry in entries:
+        pk, changes = entry["pk"], entry["changes"] or {}
+        refs = {name: pk.get(name, changes.get(name)) for name in REF_COLUMNS}
+        if refs["chapter_id"] is None and refs["location_id"] is not None:
+            if chapters is None:
+                chapters = _chapters_by_location(db)
+            refs["chapter_id"] = chapters.get(refs["location_id"])
+        result.append(refs)
+    return result
+
+
+class Subscriber:
+    """One open stream: its filters and bounded queue of (seq, frame) pairs."""
+
+    def __init__(self, table: Optional[str], entity_id: Optional[int], refs: Dict[str, int],
+                 policy: OverflowPolicy, queue_size: int = QUEUE_SIZE):
+        self.table = table
+        self.entity_id = entity_id
+        self.refs = refs
+        self.policy = policy
+        self.queue: "asyncio.Queue[Tuple[int, bytes]]" = asyncio.Queue(queue_size)
+        self.dropped = 0
+
+    def matches(self, entry: Dict[str, Any], refs: Dict[str, Any]) -> bool:
+        """Whether an entry passes the filters; ``refs`` comes from ``entry_refs``."""
+        pk = entry["pk"]
+        if self.entity_id is not None and (len(pk) != 1 or next(iter(pk.values())) != self.entity_id):
+            return False
+        return all(refs.get(name) == value for name, value in self.refs.items())
+
+    def offer(self, item: Tuple[int, bytes]) -> bool:
+        """Queue an event; False if the subscriber overflowed and was disconnected."""
+        try:
+            self.queue.put_nowait(item)
+            return True
+        except asyncio.QueueFull:
+            pass
+        if self.policy is OverflowPolicy.drop_oldest:
+            self.queue.get_nowait()
+            self.queue.put_nowait(item)
+            self.dropped += 1
+            return True
+        # Make room for the marker; the client resumes from its last event id
+        while not self.queue.empty():
+            self.queue.get_nowait()
+        self.queue.put_nowait(_OVERFLOW)
+        return False
+
+
+class Hub:
+    """Tails the change log and fans new entries out to subscribers."""
+
+    def __init__(self, poll_seconds: float):
+        self.poll_seconds = poll_seconds
+        # table (None: every table) -> subscribers; only touched on the event loop
+        self._subscribers: Dict[Optional[str], Set[Subscriber]] = {}
+        self._count = 0
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._position: Optional[int] = None
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self.published = 0
+        self.delivered = 0
+        self.disconnected = 0
+
+    # Subscribers (event loop)
+
+    def subscribe(self, subscriber: Subscriber) -> bool:
+        """Register a subscriber; False if the worker is at LIVE_MAX_SUBSCRIBERS."""
+        if self._count >= MAX_SUBSCRIBERS:
+            return False
+        self._loop = asyncio.get_running_loop()
+        self._subscribers.setdefault(subscriber.table, set()).add(subscriber)
+        self._count += 1
+        return True
+
+    def unsubscribe(self, subscriber: Subscriber) -> None:
+        subscribers = self._subscribers.get(subscriber.table)
+        if subscribers is not None and subscriber in subscribers:
+            subscribers.discard(subscriber)
+            self._count -= 1
+
+    def _dispatch(self, entries: List[Tuple[Dict[str, Any], bytes, Dict[str, Any]]]) -> None:
+        for entry, encoded, refs in entries:
+            item = (entry["seq"], encoded)
+            for table in (entry["table"], None):
+                for subscriber in list(self._subscribers.get(table, ())):
+                    if not subscriber.matches(entry, refs):
+                        continue
+                    if subscriber.offer(item):
+                        self.delivered += 1
+                    else:
+                        self.unsubscribe(subscriber)
+                        self.disconnected += 1
+        self.published += len(entries)
+
+    def _close_all(self) -> None:
+        for subscribers in self._subscribers.values():
+            for subscriber in subscribers:
+                while not subscriber.queue.empty():
+                    subscriber.queue.get_nowait()
+                subscriber.queue.put_nowait(_CLOSE)
+        self._subscribers.clear()
+        self._count = 0
+
+    # Tailing (background thread)
+
+    def notify(self, changed_tables: Set[str]) -> None:
+        if self._count:
+            self._wake.set()
+
+    def _poll(self) -> None:
+        from config import SessionLocal
+
+        with SessionLocal() as db:
+            if self._position is None or not self._count:
+                # Read the end of the log before checking for subscribers: one
+                # that subscribes after the check only wants later commits,
+                # which all get a higher seq
+                latest = change_feed.latest_seq(db)
+                if self._position is None or not self._count:
+                    # Nobody to tell; skip to the end of the log
+                    self._position = latest
+                    return
+            while True:
+                page = change_feed.changes_since(db, self._position, BATCH)
+                if page is None:
+                    # Compacted past our position (e.g. the worker was suspended)
+                    self._position = change_feed.latest_seq(db)
+                    return
+                changes = page["changes"]
+                entries = list(zip(changes, map(frame, changes), entry_refs(db, changes)))
+                self._position = page["next_since"]
+                if entries and self._loop is not None:
+                    self._loop.call_soon_threadsafe(self._dispatch, entries)
+                if not page["has_more"]:
+                    return
+
+    def _run(self) -> None:
+        while not self._stop.is_set():
+            try:
+                self._poll()
+            except SQLAlchemyError:
+                # Busy database or table not created yet; the next round retries
+                logger.exception("Reading the change log failed")
+            self._wake.wait(self.poll_seconds)
+            self._wake.clear()
+
+    def metrics(self) -> Dict:
+        return {
+            "subscribers": self._count,
+            "by_table": {table or "*": len(subscribers) for table, subscribers in self._subscribers.items()},
+            "position": self._position,
+            "published": self.published,
+            "delivered": self.delivered,
+            "dropped": sum(s.dropped for subscribers in self._subscribers.values() for s in subscribers),
+            "disconnected_on_overflow": self.disconnected,
+        }
+
+    def start(self) -> None:
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="live-updates", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        """Stop tailing and end every open stream."""
+        self._stop.set()
+        self._wake.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        self._close_all()
+
+
+def replay_page(since: int) -> Optional[Dict[str, Any]]:
+    """
+    One page of change-log entries after ``since``, with their ``entry_refs``
+    under ``refs``; None if they were compacted.
+    """
+    from config import SessionLocal
+
+    with SessionLocal() as db:
+        page = change_feed.changes_since(db, since, BATCH)
+        if page is not None:
+            page["refs"] = entry_refs(db, page["changes"])
+        return page
+
+
+async def stream(subscriber: Subscriber, since: Optional[int], replay: Optional[Dict[str, Any]]):
+    """SSE byte stream: the replayed entries after ``since``, then live events."""
+    last_seq = since or 0
+    page = replay
+    try:
+        yield b"retry: 3000\n\n"
+        while page is not None:
+            for entry, refs in zip(page["changes"], page["refs"]):
+                if subscriber.matches(entry, refs):
+                    yield frame(entry)
+            last_seq = page["next_since"]
+            page = await run_in_threadpool(replay_page, last_seq) if page["has_more"] else None
+        while True:
+            try:
+                item = await asyncio.wait_for(subscriber.queue.get(), HEARTBEAT_SECONDS)
+            except asyncio.TimeoutError:
+                yield b": keep-alive\n\n"
+                continue
+            if item is _CLOSE:
+                return
+            if item is _OVERFLOW:
+                yield item[1]
+                return
+            seq, encoded = item
+            if seq <= last_seq:
+                continue  # already sent during the replay
+            yield encoded
+            last_seq = seq
+    finally:
+        hub.unsubscribe(subscriber)
+
+
+hub = Hub(POLL_SECONDS)
+table_versions.subscribe(hub.notify)
@@ -0,0 +1,49 @@
+"""Shared primary-key and unique-name lookups for routers and procedures.
+
+Primary-key lookups go through ``Session.get``, which returns objects already
+in the session's identity map without a round trip and otherwise runs
+SQLAlchemy's internally cached PK statement. Unique-name lookups reuse one
+prebuilt ``select`` per model with a bound parameter, so the statement is
+constructed once and its compiled form is served from the engine's compiled
+cache on every call after the first.
+"""
+from typing import Any, Dict, Optional, Type
+
+from fastapi import HTTPException, status
+from sqlalchemy import bindparam, select
+from sqlalchemy.orm import Session
+
+from concurrency import check_if_match
+from config import Base
+
+_name_statements: Dict[Type[Base], Any] = {}
+
+
+def get_or_404(db: Session, model: Type[Base], pk: Any, label: str, if_match: Optional[str] = None):
+    """
+    Get a row by primary key or raise a 404 naming the resource.
+
+    With ``if_match`` (the request's If-Match header) also raise a 412 unless
+    the row is still at that version.
+    """
+    obj = db.get(model, pk)
+    if obj is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"{label} with id {pk} not found"
+        )
+    check_if_match(obj, if_match)
+    return obj
+
+
+def _name_statement(model: Type[Base]):
+    stmt = _name_statements.get(model)
+    if stmt is None:
+        stmt = select(model).where(model.name == bindparam("name")).limit(1)
+        _name_statements[model] = stmt
+    return stmt
+
+
+def get_by_name(db: Session, model: Type[Base], name: str) -> Optional[Base]:
+    """Get a row by its unique ``name`` column."""
+    return db.execute(_name_statement(model), {"name": name}).scalars().first()
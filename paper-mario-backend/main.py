@@ -1,13 +1,55 @@
 """FastAPI main application for Paper Mario database."""
+import os
+from contextlib import asynccontextmanager
+
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
+from sqlalchemy.orm.exc import StaleDataError
+from starlette.concurrency import run_in_threadpool
+
+# Registers the commit listeners behind every cache before any router loads
+import table_versions
+import change_feed
+import chapter_documents
+import enemy_index
+import group_commit
+import idempotency
+import live_updates
+import snapshot
+from concurrency import stale_data_handler
+from admission import AdmissionControlMiddleware
+from compression import CompressionMiddleware
+from config import replica_set
+from lazy_routers import LazyRouters
+from replicas import ReadYourWritesMiddleware
+from single_flight import SingleFlightMiddleware
+from snapshot import ReadOnlyMiddleware
+from slow_query_log import RequestContextMiddleware
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Start and stop background work tied to the worker's lifetime."""
+    if snapshot.ENABLED:
+        # Serve from RAM; nothing writes, so the jobs that do are not started
+        await run_in_threadpool(snapshot.store.reload)
+    else:
+        replica_set.start()
+        chapter_documents.rebuilder.start()
+        idempotency.pruner.start()
+        change_feed.compactor.start()
+    live_updates.hub.start()
+    if group_commit.ENABLED and not snapshot.ENABLED:
+        group_commit.writer.start()
+    yield
+    # Commit queued writes before the connections they need go away
+    group_commit.writer.stop()
+    live_updates.hub.stop()
+    change_feed.compactor.stop()
+    idempotency.pruner.stop()
+    chapter_documents.rebuilder.stop()
+    replica_set.stop()
 
-from api import (
-    characters, chapters, enemies, items, side_quests,
-    playable_characters, locations, pixls, status_effects,
-    bosses, objects, navigation_objects, obstacles,
-    blocks_containers, switches, complex_queries, views, procedures
-)
 
 # Create FastAPI app
 app = FastAPI(
@@ -15,9 +57,29 @@ app = FastAPI(
     description="REST API for Paper Mario Super database with characters, chapters, enemies, items, and more!",
     version="1.0.0",
     docs_url="/docs",
-    redoc_url="/redoc"
+    redoc_url="/redoc",
+    lifespan=lifespan
 )
 
+# Cap concurrent requests per route group and shed overflow with 503; added
+# first (innermost) so coalesced single-flight followers never hold a slot
+# and rejections still carry CORS headers
+app.add_middleware(AdmissionControlMiddleware)
+
+# Compress responses the client accepts encoded; inside single-flight, whose
+# key includes Accept-Encoding, so coalesced followers share compressed bytes
+app.add_middleware(CompressionMiddleware)
+
+# Coalesce identical concurrent GETs; added before CORS and read-your-writes
+# routing so it runs inside them, as they decide per request
+app.add_middleware(SingleFlightMiddleware)
+
+# A read-only snapshot (SNAPSHOT_MODE=1) answers writes with 405 outside
+# admission control, so they never take or count against a slot; inside CORS
+# so the 405 still carries its headers
+if snapshot.ENABLED:
+    app.add_middleware(ReadOnlyMiddleware)
+
 # Configure CORS
 app.add_middleware(
     CORSMiddleware,
@@ -25,27 +87,42 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["ETag"],
 )
+app.add_middleware(RequestContextMiddleware)
+app.add_middleware(ReadYourWritesMiddleware)
+
+# Concurrent writes to the same row (optimistic version check) answer 409/412
+app.add_exception_handler(StaleDataError, stale_data_handler)
 
-# Include all routers
-app.include_router(characters.router)
-app.include_router(playable_characters.router)
-app.include_router(chapters.router)
-app.include_router(locations.router)
-app.include_router(pixls.router)
-app.include_router(status_effects.router)
-app.include_router(enemies.router)
-app.include_router(bosses.router)
-app.include_router(items.router)
-app.include_router(objects.router)
-app.include_router(navigation_objects.router)
-app.include_router(obstacles.router)
-app.include_router(blocks_containers.router)
-app.include_router(switches.router)
-app.include_router(side_quests.router)
-app.include_router(complex_queries.router)
-app.include_router(views.router)
-app.include_router(procedures.router)
+# Routers are imported and mounted on the first request under their prefix
+routers = LazyRouters(app, [
+    ("/characters", "api.characters"),
+    ("/playable-characters", "api.playable_characters"),
+    ("/chapters", "api.chapters"),
+    ("/locations", "api.locations"),
+    ("/pixls", "api.pixls"),
+    ("/status-effects", "api.status_effects"),
+    ("/enemies", "api.enemies"),
+    ("/bosses", "api.bosses"),
+    ("/items", "api.items"),
+    ("/objects", "api.objects"),
+    ("/navigation-objects", "api.navigation_objects"),
+    ("/obstacles", "api.obstacles"),
+    ("/blocks", "api.blocks_containers"),
+    ("/switches", "api.switches"),
+    ("/side-quests", "api.side_quests"),
+    ("/queries", "api.complex_queries"),
+    ("/views", "api.views"),
+    ("/procedures", "api.procedures"),
+    ("/analytics", "api.analytics"),
+    ("/changes", "api.changes"),
+    ("/live", "api.live"),
+    ("/admin", "api.admin"),
+])
+routers.install()
+if os.getenv("LAZY_ROUTERS", "1") == "0":
+    routers.load_all()
 
 
 @app.get("/")
@@ -56,7 +133,7 @@ def root():
         "docs": "/docs",
         "redoc": "/redoc",
         "version": "1.0.0",
-        "total_endpoints": 18,
+        "total_endpoints": 22,
         "endpoints": {
             "characters": "/characters",
             "playable_characters": "/playable-characters",
@@ -75,7 +152,11 @@ def root():
             "side_quests": "/side-quests",
             "complex_queries": "/queries",
             "database_views": "/views",
-            "stored_procedures": "/procedures"
+            "stored_procedures": "/procedures",
+            "analytics": "/analytics",
+            "changes": "/changes",
+            "live": "/live/changes",
+            "admin": "/admin"
         }
     }
 
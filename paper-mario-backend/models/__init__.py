@@ -14,6 +14,9 @@ from .obstacles import Obstacle
 from .blocks_containers import BlockContainer
 from .switches import Switch
 from .side_quests import SideQuest, QuestCharacter
+from .chapter_documents import ChapterDocument
+from .idempotency_keys import IdempotencyKey
+from .change_log import ChangeLogEntry
 
 __all__ = [
     "Character",
@@ -33,4 +36,7 @@ __all__ = [
     "Switch",
     "SideQuest",
     "QuestCharacter",
+    "ChapterDocument",
+    "IdempotencyKey",
+    "ChangeLogEntry",
 ]
@@ -1,7 +1,7 @@
 """Block/Container model."""
 from sqlalchemy import Column, Integer, Text, ForeignKey, Enum, Index
 from sqlalchemy.orm import relationship
-from config import Base
+from config import Base, Timestamped, Versioned
 import enum
 
 
@@ -13,7 +13,7 @@ class BlockType(enum.Enum):
     star = "star"
 
 
-class BlockContainer(Base):
+class BlockContainer(Versioned, Timestamped, Base):
     """Blocks and containers in the game."""
     
     __tablename__ = "blocks_containers"
@@ -1,10 +1,10 @@
 """Boss model."""
 from sqlalchemy import Column, Integer, Text, ForeignKey, CheckConstraint, Index
 from sqlalchemy.orm import relationship
-from config import Base
+from config import Base, Timestamped, Versioned
 
 
-class Boss(Base):
+class Boss(Versioned, Timestamped, Base):
     """Boss characters in the game."""
     
     __tablename__ = "bosses"
@@ -0,0 +1,38 @@
+"""Change log model."""
+import enum
+from datetime import datetime
+from sqlalchemy import Column, Integer, String, Text, DateTime, Enum, Index
+from config import Base
+
+
+class ChangeOp(enum.Enum):
+    """Kind of row change."""
+    insert = "insert"
+    update = "update"
+    delete = "delete"
+
+
+class ChangeLogEntry(Base):
+    """One committed row change, in commit order (see change_feed.py)."""
+    
+    __tablename__ = "change_log"
+    
+    # Primary Key; AUTOINCREMENT so sequence numbers are never reused after compaction
+    seq = Column(Integer, primary_key=True, autoincrement=True)
+    
+    # Columns
+    table_name = Column(String(64), nullable=False)
+    pk = Column(Text, nullable=False)  # JSON object of primary key columns
+    op = Column(Enum(ChangeOp), nullable=False)
+    changes = Column(Text)  # JSON: full row for inserts, changed columns (+ foreign keys) for updates, foreign keys for deletes
+    changed_at = Column(DateTime, nullable=False, default=datetime.utcnow)
+    
+    # Indexes
+    __table_args__ = (
+        Index("idx_change_log_table_seq", "table_name", "seq"),  # INDEX for per-table paging
+        Index("idx_change_log_changed_at", "changed_at"),  # INDEX for compaction
+        {"sqlite_autoincrement": True},
+    )
+    
+    def __repr__(self):
+        return f"<ChangeLogEntry(seq={self.seq}, table='{self.table_name}', op='{self.op.value}')>"
@@ -0,0 +1,32 @@
+"""Chapter document model."""
+from datetime import datetime
+from sqlalchemy import Column, Integer, String, Boolean, DateTime, LargeBinary, ForeignKey, Index
+from config import Base
+
+
+class ChapterDocument(Base):
+    """Precompiled, gzip-compressed JSON rendering of one chapter (see chapter_documents.py)."""
+    
+    __tablename__ = "chapter_documents"
+    
+    # Composite Primary Key
+    chapter_id = Column(
+        Integer,
+        ForeignKey("chapters.chapter_id", ondelete="CASCADE"),
+        primary_key=True
+    )
+    view = Column(String(20), primary_key=True)  # Which endpoint's JSON shape
+    
+    # Columns
+    version = Column(Integer, nullable=False, default=1)  # Bumped on every invalidation
+    stale = Column(Boolean, nullable=False, default=True)
+    body = Column(LargeBinary)  # gzip-compressed JSON
+    built_at = Column(DateTime, default=datetime.utcnow)
+    
+    # Indexes
+    __table_args__ = (
+        Index("idx_chapter_document_stale", "stale"),  # INDEX for the rebuild scan
+    )
+    
+    def __repr__(self):
+        return f"<ChapterDocument(chapter={self.chapter_id}, view='{self.view}', version={self.version})>"
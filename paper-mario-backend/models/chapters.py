@@ -1,10 +1,10 @@
 """Chapter model."""
 from sqlalchemy import Column, Integer, String, Text, CheckConstraint, Index
 from sqlalchemy.orm import relationship
-from config import Base
+from config import Base, Timestamped, Versioned
 
 
-class Chapter(Base):
+class Chapter(Versioned, Timestamped, Base):
     """Chapters/Worlds in the game."""
     
     __tablename__ = "chapters"
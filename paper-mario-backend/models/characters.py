@@ -1,10 +1,10 @@
 """Character model."""
 from sqlalchemy import Column, Integer, String, Text, Index
 from sqlalchemy.orm import relationship
-from config import Base
+from config import Base, Timestamped, Versioned
 
 
-class Character(Base):
+class Character(Versioned, Timestamped, Base):
     """Base Character table for all game characters."""
     
     __tablename__ = "characters"
@@ -1,10 +1,10 @@
 """Enemy model."""
 from sqlalchemy import Column, Integer, ForeignKey, CheckConstraint, Index
 from sqlalchemy.orm import relationship
-from config import Base
+from config import Base, Timestamped, Versioned
 
 
-class Enemy(Base):
+class Enemy(Versioned, Timestamped, Base):
     """Enemy characters in the game."""
     
     __tablename__ = "enemies"
@@ -35,6 +35,13 @@ class Enemy(Base):
         CheckConstraint("defense >= 0", name="check_enemy_defense_non_negative"),  # CHECK constraint
         CheckConstraint("card_score >= 0", name="check_card_score_non_negative"),  # CHECK constraint
         Index("idx_enemy_character", "character_id"),  # INDEX on FK
+        # Composite INDEXES: one per leading stat, trailed by the other stats so
+        # multi-stat range filters are checked inside the index. Each also
+        # covers the single-stat analytics scans (rowid = enemy_id).
+        Index("idx_enemy_hp_stats", "hp", "attack", "defense", "card_score"),
+        Index("idx_enemy_attack_stats", "attack", "hp", "defense", "card_score"),
+        Index("idx_enemy_defense_stats", "defense", "hp", "attack", "card_score"),
+        Index("idx_enemy_card_score_stats", "card_score", "hp", "attack", "defense"),
     )
     
     def __repr__(self):
@@ -0,0 +1,28 @@
+"""Idempotency key model."""
+from datetime import datetime
+from sqlalchemy import Column, Integer, String, DateTime, LargeBinary, Index
+from config import Base
+
+
+class IdempotencyKey(Base):
+    """Outcome of a request submitted with an Idempotency-Key header (see idempotency.py)."""
+    
+    __tablename__ = "idempotency_keys"
+    
+    # Primary Key
+    key = Column(String(255), primary_key=True)
+    
+    # Columns
+    request_hash = Column(String(64), nullable=False)  # SHA-256 of endpoint and body
+    status_code = Column(Integer)  # NULL while the request is still being processed
+    response_body = Column(LargeBinary)  # JSON
+    created_at = Column(DateTime, nullable=False, default=datetime.utcnow)
+    expires_at = Column(DateTime, nullable=False)
+    
+    # Indexes
+    __table_args__ = (
+        Index("idx_idempotency_expires", "expires_at"),  # INDEX for pruning
+    )
+    
+    def __repr__(self):
+        return f"<IdempotencyKey(key='{self.key}', status={self.status_code})>"
@@ -1,10 +1,10 @@
 """Item model."""
 from sqlalchemy import Column, Integer, String, Text, Boolean, Index
 from sqlalchemy.orm import relationship
-from config import Base
+from config import Base, Timestamped, Versioned
 
 
-class Item(Base):
+class Item(Versioned, Timestamped, Base):
     """Items in the game."""
     
     __tablename__ = "items"
@@ -1,7 +1,7 @@
 """Location model."""
 from sqlalchemy import Column, Integer, String, Text, ForeignKey, Enum, Index
 from sqlalchemy.orm import relationship
-from config import Base
+from config import Base, Timestamped, Versioned
 import enum
 
 
@@ -13,7 +13,7 @@ class LocationType(enum.Enum):
     other = "other"
 
 
-class Location(Base):
+class Location(Versioned, Timestamped, Base):
     """Game locations/areas."""
     
     __tablename__ = "locations"
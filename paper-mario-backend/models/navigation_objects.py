@@ -1,7 +1,7 @@
 """Navigation Object model."""
 from sqlalchemy import Column, Integer, Text, ForeignKey, Enum, Index
 from sqlalchemy.orm import relationship
-from config import Base
+from config import Base, Timestamped, Versioned
 import enum
 
 
@@ -15,7 +15,7 @@ class NavigationType(enum.Enum):
     rift = "rift"
 
 
-class NavigationObject(Base):
+class NavigationObject(Versioned, Timestamped, Base):
     """Navigation objects in locations (doors, elevators, etc.)."""
     
     __tablename__ = "navigation_objects"
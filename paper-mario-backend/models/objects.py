@@ -1,10 +1,10 @@
 """Object model."""
 from sqlalchemy import Column, Integer, String, Text, ForeignKey, Index
 from sqlalchemy.orm import relationship
-from config import Base
+from config import Base, Timestamped, Versioned
 
 
-class Object(Base):
+class Object(Versioned, Timestamped, Base):
     """Objects in game locations."""
     
     __tablename__ = "objects"
@@ -1,10 +1,10 @@
 """Obstacle model."""
 from sqlalchemy import Column, Integer, String, Text, ForeignKey, Index
 from sqlalchemy.orm import relationship
-from config import Base
+from config import Base, Timestamped, Versioned
 
 
-class Obstacle(Base):
+class Obstacle(Versioned, Timestamped, Base):
     """Obstacles in game locations."""
     
     __tablename__ = "obstacles"
@@ -1,10 +1,10 @@
 """Pixl model."""
 from sqlalchemy import Column, Integer, String, Text, Boolean, ForeignKey, Index
 from sqlalchemy.orm import relationship
-from config import Base
+from config import Base, Timestamped, Versioned
 
 
-class Pixl(Base):
+class Pixl(Versioned, Timestamped, Base):
     """Pixl companions in the game."""
     
     __tablename__ = "pixls"
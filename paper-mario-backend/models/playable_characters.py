@@ -1,10 +1,10 @@
 """Playable Character model."""
 from sqlalchemy import Column, Integer, String, ForeignKey, Index
 from sqlalchemy.orm import relationship
-from config import Base
+from config import Base, Timestamped, Versioned
 
 
-class PlayableCharacter(Base):
+class PlayableCharacter(Versioned, Timestamped, Base):
     """Playable characters that the player can control."""
     
     __tablename__ = "playable_characters"
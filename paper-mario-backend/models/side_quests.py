@@ -1,7 +1,7 @@
 """Side Quest models."""
 from sqlalchemy import Column, Integer, String, Text, ForeignKey, Enum, Index
 from sqlalchemy.orm import relationship
-from config import Base
+from config import Base, Timestamped, Versioned
 import enum
 
 
@@ -12,7 +12,7 @@ class QuestRole(enum.Enum):
     helper = "helper"
 
 
-class SideQuest(Base):
+class SideQuest(Versioned, Timestamped, Base):
     """Side quests in the game."""
     
     __tablename__ = "side_quests"
@@ -52,7 +52,7 @@ class SideQuest(Base):
         return f"<SideQuest(id={self.quest_id}, name='{self.name}')>"
 
 
-class QuestCharacter(Base):
+class QuestCharacter(Versioned, Timestamped, Base):
     """Join table for Side Quests and Characters."""
     
     __tablename__ = "quest_character"
@@ -1,7 +1,7 @@
 """Status Effect models."""
 from sqlalchemy import Column, Integer, String, ForeignKey, Enum, CheckConstraint, Index, DateTime
 from sqlalchemy.orm import relationship
-from config import Base
+from config import Base, Timestamped, Versioned
 import enum
 from datetime import datetime
 
@@ -12,7 +12,7 @@ class EffectType(enum.Enum):
     debuff = "debuff"
 
 
-class StatusEffect(Base):
+class StatusEffect(Versioned, Timestamped, Base):
     """Status effects that can be applied to characters."""
     
     __tablename__ = "status_effects"
@@ -38,7 +38,7 @@ class StatusEffect(Base):
         return f"<StatusEffect(id={self.status_id}, name='{self.name}', type={self.effect_type.value})>"
 
 
-class CharacterStatusEffect(Base):
+class CharacterStatusEffect(Versioned, Timestamped, Base):
     """Join table for Characters and Status Effects."""
     
     __tablename__ = "character_status_effects"
@@ -1,10 +1,10 @@
 """Switch model."""
 from sqlalchemy import Column, Integer, String, ForeignKey, Index
 from sqlalchemy.orm import relationship
-from config import Base
+from config import Base, Timestamped, Versioned
 
 
-class Switch(Base):
+class Switch(Versioned, Timestamped, Base):
     """Switches that control navigation objects."""
     
     __tablename__ = "switches"
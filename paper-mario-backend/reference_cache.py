@@ -0,0 +1,138 @@
+"""Process-wide read-through cache for small reference tables.
+
+``chapters``, ``status_effects``, ``items`` and ``pixls`` are tiny and change
+rarely, but are read on almost every request for FK validation and name
+lookups. Each table is held as an immutable snapshot of typed rows keyed by id
+and by unique name. A snapshot is loaded lazily on first use and reloaded on
+the next access after a commit touches its table (see ``table_versions``).
+"""
+import threading
+from datetime import datetime
+from types import MappingProxyType
+from typing import Generic, Iterable, NamedTuple, Optional, Tuple, Type, TypeVar
+
+from fastapi import HTTPException, status
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+import table_versions
+from replicas import use_primary
+from models import Chapter, Item, Pixl, StatusEffect
+from models.status_effects import EffectType
+
+
+class ChapterRef(NamedTuple):
+    chapter_id: int
+    name: str
+    world_number: int
+    description: Optional[str]
+    version: int
+    updated_at: datetime
+
+
+class StatusEffectRef(NamedTuple):
+    status_id: int
+    name: str
+    effect_type: EffectType
+    duration_seconds: int
+    version: int
+    updated_at: datetime
+
+
+class ItemRef(NamedTuple):
+    item_id: int
+    name: str
+    is_key_item: bool
+    effect: Optional[str]
+    version: int
+    updated_at: datetime
+
+
+class PixlRef(NamedTuple):
+    pixl_id: int
+    name: str
+    unlock_chapter_id: Optional[int]
+    ability: Optional[str]
+    is_optional: bool
+    version: int
+    updated_at: datetime
+
+
+RowT = TypeVar("RowT")
+
+
+class ReferenceTable(Generic[RowT]):
+    """Immutable snapshot of one reference table keyed by id and by name."""
+
+    def __init__(self, model, row_type: Type[RowT], label: str):
+        self.model = model
+        self.row_type = row_type
+        self.label = label
+        self.table = model.__table__.name
+        self._columns = [getattr(model, field) for field in row_type._fields]
+        self._lock = threading.Lock()
+        # (version, rows, by_id, by_name); swapped atomically on reload
+        self._snapshot = None
+
+    def _load(self, db: Session):
+        snapshot = self._snapshot
+        version = table_versions.current(self.table)
+        if snapshot is not None and snapshot[0] == version:
+            return snapshot
+
+        # A session holding uncommitted writes to this table must not seed the
+        # shared snapshot; it gets a private one instead
+        if self.table in table_versions.pending_tables(db):
+            return self._read(db, version)
+
+        with self._lock:
+            snapshot = self._snapshot
+            if snapshot is not None and snapshot[0] == version:
+                return snapshot
+            snapshot = self._read(db, version)
+            self._snapshot = snapshot
+            return snapshot
+
+    def _read(self, db: Session, version: int):
+        # A lagging replica could pair this version with older rows
+        with use_primary(db):
+            result = db.execute(select(*self._columns).order_by(self._columns[0])).all()
+        rows = tuple(self.row_type(*row) for row in result)
+        return (
+            version,
+            rows,
+            MappingProxyType({row[0]: row for row in rows}),
+            MappingProxyType({row.name: row for row in rows})
+        )
+
+    def all(self, db: Session) -> Tuple[RowT, ...]:
+        return self._load(db)[1]
+
+    def get(self, db: Session, pk: int) -> Optional[RowT]:
+        return self._load(db)[2].get(pk)
+
+    def get_by_name(self, db: Session, name: str) -> Optional[RowT]:
+        return self._load(db)[3].get(name)
+
+    def get_or_404(self, db: Session, pk: int) -> RowT:
+        row = self.get(db, pk)
+        if row is None:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail=f"{self.label} with id {pk} not found"
+            )
+        return row
+
+    def missing(self, db: Session, pks: Iterable[int]) -> set:
+        """Return the subset of ``pks`` that do not exist."""
+        by_id = self._load(db)[2]
+        return {pk for pk in pks if pk not in by_id}
+
+    def invalidate(self) -> None:
+        self._snapshot = None
+
+
+chapters = ReferenceTable(Chapter, ChapterRef, "Chapter")
+status_effects = ReferenceTable(StatusEffect, StatusEffectRef, "Status effect")
+items = ReferenceTable(Item, ItemRef, "Item")
+pixls = ReferenceTable(Pixl, PixlRef, "Pixl")
@@ -0,0 +1,234 @@
+"""Read-replica routing with read-your-writes stickiness.
+
+``RoutingSession`` sends the statements of read-only requests (GET/HEAD) to a
+replica engine and everything else, including any flush, to the primary. After
+a request commits a write, ``ReadYourWritesMiddleware`` sets a short-lived
+cookie so the same client's reads stay on the primary until replicas have
+caught up.
+
+Replicas come from ``REPLICA_URLS`` (comma-separated database URLs). For
+development and tests, ``SQLITE_REPLICAS=N`` instead keeps N file copies of a
+SQLite primary refreshed every ``SQLITE_REPLICA_REFRESH_SECONDS`` with the
+SQLite backup API.
+"""
+import itertools
+import os
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from http.cookies import SimpleCookie
+from pathlib import Path
+from typing import List, Optional
+
+from sqlalchemy import create_engine, event
+from sqlalchemy.engine import Engine, make_url
+from sqlalchemy.orm import Session
+
+import slow_query_log
+
+STICKY_COOKIE = "pm_primary_until"
+STICKY_SECONDS = float(os.getenv("READ_YOUR_WRITES_SECONDS", "5"))
+
+_ROUTING_KEY = "db_routing"
+_READ_METHODS = ("GET", "HEAD")
+
+
+class SqliteBackupReplica:
+    """A SQLite file copy of the primary, refreshed periodically with the backup API."""
+
+    def __init__(self, primary_path: str, replica_path: str, interval: float):
+        self.primary_path = primary_path
+        self.replica_path = replica_path
+        self.interval = interval
+        self.last_refreshed: Optional[float] = None
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        Path(replica_path).parent.mkdir(parents=True, exist_ok=True)
+        self.engine = create_engine(
+            f"sqlite:///file:{replica_path}?mode=ro&uri=true",
+            connect_args={"timeout": 30, "check_same_thread": False}
+        )
+
+    def refresh(self) -> None:
+        source = sqlite3.connect(self.primary_path)
+        target = sqlite3.connect(self.replica_path, timeout=30)
+        try:
+            source.backup(target)
+        finally:
+            target.close()
+            source.close()
+        self.last_refreshed = time.time()
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval):
+            try:
+                self.refresh()
+            except sqlite3.Error:
+                # Busy primary or replica; the next round retries
+                continue
+
+    def start(self) -> None:
+        self.refresh()
+        self._stop.clear()
+        self._thread = threading.Thread(
+            target=self._run, name=f"sqlite-replica-{Path(self.replica_path).stem}", daemon=True
+        )
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+
+class ReplicaSet:
+    """The replica engines reads are balanced across."""
+
+    def __init__(self, engines: List[Engine], sqlite_replicas: List[SqliteBackupReplica] = ()):
+        self.engines = list(engines)
+        self.sqlite_replicas = list(sqlite_replicas)
+        self._next = itertools.cycle(range(len(self.engines))) if self.engines else None
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_env(cls, primary: Engine) -> "ReplicaSet":
+        urls = [url.strip() for url in os.getenv("REPLICA_URLS", "").split(",") if url.strip()]
+        engines = [create_engine(url, future=True) for url in urls]
+
+        sqlite_replicas = []
+        count = int(os.getenv("SQLITE_REPLICAS", "0"))
+        primary_path = make_url(str(primary.url)).database if primary.dialect.name == "sqlite" else None
+        if count and primary_path and primary_path != ":memory:":
+            directory = Path(os.getenv("SQLITE_REPLICA_DIR", Path(primary_path).parent / ".replicas"))
+            interval = float(os.getenv("SQLITE_REPLICA_REFRESH_SECONDS", "2"))
+            for i in range(count):
+                replica_path = str(directory / f"{Path(primary_path).stem}.replica{i}.db")
+                sqlite_replicas.append(SqliteBackupReplica(primary_path, replica_path, interval))
+            engines += [replica.engine for replica in sqlite_replicas]
+
+        for engine in engines:
+            slow_query_log.install(engine)
+        return cls(engines, sqlite_replicas)
+
+    def choose(self) -> Optional[Engine]:
+        if not self.engines:
+            return None
+        with self._lock:
+            return self.engines[next(self._next)]
+
+    def start(self) -> None:
+        for replica in self.sqlite_replicas:
+            replica.start()
+
+    def stop(self) -> None:
+        for replica in self.sqlite_replicas:
+            replica.stop()
+
+
+class RoutingSession(Session):
+    """Session that reads from a replica when its request is read-only."""
+
+    def __init__(self, replicas: Optional[ReplicaSet] = None, **kwargs):
+        super().__init__(**kwargs)
+        self.replicas = replicas
+
+    def get_bind(self, mapper=None, clause=None, **kwargs):
+        if (
+            self.replicas is not None
+            and self.info.get("read_only")
+            and not self.info.get("force_primary")
+            and not self._flushing
+            and not (self.new or self.dirty or self.deleted)
+        ):
+            replica = self.info.get("replica")
+            if replica is None:
+                # One replica per session keeps its reads consistent with each other
+                replica = self.info["replica"] = self.replicas.choose()
+            if replica is not None:
+                return replica
+        return super().get_bind(mapper=mapper, clause=clause, **kwargs)
+
+
+@contextmanager
+def use_primary(session: Session):
+    """Read from the primary inside the block, e.g. to fill a version-keyed cache."""
+    previous = session.info.get("force_primary")
+    session.info["force_primary"] = True
+    try:
+        yield session
+    finally:
+        session.info["force_primary"] = previous
+
+
+def bind_request(session: Session, scope) -> None:
+    """Mark the session read-only or not from its request's routing state."""
+    routing = scope.get(_ROUTING_KEY) if scope is not None else None
+    if routing is None:
+        read_only = scope is not None and scope.get("method") in _READ_METHODS
+    else:
+        read_only = routing["read_only"]
+        session.info[_ROUTING_KEY] = routing
+    session.info["read_only"] = read_only
+
+
+def note_write(session: Session) -> None:
+    """Record a write committed on the request's behalf by another session (group commit)."""
+    routing = session.info.get(_ROUTING_KEY)
+    if routing is not None:
+        routing["wrote"] = True
+
+
+@event.listens_for(Session, "after_flush")
+def _note_flushed_writes(session, flush_context):
+    if session.info.get(_ROUTING_KEY) is not None:
+        session.info["wrote"] = True
+
+
+@event.listens_for(Session, "after_commit")
+def _note_committed_writes(session):
+    if session.info.pop("wrote", False):
+        session.info[_ROUTING_KEY]["wrote"] = True
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_rolled_back_writes(session):
+    session.info.pop("wrote", None)
+
+
+def _sticky_until(scope) -> float:
+    for name, value in scope.get("headers", ()):
+        if name == b"cookie":
+            cookie = SimpleCookie(value.decode("latin-1"))
+            if STICKY_COOKIE in cookie:
+                try:
+                    return float(cookie[STICKY_COOKIE].value)
+                except ValueError:
+                    return 0.0
+    return 0.0
+
+
+class ReadYourWritesMiddleware:
+    """Route a request's reads to replicas unless its client wrote recently."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        sticky = _sticky_until(scope) > time.time()
+        routing = {"read_only": scope["method"] in _READ_METHODS and not sticky, "wrote": False}
+        scope[_ROUTING_KEY] = routing
+
+        async def send_with_cookie(message):
+            if message["type"] == "http.response.start" and routing["wrote"]:
+                until = time.time() + STICKY_SECONDS
+                cookie = f"{STICKY_COOKIE}={until:.3f}; Max-Age={int(STICKY_SECONDS) + 1}; Path=/; HttpOnly; SameSite=Lax"
+                message = {**message, "headers": [*message.get("headers", []), (b"set-cookie", cookie.encode("latin-1"))]}
+            await send(message)
+
+        await self.app(scope, receive, send_with_cookie)
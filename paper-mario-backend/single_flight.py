@@ -0,0 +1,150 @@
+"""Single-flight coalescing of identical concurrent GET requests.
+
+When many clients ask for the same expensive read at the same moment (say,
+just after a cache entry expired), only the first request (the leader) runs
+the endpoint. Identical requests that arrive while it is in flight wait for
+it and receive a copy of its status, headers and body bytes. The leader's
+``Set-Cookie`` headers are not copied.
+
+Requests are identical when they share the method, path, the query
+parameters (order-insensitive) and the ``Accept`` / ``Accept-Encoding``
+headers. Only paths under ``SINGLE_FLIGHT_PATHS`` are coalesced (default
+``/queries/,/views/,/analytics/``; empty disables it), and only requests
+that ``ReadYourWritesMiddleware`` considers read-only: a client that just
+wrote must not receive a response computed before its write.
+
+The middleware wraps the whole application, so it applies equally to
+``async def`` endpoints and to plain ``def`` endpoints that FastAPI runs in
+its threadpool. Coalescing is per worker process.
+"""
+import asyncio
+import os
+import threading
+from typing import Dict, List, Optional, Tuple
+from urllib.parse import parse_qsl
+
+PATH_PREFIXES = tuple(
+    prefix.strip()
+    for prefix in os.getenv("SINGLE_FLIGHT_PATHS", "/queries/,/views/,/analytics/").split(",")
+    if prefix.strip()
+)
+
+# Headers that change the response; conditional ones decide between 200 and 304
+_KEY_HEADERS = (b"accept", b"accept-encoding", b"if-modified-since", b"if-none-match")
+_ROUTING_KEY = "db_routing"
+
+# Per route template: {"executions": n, "coalesced": n}
+_stats: Dict[str, Dict[str, int]] = {}
+_stats_lock = threading.Lock()
+
+
+def _count(route: str, field: str) -> None:
+    with _stats_lock:
+        counters = _stats.setdefault(route, {"executions": 0, "coalesced": 0})
+        counters[field] += 1
+
+
+def metrics() -> Dict:
+    """Executions and coalesced (served from another request's result) per route."""
+    with _stats_lock:
+        routes = {route: dict(counters) for route, counters in _stats.items()}
+    executions = sum(counters["executions"] for counters in routes.values())
+    coalesced = sum(counters["coalesced"] for counters in routes.values())
+    return {
+        "paths": list(PATH_PREFIXES),
+        "totals": {
+            "executions": executions,
+            "coalesced": coalesced,
+            "coalesced_ratio": coalesced / (executions + coalesced) if executions + coalesced else 0.0,
+        },
+        "routes": routes,
+    }
+
+
+def reset() -> None:
+    with _stats_lock:
+        _stats.clear()
+
+
+def request_key(scope) -> Tuple:
+    """Normalized identity of a request: method, path, sorted params, content negotiation."""
+    params = tuple(sorted(parse_qsl(scope.get("query_string", b"").decode("latin-1"), keep_blank_values=True)))
+    headers = tuple(sorted(
+        (name, value) for name, value in scope.get("headers", ()) if name in _KEY_HEADERS
+    ))
+    return scope["method"], scope["path"], params, headers
+
+
+def _route_label(scope) -> str:
+    route = scope.get("route")
+    return getattr(route, "path", None) or scope["path"]
+
+
+class _Flight:
+    """One in-progress execution and the response it produced."""
+
+    def __init__(self):
+        self.done = asyncio.Event()
+        self.messages: Optional[List[dict]] = None
+        self.route: Optional[str] = None
+
+
+class SingleFlightMiddleware:
+    """Run identical concurrent GETs once and share the response bytes."""
+
+    def __init__(self, app, path_prefixes: Tuple[str, ...] = PATH_PREFIXES):
+        self.app = app
+        self.path_prefixes = path_prefixes
+        self._flights: Dict[Tuple, _Flight] = {}
+
+    def _eligible(self, scope) -> bool:
+        if scope["type"] != "http" or scope["method"] not in ("GET", "HEAD"):
+            return False
+        if not self.path_prefixes or not scope["path"].startswith(self.path_prefixes):
+            return False
+        routing = scope.get(_ROUTING_KEY)
+        return routing is None or routing["read_only"]
+
+    async def __call__(self, scope, receive, send):
+        if not self._eligible(scope):
+            await self.app(scope, receive, send)
+            return
+
+        key = request_key(scope)
+        while key in self._flights:
+            flight = self._flights[key]
+            await flight.done.wait()
+            if flight.messages is not None:
+                _count(flight.route, "coalesced")
+                for message in flight.messages:
+                    await send(message)
+                return
+            # The leader failed before completing a response; the first waiter
+            # to wake up becomes the next leader
+
+        flight = self._flights[key] = _Flight()
+        start: Optional[dict] = None
+        body: List[bytes] = []
+
+        async def capture(message):
+            nonlocal start
+            if message["type"] == "http.response.start":
+                start = message
+            elif message["type"] == "http.response.body":
+                body.append(message.get("body", b""))
+            await send(message)
+
+        try:
+            await self.app(scope, receive, capture)
+            flight.route = _route_label(scope)
+            _count(flight.route, "executions")
+            if start is not None:
+                headers = [(name, value) for name, value in start.get("headers", []) if name != b"set-cookie"]
+                flight.messages = [
+                    {**start, "headers": headers},
+                    {"type": "http.response.body", "body": b"".join(body), "more_body": False},
+                ]
+        finally:
+            if self._flights.get(key) is flight:
+                del self._flights[key]
+            flight.done.set()
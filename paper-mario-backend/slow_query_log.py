@@ -0,0 +1,186 @@
+"""Structured slow-query log with automatic query plan capture.
+
+Replaces ``echo=True``: instead of printing every statement, statements slower
+than ``SLOW_QUERY_MS`` are recorded with their duration, bound parameters
+(only their type names unless ``SLOW_QUERY_REDACT=0``), the request that
+issued them and the database's query plan. Records go to the
+``paper_mario.slow_queries`` logger as JSON and into a bounded ring buffer
+served at ``/admin/slow-queries``.
+
+Only a ``SLOW_QUERY_SAMPLE_RATE`` fraction of statements is timed, and the plan
+is captured once per distinct statement text, so the cost per statement is a
+random draw and two clock reads.
+"""
+import contextvars
+import json
+import logging
+import os
+import random
+import threading
+import time
+from collections import OrderedDict, deque
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+logger = logging.getLogger("paper_mario.slow_queries")
+
+THRESHOLD_MS = float(os.getenv("SLOW_QUERY_MS", "100"))
+SAMPLE_RATE = float(os.getenv("SLOW_QUERY_SAMPLE_RATE", "1.0"))
+REDACT_PARAMS = os.getenv("SLOW_QUERY_REDACT", "1").lower() not in ("0", "false", "no")
+BUFFER_SIZE = int(os.getenv("SLOW_QUERY_BUFFER", "200"))
+
+# Plans are cached per statement text; bounded so ad-hoc SQL cannot grow it
+_PLAN_CACHE_SIZE = 512
+
+_EXPLAIN_PREFIX = {
+    "sqlite": "EXPLAIN QUERY PLAN ",
+    "postgresql": "EXPLAIN ",
+    "mysql": "EXPLAIN ",
+}
+
+_records: deque = deque(maxlen=BUFFER_SIZE)
+_records_lock = threading.Lock()
+_plans: "OrderedDict[str, Optional[List[str]]]" = OrderedDict()
+_plans_lock = threading.Lock()
+
+# ASGI scope of the request being served, set by RequestContextMiddleware
+_current_request: contextvars.ContextVar = contextvars.ContextVar("slow_query_request", default=None)
+
+
+class RequestContextMiddleware:
+    """Remember the current request so slow statements can name their route."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] not in ("http", "websocket"):
+            await self.app(scope, receive, send)
+            return
+        token = _current_request.set(scope)
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            _current_request.reset(token)
+
+
+def _request_info() -> Optional[Dict[str, Any]]:
+    scope = _current_request.get()
+    if scope is None:
+        return None
+    # The matched route is only known once routing ran, which is before any query
+    route = scope.get("route")
+    return {
+        "method": scope.get("method", "WEBSOCKET"),
+        "path": scope["path"],
+        "route": getattr(route, "path", None),
+    }
+
+
+def _redact(parameters):
+    if isinstance(parameters, dict):
+        return {key: type(value).__name__ for key, value in parameters.items()}
+    if isinstance(parameters, (list, tuple)):
+        return [type(value).__name__ for value in parameters]
+    return type(parameters).__name__
+
+
+def _jsonable(parameters):
+    if isinstance(parameters, dict):
+        return {key: _jsonable(value) for key, value in parameters.items()}
+    if isinstance(parameters, (list, tuple)):
+        return [_jsonable(value) for value in parameters]
+    if parameters is None or isinstance(parameters, (bool, int, float, str)):
+        return parameters
+    return str(parameters)
+
+
+def _explain(conn, statement: str, parameters, executemany: bool) -> Optional[List[str]]:
+    """Query plan for a statement, captured once per statement text."""
+    with _plans_lock:
+        if statement in _plans:
+            _plans.move_to_end(statement)
+            return _plans[statement]
+
+    plan = None
+    prefix = _EXPLAIN_PREFIX.get(conn.dialect.name)
+    head = statement.lstrip()[:7].upper()
+    if prefix and not executemany and not head.startswith(("EXPLAIN", "PRAGMA")):
+        # A separate DBAPI cursor keeps the statement's own results intact
+        cursor = conn.connection.cursor()
+        try:
+            cursor.execute(prefix + statement, parameters)
+            rows = cursor.fetchall()
+            if conn.dialect.name == "sqlite":
+                # (id, parent, notused, detail): keep just the detail text
+                plan = [row[3] for row in rows]
+            else:
+                plan = [" | ".join(str(col) for col in row) for row in rows]
+        except Exception as exc:
+            plan = [f"EXPLAIN failed: {exc}"]
+        finally:
+            cursor.close()
+
+    with _plans_lock:
+        _plans[statement] = plan
+        while len(_plans) > _PLAN_CACHE_SIZE:
+            _plans.popitem(last=False)
+    return plan
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if SAMPLE_RATE >= 1.0 or random.random() < SAMPLE_RATE:
+        context._slow_query_start = time.perf_counter()
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    start = getattr(context, "_slow_query_start", None)
+    if start is None:
+        return
+    duration_ms = (time.perf_counter() - start) * 1000
+    if duration_ms < THRESHOLD_MS:
+        return
+
+    record = {
+        "timestamp": datetime.now(timezone.utc).isoformat(),
+        "duration_ms": round(duration_ms, 3),
+        "statement": statement,
+        "parameters": _redact(parameters) if REDACT_PARAMS else _jsonable(parameters),
+        "executemany": executemany,
+        "request": _request_info(),
+        "plan": _explain(conn, statement, parameters, executemany),
+    }
+    with _records_lock:
+        _records.append(record)
+    logger.warning(json.dumps(record))
+
+
+def install(engine: Engine) -> None:
+    """Start timing statements executed on ``engine``."""
+    event.listen(engine, "before_cursor_execute", _before_cursor_execute)
+    event.listen(engine, "after_cursor_execute", _after_cursor_execute)
+
+
+def recent(limit: Optional[int] = None) -> List[Dict[str, Any]]:
+    """Most recent slow queries, newest first."""
+    with _records_lock:
+        records = list(_records)
+    records.reverse()
+    return records[:limit] if limit is not None else records
+
+
+def clear() -> None:
+    with _records_lock:
+        _records.clear()
+
+
+def settings() -> Dict[str, Any]:
+    return {
+        "threshold_ms": THRESHOLD_MS,
+        "sample_rate": SAMPLE_RATE,
+        "redact_params": REDACT_PARAMS,
+        "buffer_size": BUFFER_SIZE,
+    }
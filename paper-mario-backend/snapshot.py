@@ -0,0 +1,213 @@
+"""Read-only in-memory snapshot serving.
+
+The public catalog deployment only changes its data at release time. With
+``SNAPSHOT_MODE=1`` a worker serves it entirely from RAM:
+
+- At startup the SQLite database at ``SNAPSHOT_PATH`` (default: the file of
+  ``DATABASE_URL``) is read once with the backup API. Every SQL view is then
+  materialized into a table of the same name, so ``/views/*`` read
+  precomputed rows, and every chapter document is built and held in memory.
+- The prepared database is kept as a serialized image. Each pooled
+  connection deserializes its own private copy, with ``query_only`` set, so
+  GETs share no file, page cache or lock. Memory use is the database size
+  times the open connections.
+- ``ReadOnlyMiddleware`` answers every write outside ``/admin`` with
+  ``405 Method Not Allowed``, and the background jobs that write are not
+  started.
+- ``POST /admin/snapshot/reload`` prepares a new snapshot from the file (for
+  example after the release copied it into place) and swaps it in
+  atomically. Like every ``/admin`` endpoint in this mode it requires
+  ``ADMIN_TOKEN`` (see ``api.admin``), since a reload is expensive.
+  Requests already running finish on the snapshot they started with; later
+  sessions use the new one. Every in-process cache is then invalidated.
+
+Snapshots are per worker process; reload each worker.
+"""
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from typing import Dict, List, Optional
+
+from sqlalchemy import create_engine
+from sqlalchemy.engine import Engine, make_url
+from sqlalchemy.pool import QueuePool
+
+logger = logging.getLogger("paper_mario.snapshot")
+
+ENABLED = os.getenv("SNAPSHOT_MODE", "0") == "1"
+
+# How long a reload waits for requests on the previous snapshot to finish
+DRAIN_SECONDS = 10.0
+
+_READ_METHODS = ("GET", "HEAD", "OPTIONS")
+_WRITABLE_PREFIXES = ("/admin",)
+
+
+def _default_path() -> Optional[str]:
+    from config import DATABASE_URL
+
+    url = make_url(DATABASE_URL)
+    return url.database if url.get_backend_name() == "sqlite" else None
+
+
+def _materialize_views(connection: sqlite3.Connection) -> List[str]:
+    """Replace every view with a table holding its current rows; returns their names."""
+    views = [name for (name,) in connection.execute("SELECT name FROM sqlite_master WHERE type = 'view'")]
+    # Fill every table before dropping any view, since views may read each other
+    for name in views:
+        connection.execute(f'CREATE TABLE "{name}__materialized" AS SELECT * FROM "{name}"')
+    for name in views:
+        connection.execute(f'DROP VIEW "{name}"')
+    for name in views:
+        connection.execute(f'ALTER TABLE "{name}__materialized" RENAME TO "{name}"')
+    connection.commit()
+    return views
+
+
+def _engine(image: bytes, read_only: bool) -> Engine:
+    """Engine whose every connection is a private in-memory copy of ``image``."""
+    def connect():
+        connection = sqlite3.connect(":memory:", check_same_thread=False)
+        connection.deserialize(image)
+        if read_only:
+            connection.execute("PRAGMA query_only = 1")
+        return connection
+
+    return create_engine("sqlite://", creator=connect, poolclass=QueuePool, future=True)
+
+
+def _drain(engine: Engine) -> None:
+    """Wait (up to DRAIN_SECONDS) until no connection of ``engine`` is in use."""
+    deadline = time.monotonic() + DRAIN_SECONDS
+    while engine.pool.checkedout() and time.monotonic() < deadline:
+        time.sleep(0.05)
+
+
+class Snapshot:
+    """One prepared database image and the engine serving it."""
+
+    def __init__(self, path: str, image: bytes, views: List[str], seconds: float):
+        import slow_query_log
+
+        self.path = path
+        self.image = image
+        self.views = views
+        self.load_seconds = seconds
+        self.loaded_at = time.time()
+        self.engine = _engine(image, read_only=True)
+        slow_query_log.install(self.engine)
+
+    @classmethod
+    def load(cls, path: str) -> "Snapshot":
+        started = time.perf_counter()
+        source = sqlite3.connect(f"file:{path}?mode=ro", uri=True)
+        staging = sqlite3.connect(":memory:")
+        try:
+            source.backup(staging)
+            views = _materialize_views(staging)
+            image = staging.serialize()
+        finally:
+            staging.close()
+            source.close()
+        return cls(path, image, views, time.perf_counter() - started)
+
+    def info(self) -> Dict:
+        return {
+            "path": self.path,
+            "bytes": len(self.image),
+            "materialized_views": self.views,
+            "load_seconds": round(self.load_seconds, 3),
+            "loaded_at": self.loaded_at,
+        }
+
+
+class SnapshotStore:
+    """The snapshot currently served, and atomic reloads of it."""
+
+    def __init__(self, path: Optional[str]):
+        self.path = path
+        self.current: Optional[Snapshot] = None
+        self.reloads = 0
+        self._lock = threading.Lock()
+
+    def reload(self) -> Snapshot:
+        """Load the file again and serve it from the next session on."""
+        from config import Base, SessionLocal
+
+        import table_versions
+
+        path = self.path or _default_path()
+        if not path:
+            raise RuntimeError("SNAPSHOT_MODE needs a SQLite DATABASE_URL or SNAPSHOT_PATH")
+        tables = list(Base.metadata.tables)
+        with self._lock:
+            snapshot = Snapshot.load(path)
+            previous = self.current
+            # New sessions bind to the new engine; open ones keep their connection
+            SessionLocal.configure(bind=snapshot.engine, replicas=None)
+            self.current = snapshot
+            table_versions.bump(tables)
+            if previous is not None:
+                self.reloads += 1
+                # A request still reading the old snapshot may have refilled a
+                # cache with old rows; invalidate again once it has finished
+                _drain(previous.engine)
+                previous.engine.dispose()
+                table_versions.bump(tables)
+        self._warm()
+        logger.info("Serving snapshot of %s (%d bytes)", path, len(snapshot.image))
+        return snapshot
+
+    @staticmethod
+    def _warm() -> None:
+        """Build every chapter document (and the reference caches it reads) ahead of requests."""
+        from config import SessionLocal
+
+        import chapter_documents
+        import reference_cache
+
+        with SessionLocal() as db:
+            for chapter in reference_cache.chapters.all(db):
+                for view in chapter_documents.VIEWS:
+                    chapter_documents.get_compressed(db, chapter.chapter_id, view)
+
+    def info(self) -> Dict:
+        return {
+            "enabled": ENABLED,
+            "path": self.path or _default_path(),
+            "reloads": self.reloads,
+            "snapshot": self.current.info() if self.current is not None else None,
+        }
+
+
+class ReadOnlyMiddleware:
+    """Reject writes while serving a read-only snapshot."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if (
+            scope["type"] != "http"
+            or scope["method"] in _READ_METHODS
+            or scope["path"].startswith(_WRITABLE_PREFIXES)
+        ):
+            await self.app(scope, receive, send)
+            return
+        body = json.dumps({"detail": "This deployment serves a read-only snapshot"}).encode("utf-8")
+        await send({
+            "type": "http.response.start",
+            "status": 405,
+            "headers": [
+                (b"content-type", b"application/json"),
+                (b"content-length", str(len(body)).encode("latin-1")),
+                (b"allow", b"GET, HEAD"),
+            ],
+        })
+        await send({"type": "http.response.body", "body": body})
+
+
+store = SnapshotStore(os.getenv("SNAPSHOT_PATH"))
@@ -1,6 +1,8 @@
 """Stored procedures - Complex database operations with transactions."""
+import functools
 from sqlalchemy.orm import Session
 from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.orm.exc import StaleDataError
 from datetime import datetime, timedelta
 from typing import Dict, List, Optional
 
@@ -11,6 +13,42 @@ from models import (
 )
 from models.side_quests import QuestRole
 from models.status_effects import EffectType
+import reference_cache
+from concurrency import CAS_ATTEMPTS
+
+
+def _compare_and_swap(procedure):
+    """
+    Re-run a procedure whose optimistic version check failed.
+
+    Rows are updated with ``WHERE version = <version read>``, so a concurrent
+    writer makes the commit raise ``StaleDataError`` instead of overwriting
+    its change. The procedure is then re-run against fresh rows, re-checking
+    its preconditions (e.g. that the source block still holds the item).
+    """
+    @functools.wraps(procedure)
+    def wrapper(db: Session, *args, **kwargs) -> Dict:
+        for _ in range(CAS_ATTEMPTS):
+            try:
+                return procedure(db, *args, **kwargs)
+            except StaleDataError:
+                db.rollback()
+        return {
+            "success": False,
+            "error": f"Rows kept changing concurrently; gave up after {CAS_ATTEMPTS} attempts"
+        }
+    return wrapper
+
+
+def _finish(db: Session, commit: bool) -> None:
+    """
+    Commit a procedure's writes, or with ``commit=False`` only flush them, for
+    a caller that commits them together with its own (an idempotency key).
+    """
+    if commit:
+        db.commit()
+    else:
+        db.flush()
 
 
 class StoredProcedures:
@@ -24,7 +62,8 @@ class StoredProcedures:
         hp: int,
         attack: int,
         defense: int,
-        card_score: int
+        card_score: int,
+        commit: bool = True
     ) -> Dict:
         """
         Stored Procedure: Create an enemy with its character in one transaction.
@@ -54,7 +93,7 @@ class StoredProcedures:
                 card_score=card_score
             )
             db.add(enemy)
-            db.commit()
+            _finish(db, commit)
             
             return {
                 "success": True,
@@ -78,7 +117,8 @@ class StoredProcedures:
         description: str,
         chapter_id: int,
         phase_count: int,
-        special_mechanics: Optional[str] = None
+        special_mechanics: Optional[str] = None,
+        commit: bool = True
     ) -> Dict:
         """
         Stored Procedure: Create a boss with its character in one transaction.
@@ -91,7 +131,7 @@ class StoredProcedures:
         """
         try:
             # Validate chapter
-            chapter = db.query(Chapter).filter(Chapter.chapter_id == chapter_id).first()
+            chapter = reference_cache.chapters.get(db, chapter_id)
             if not chapter:
                 return {
                     "success": False,
@@ -111,7 +151,7 @@ class StoredProcedures:
                 special_mechanics=special_mechanics
             )
             db.add(boss)
-            db.commit()
+            _finish(db, commit)
             
             return {
                 "success": True,
@@ -137,7 +177,8 @@ class StoredProcedures:
         reward_item_id: Optional[int],
         quest_giver_id: Optional[int] = None,
         quest_target_id: Optional[int] = None,
-        quest_helper_ids: Optional[List[int]] = None
+        quest_helper_ids: Optional[List[int]] = None,
+        commit: bool = True
     ) -> Dict:
         """
         Stored Procedure: Create a side quest with all related characters.
@@ -153,15 +194,13 @@ class StoredProcedures:
         try:
             # Validate location
             if start_location_id:
-                location = db.query(Location).filter(
-                    Location.location_id == start_location_id
-                ).first()
+                location = db.get(Location, start_location_id)
                 if not location:
                     return {"success": False, "error": f"Location {start_location_id} not found"}
             
             # Validate reward item
             if reward_item_id:
-                item = db.query(Item).filter(Item.item_id == reward_item_id).first()
+                item = reference_cache.items.get(db, reward_item_id)
                 if not item:
                     return {"success": False, "error": f"Item {reward_item_id} not found"}
             
@@ -179,28 +218,24 @@ class StoredProcedures:
             
             # Add quest giver
             if quest_giver_id:
-                char = db.query(Character).filter(
-                    Character.character_id == quest_giver_id
-                ).first()
+                char = db.get(Character, quest_giver_id)
                 if char:
                     qc = QuestCharacter(
                         quest_id=quest.quest_id,
                         character_id=quest_giver_id,
-                        role=QuestRole.GIVER
+                        role=QuestRole.giver
                     )
                     db.add(qc)
                     characters_added.append({"name": char.name, "role": "giver"})
             
             # Add quest target
             if quest_target_id:
-                char = db.query(Character).filter(
-                    Character.character_id == quest_target_id
-                ).first()
+                char = db.get(Character, quest_target_id)
                 if char:
                     qc = QuestCharacter(
                         quest_id=quest.quest_id,
                         character_id=quest_target_id,
-                        role=QuestRole.TARGET
+                        role=QuestRole.target
                     )
                     db.add(qc)
                     characters_added.append({"name": char.name, "role": "target"})
@@ -208,19 +243,17 @@ class StoredProcedures:
             # Add quest helpers
             if quest_helper_ids:
                 for helper_id in quest_helper_ids:
-                    char = db.query(Character).filter(
-                        Character.character_id == helper_id
-                    ).first()
+                    char = db.get(Character, helper_id)
                     if char:
                         qc = QuestCharacter(
                             quest_id=quest.quest_id,
                             character_id=helper_id,
-                            role=QuestRole.HELPER
+                            role=QuestRole.helper
                         )
                         db.add(qc)
                         characters_added.append({"name": char.name, "role": "helper"})
             
-            db.commit()
+            _finish(db, commit)
             
             return {
                 "success": True,
@@ -238,11 +271,71 @@ class StoredProcedures:
             }
     
     @staticmethod
-    def apply_status_effect_to_character(
+    def stage_status_effect(
         db: Session,
         character_id: int,
         status_id: int,
         duration_seconds: int
+    ) -> Dict:
+        """
+        Validate and stage (but do not commit) a status effect application.
+
+        The caller commits, either right away (``apply_status_effect_to_character``)
+        or together with other requests' writes (``group_commit``).
+        """
+        # Validate character
+        character = db.get(Character, character_id)
+        if not character:
+            return {"success": False, "error": f"Character {character_id} not found"}
+        
+        # Validate status effect
+        status = reference_cache.status_effects.get(db, status_id)
+        if not status:
+            return {"success": False, "error": f"Status effect {status_id} not found"}
+        
+        # Check if already applied
+        existing = db.get(
+            CharacterStatusEffect,
+            {"character_id": character_id, "status_id": status_id}
+        )
+        
+        now = datetime.utcnow()
+        expires_at = now + timedelta(seconds=duration_seconds)
+        
+        if existing:
+            # Update expiration
+            existing.expires_at = expires_at
+            action = "updated"
+        else:
+            # Create new
+            char_status = CharacterStatusEffect(
+                character_id=character_id,
+                status_id=status_id,
+                applied_at=now,
+                expires_at=expires_at
+            )
+            db.add(char_status)
+            action = "applied"
+        
+        return {
+            "success": True,
+            "character_name": character.name,
+            "status_name": status.name,
+            "effect_type": status.effect_type.value,
+            "applied_at": now.isoformat(),
+            "expires_at": expires_at.isoformat(),
+            "action": action,
+            "message": f"Status '{status.name}' {action} to '{character.name}'"
+        }
+    
+    @staticmethod
+    @_compare_and_swap
+    def apply_status_effect_to_character(
+        db: Session,
+        character_id: int,
+        status_id: int,
+        duration_seconds: int,
+        commit: bool = True
     ) -> Dict:
         """
         Stored Procedure: Apply a status effect to a character.
@@ -255,57 +348,15 @@ class StoredProcedures:
         5. Commit or rollback
         """
         try:
-            # Validate character
-            character = db.query(Character).filter(
-                Character.character_id == character_id
-            ).first()
-            if not character:
-                return {"success": False, "error": f"Character {character_id} not found"}
-            
-            # Validate status effect
-            status = db.query(StatusEffect).filter(
-                StatusEffect.status_id == status_id
-            ).first()
-            if not status:
-                return {"success": False, "error": f"Status effect {status_id} not found"}
-            
-            # Check if already applied
-            existing = db.query(CharacterStatusEffect).filter(
-                CharacterStatusEffect.character_id == character_id,
-                CharacterStatusEffect.status_id == status_id
-            ).first()
-            
-            now = datetime.utcnow()
-            expires_at = now + timedelta(seconds=duration_seconds)
-            
-            if existing:
-                # Update expiration
-                existing.expires_at = expires_at
-                action = "updated"
-            else:
-                # Create new
-                char_status = CharacterStatusEffect(
-                    character_id=character_id,
-                    status_id=status_id,
-                    applied_at=now,
-                    expires_at=expires_at
-                )
-                db.add(char_status)
-                action = "applied"
-            
-            db.commit()
-            
-            return {
-                "success": True,
-                "character_name": character.name,
-                "status_name": status.name,
-                "effect_type": status.effect_type.value,
-                "applied_at": now.isoformat(),
-                "expires_at": expires_at.isoformat(),
-                "action": action,
-                "message": f"Status '{status.name}' {action} to '{character.name}'"
-            }
+            result = StoredProcedures.stage_status_effect(
+                db, character_id, status_id, duration_seconds
+            )
+            if result["success"]:
+                _finish(db, commit)
+            return result
             
+        except StaleDataError:
+            raise  # retried by _compare_and_swap
         except SQLAlchemyError as e:
             db.rollback()
             return {
@@ -317,7 +368,8 @@ class StoredProcedures:
     def populate_location_with_blocks(
         db: Session,
         location_id: int,
-        block_configs: List[Dict]
+        block_configs: List[Dict],
+        commit: bool = True
     ) -> Dict:
         """
         Stored Procedure: Populate a location with multiple blocks at once.
@@ -333,9 +385,7 @@ class StoredProcedures:
         """
         try:
             # Validate location
-            location = db.query(Location).filter(
-                Location.location_id == location_id
-            ).first()
+            location = db.get(Location, location_id)
             if not location:
                 return {"success": False, "error": f"Location {location_id} not found"}
             
@@ -343,9 +393,7 @@ class StoredProcedures:
             item_ids = [cfg.get('contains_item_id') for cfg in block_configs 
                        if cfg.get('contains_item_id')]
             if item_ids:
-                items = db.query(Item).filter(Item.item_id.in_(item_ids)).all()
-                valid_item_ids = {item.item_id for item in items}
-                invalid = set(item_ids) - valid_item_ids
+                invalid = reference_cache.items.missing(db, item_ids)
                 if invalid:
                     return {
                         "success": False,
@@ -369,7 +417,7 @@ class StoredProcedures:
                     "contains_item_id": block.contains_item_id
                 })
             
-            db.commit()
+            _finish(db, commit)
             
             return {
                 "success": True,
@@ -394,7 +442,7 @@ class StoredProcedures:
         Returns comprehensive chapter data in one query.
         """
         try:
-            chapter = db.query(Chapter).filter(Chapter.chapter_id == chapter_id).first()
+            chapter = reference_cache.chapters.get(db, chapter_id)
             if not chapter:
                 return {"success": False, "error": f"Chapter {chapter_id} not found"}
             
@@ -407,9 +455,10 @@ class StoredProcedures:
                 Character, Boss.character_id == Character.character_id
             ).filter(Boss.chapter_id == chapter_id).all()
             
-            pixls = db.query(Pixl).filter(
-                Pixl.unlock_chapter_id == chapter_id
-            ).all()
+            pixls = [
+                pixl for pixl in reference_cache.pixls.all(db)
+                if pixl.unlock_chapter_id == chapter_id
+            ]
             
             playable_chars = db.query(PlayableCharacter, Character).join(
                 Character, PlayableCharacter.character_id == Character.character_id
@@ -468,10 +517,12 @@ class StoredProcedures:
             }
     
     @staticmethod
+    @_compare_and_swap
     def transfer_item_between_blocks(
         db: Session,
         from_block_id: int,
-        to_block_id: int
+        to_block_id: int,
+        commit: bool = True
     ) -> Dict:
         """
         Stored Procedure: Transfer an item from one block to another.
@@ -484,12 +535,8 @@ class StoredProcedures:
         """
         try:
             # Get blocks
-            from_block = db.query(BlockContainer).filter(
-                BlockContainer.block_id == from_block_id
-            ).first()
-            to_block = db.query(BlockContainer).filter(
-                BlockContainer.block_id == to_block_id
-            ).first()
+            from_block = db.get(BlockContainer, from_block_id)
+            to_block = db.get(BlockContainer, to_block_id)
             
             if not from_block:
                 return {"success": False, "error": f"Source block {from_block_id} not found"}
@@ -500,16 +547,14 @@ class StoredProcedures:
                 return {"success": False, "error": "Source block has no item"}
             
             # Get item info
-            item = db.query(Item).filter(
-                Item.item_id == from_block.contains_item_id
-            ).first()
+            item = reference_cache.items.get(db, from_block.contains_item_id)
             
             # Transfer
             item_id = from_block.contains_item_id
             from_block.contains_item_id = None
             to_block.contains_item_id = item_id
             
-            db.commit()
+            _finish(db, commit)
             
             return {
                 "success": True,
@@ -520,6 +565,8 @@ class StoredProcedures:
                 "message": f"Item transferred from block {from_block_id} to {to_block_id}"
             }
             
+        except StaleDataError:
+            raise  # retried by _compare_and_swap
         except SQLAlchemyError as e:
             db.rollback()
             return {
@@ -0,0 +1,228 @@
+"""Switch-state reachability solver.
+
+Switches gate navigation objects, so which locations can be reached depends on
+which switches have been flipped. The solver models the world as follows:
+
+- A navigation object is *open* when no switch targets it, or when at least one
+  switch targeting it is on.
+- A location holding an open navigation object is a *portal*. Portals in the
+  same chapter are linked to each other; hub locations (Flipside, Flopside)
+  are linked into every chapter.
+- A switch can only be flipped once its location has been reached.
+
+Switch states are encoded as an integer bitset (bit ``i`` is the ``i``-th
+switch by ``switch_id``), and so are location sets, which keeps closure
+computation to a handful of integer operations per chapter. Closures are
+memoized per state, and ``solve`` runs a breadth-first search over switch
+states so the first hit uses the fewest switches.
+"""
+from collections import deque
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from sqlalchemy.orm import Session
+
+from models import Location, NavigationObject, Switch
+from models.locations import LocationType
+
+
+class SwitchGraph:
+    """Bitset representation of locations, navigation objects and switches."""
+
+    # Upper bound on memoized closures kept per graph
+    MAX_MEMO_STATES = 65536
+
+    def __init__(
+        self,
+        locations: Iterable[Tuple[int, int, bool]],
+        navobjs: Iterable[Tuple[int, int]],
+        switches: Iterable[Tuple[int, int, Optional[int]]]
+    ):
+        """
+        Args:
+            locations: (location_id, chapter_id, is_hub) tuples
+            navobjs: (navobj_id, location_id) tuples
+            switches: (switch_id, location_id, target_navobj_id) tuples
+        """
+        locations = sorted(locations)
+        self.location_ids = [loc_id for loc_id, _, _ in locations]
+        self._location_bit = {loc_id: 1 << i for i, loc_id in enumerate(self.location_ids)}
+
+        # One network mask per chapter; hubs are part of every network
+        hub_mask = 0
+        networks: Dict[int, int] = {}
+        for loc_id, chapter_id, is_hub in locations:
+            bit = self._location_bit[loc_id]
+            networks[chapter_id] = networks.get(chapter_id, 0) | bit
+            if is_hub:
+                hub_mask |= bit
+        self._hub_mask = hub_mask
+        self._networks = [mask | hub_mask for mask in networks.values()]
+
+        switches = sorted(switches)
+        self.switch_ids = [switch_id for switch_id, _, _ in switches]
+        self._switch_bit = {switch_id: 1 << i for i, switch_id in enumerate(self.switch_ids)}
+        self._switch_location = {}
+        self._switch_target = {}
+        gates: Dict[int, int] = {}
+        for switch_id, location_id, target_navobj_id in switches:
+            self._switch_location[switch_id] = self._location_bit.get(location_id, 0)
+            self._switch_target[switch_id] = target_navobj_id
+            if target_navobj_id is not None:
+                gates[target_navobj_id] = gates.get(target_navobj_id, 0) | self._switch_bit[switch_id]
+
+        # (navobj_id, location bit, gate mask); a gate mask of 0 means always open
+        self._navobjs = [
+            (navobj_id, self._location_bit.get(location_id, 0), gates.get(navobj_id, 0))
+            for navobj_id, location_id in sorted(navobjs)
+        ]
+        self._navobj_gates = {navobj_id: (loc_bit, gate) for navobj_id, loc_bit, gate in self._navobjs}
+        self._always_open = 0
+        for _, loc_bit, gate in self._navobjs:
+            if not gate:
+                self._always_open |= loc_bit
+
+        self._memo: Dict[Tuple[int, int], Tuple[int, int]] = {}
+
+    @classmethod
+    def from_db(cls, db: Session) -> "SwitchGraph":
+        """Load the graph with three narrow column queries."""
+        locations = [
+            (loc_id, chapter_id, loc_type == LocationType.hub)
+            for loc_id, chapter_id, loc_type in db.query(
+                Location.location_id, Location.chapter_id, Location.type
+            ).all()
+        ]
+        navobjs = db.query(NavigationObject.navobj_id, NavigationObject.location_id).all()
+        switches = db.query(Switch.switch_id, Switch.location_id, Switch.target_navobj_id).all()
+        return cls(locations, navobjs, switches)
+
+    def has_location(self, location_id: int) -> bool:
+        return location_id in self._location_bit
+
+    def has_switch(self, switch_id: int) -> bool:
+        return switch_id in self._switch_bit
+
+    def has_navobj(self, navobj_id: int) -> bool:
+        return navobj_id in self._navobj_gates
+
+    def hub_location_ids(self) -> List[int]:
+        return self.decode_locations(self._hub_mask)
+
+    def encode_switches(self, switch_ids: Iterable[int]) -> int:
+        """Encode switch ids as a state bitset. Raises KeyError on unknown ids."""
+        state = 0
+        for switch_id in switch_ids:
+            state |= self._switch_bit[switch_id]
+        return state
+
+    def decode_switches(self, state: int) -> List[int]:
+        return [switch_id for i, switch_id in enumerate(self.switch_ids) if state >> i & 1]
+
+    def encode_locations(self, location_ids: Iterable[int]) -> int:
+        """Encode location ids as a bitset. Raises KeyError on unknown ids."""
+        mask = 0
+        for location_id in location_ids:
+            mask |= self._location_bit[location_id]
+        return mask
+
+    def decode_locations(self, mask: int) -> List[int]:
+        return [loc_id for i, loc_id in enumerate(self.location_ids) if mask >> i & 1]
+
+    def open_navobj_ids(self, state: int, locations: int) -> List[int]:
+        """Open navigation objects inside the given location bitset."""
+        return [
+            navobj_id for navobj_id, loc_bit, gate in self._navobjs
+            if loc_bit & locations and (not gate or gate & state)
+        ]
+
+    def _portals(self, state: int) -> int:
+        portals = self._always_open
+        for _, loc_bit, gate in self._navobjs:
+            if gate & state:
+                portals |= loc_bit
+        return portals
+
+    def closure(self, state: int, starts: int) -> Tuple[int, int]:
+        """
+        Compute the locations reachable from ``starts`` under ``state``.
+
+        Returns: (reachable location bitset, portal bitset), memoized per state
+        """
+        key = (state, starts)
+        cached = self._memo.get(key)
+        if cached is not None:
+            return cached
+
+        portals = self._portals(state)
+        reached = starts
+        while True:
+            expanded = reached
+            for network in self._networks:
+                if reached & portals & network:
+                    expanded |= network & portals
+            if expanded == reached:
+                break
+            reached = expanded
+
+        if len(self._memo) >= self.MAX_MEMO_STATES:
+            self._memo.clear()
+        self._memo[key] = (reached, portals)
+        return reached, portals
+
+    def solve(
+        self,
+        starts: int,
+        initial_state: int = 0,
+        target_location_id: Optional[int] = None,
+        target_navobj_id: Optional[int] = None,
+        max_states: int = 100000
+    ) -> Dict:
+        """
+        Breadth-first search over switch states for the smallest set of extra
+        switches that makes the target reachable.
+
+        Only switches that sit in a reached location and target a currently
+        closed navigation object are expanded; every other flip cannot change
+        the closure.
+
+        Returns: Dict with the solution state (or None) and search statistics
+        """
+        target_bit = self._location_bit[target_location_id] if target_location_id is not None else 0
+        target_navobj = self._navobj_gates[target_navobj_id] if target_navobj_id is not None else None
+
+        def satisfied(state: int, reached: int) -> bool:
+            if target_bit and not target_bit & reached:
+                return False
+            if target_navobj is not None:
+                loc_bit, gate = target_navobj
+                return bool(loc_bit & reached) and (not gate or bool(gate & state))
+            return True
+
+        visited = {initial_state}
+        frontier = deque([initial_state])
+        explored = 0
+        while frontier:
+            state = frontier.popleft()
+            explored += 1
+            reached, portals = self.closure(state, starts)
+            if satisfied(state, reached):
+                return {"state": state, "states_explored": explored, "limit_reached": False}
+            if explored >= max_states:
+                return {"state": None, "states_explored": explored, "limit_reached": True}
+
+            for switch_id in self.switch_ids:
+                bit = self._switch_bit[switch_id]
+                if state & bit or not self._switch_location[switch_id] & reached:
+                    continue
+                target = self._switch_target[switch_id]
+                if target is None:
+                    continue
+                _, gate = self._navobj_gates.get(target, (0, 0))
+                if not gate or gate & state:
+                    continue  # Target already open (or unknown); flipping changes nothing
+                next_state = state | bit
+                if next_state not in visited:
+                    visited.add(next_state)
+                    frontier.append(next_state)
+
+        return {"state": None, "states_explored": explored, "limit_reached": False}
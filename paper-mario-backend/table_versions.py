@@ -0,0 +1,224 @@
+"""Per-table version counters bumped when a transaction touching the table commits.
+
+Every ``Session`` records the tables it flushes in ``session.info``; on commit
+the counters for those tables are incremented and subscribers are told which
+tables changed. Caches compare the counters they loaded under with the current
+ones instead of expiring on a timer. Rolled-back work never bumps a counter.
+
+The counters are per process. With several workers, ``install_shared`` adds a
+``table_versions`` table whose rows are bumped in the same transaction as each
+write; ``sync()`` (called when a request opens its session) compares them with
+the versions this worker last saw and bumps the local counters of the tables
+other workers changed. On SQLite, ``PRAGMA data_version`` on a dedicated
+connection tells whether anything was committed since the last check, so an
+idle database costs no query at all.
+"""
+import sqlite3
+import threading
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, Iterable, List, Optional, Set, Tuple
+
+from sqlalchemy import Column, Integer, MetaData, String, Table, event, inspect, select, update
+from sqlalchemy.engine import Engine, make_url
+from sqlalchemy.orm import Session
+
+_TOUCHED_KEY = "touched_tables"
+_SHARED_KEY = "shared_table_versions"
+
+_lock = threading.Lock()
+_versions: Dict[str, int] = {}
+_subscribers: List[Callable[[Set[str]], None]] = []
+
+# Set by install_shared(); None in a single-process setup
+_shared: Optional["_SharedVersions"] = None
+
+
+def current(table: str) -> int:
+    """Current version of a table (0 until its first committed change)."""
+    return _versions.get(table, 0)
+
+
+def snapshot(*tables: str) -> Tuple[int, ...]:
+    """Versions of several tables, usable as part of a cache key."""
+    return tuple(_versions.get(table, 0) for table in tables)
+
+
+def pending_tables(session: Session) -> Set[str]:
+    """Tables the session has flushed changes to but not yet committed."""
+    return session.info.get(_TOUCHED_KEY, set())
+
+
+def subscribe(callback: Callable[[Set[str]], None]) -> None:
+    """Call ``callback(changed_tables)`` after every commit that changed tables."""
+    _subscribers.append(callback)
+
+
+def bump(tables: Iterable[str]) -> None:
+    """Mark tables as changed and notify subscribers."""
+    changed = set(tables)
+    if not changed:
+        return
+    with _lock:
+        for table in changed:
+            _versions[table] = _versions.get(table, 0) + 1
+    for callback in list(_subscribers):
+        callback(changed)
+
+
+def _table_name(instance) -> str:
+    return instance.__table__.name
+
+
+@event.listens_for(Session, "after_flush")
+def _record_flushed_tables(session, flush_context):
+    touched = session.info.setdefault(_TOUCHED_KEY, set())
+    flushed = {_table_name(instance) for instance in (*session.new, *session.dirty, *session.deleted)}
+    touched.update(flushed)
+    if _shared is not None and flushed:
+        written = session.info.setdefault(_SHARED_KEY, {})
+        written.update(_shared.bump_in_transaction(session.connection(), flushed))
+
+
+@event.listens_for(Session, "after_commit")
+def _bump_committed_tables(session):
+    touched = session.info.pop(_TOUCHED_KEY, None)
+    written = session.info.pop(_SHARED_KEY, None)
+    if written and _shared is not None:
+        _shared.saw(written)
+    if touched:
+        bump(touched)
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_rolled_back_tables(session):
+    session.info.pop(_TOUCHED_KEY, None)
+    session.info.pop(_SHARED_KEY, None)
+
+
+class _SharedVersions:
+    """Table versions shared by all workers through the database itself."""
+
+    def __init__(self, engine: Engine, table: Table):
+        self.engine = engine
+        self.table = table
+        self._seen: Dict[str, int] = {}
+        self._lock = threading.Lock()
+        self._ready = False
+        self._synced = False
+        self._data_version: Optional[int] = None
+        self._watcher: Optional[sqlite3.Connection] = None
+        if engine.dialect.name == "sqlite":
+            path = make_url(str(engine.url)).database
+            if path and path != ":memory:":
+                self._watcher = sqlite3.connect(path, check_same_thread=False)
+
+    def _exists(self, connection) -> bool:
+        # Databases created before the table existed keep per-process versions
+        # until init_db.py is run
+        if not self._ready:
+            self._ready = inspect(connection).has_table(self.table.name)
+        return self._ready
+
+    def bump_in_transaction(self, connection, tables: Set[str]) -> Dict[str, int]:
+        """Increment the shared versions inside the caller's transaction."""
+        if not self._exists(connection):
+            return {}
+        t = self.table
+        written = {}
+        for name in sorted(tables):  # fixed order avoids lock-order deadlocks
+            result = connection.execute(
+                update(t).where(t.c.table_name == name).values(version=t.c.version + 1)
+            )
+            if result.rowcount == 0:
+                connection.execute(t.insert().values(table_name=name, version=1))
+            written[name] = connection.execute(
+                select(t.c.version).where(t.c.table_name == name)
+            ).scalar_one()
+        return written
+
+    def saw(self, versions: Dict[str, int]) -> None:
+        """Record versions this worker wrote itself; its local counters are already bumped."""
+        with self._lock:
+            for name, version in versions.items():
+                if version > self._seen.get(name, 0):
+                    self._seen[name] = version
+
+    def _changed_since_last_check(self) -> bool:
+        if self._watcher is None:
+            return True
+        with self._lock:
+            data_version = self._watcher.execute("PRAGMA data_version").fetchone()[0]
+            changed = data_version != self._data_version
+            self._data_version = data_version
+        return changed
+
+    def sync(self) -> None:
+        if not self._changed_since_last_check():
+            return
+        with self.engine.connect() as connection:
+            if not self._exists(connection):
+                return
+            rows = connection.execute(select(self.table.c.table_name, self.table.c.version)).all()
+
+        changed = set()
+        with self._lock:
+            first_sync = not self._synced
+            self._synced = True
+            for name, version in rows:
+                if version > self._seen.get(name, 0):
+                    self._seen[name] = version
+                    changed.add(name)
+        # The first sync runs before this worker has cached anything
+        if changed and not first_sync:
+            bump(changed)
+
+
+def install_shared(engine: Engine, metadata: MetaData) -> Table:
+    """Share table versions between workers through a ``table_versions`` table."""
+    global _shared
+    table = metadata.tables.get("table_versions")
+    if table is None:
+        table = Table(
+            "table_versions", metadata,
+            Column("table_name", String(100), primary_key=True),
+            Column("version", Integer, nullable=False, default=0),
+        )
+    _shared = _SharedVersions(engine, table)
+    return table
+
+
+def sync() -> None:
+    """Pick up commits other workers made since this worker last looked."""
+    if _shared is not None:
+        _shared.sync()
+
+
+class VersionedCache:
+    """Bounded LRU cache whose entries are valid for one version of a set of tables."""
+
+    def __init__(self, tables: Iterable[str], maxsize: int = 128):
+        self.tables = tuple(tables)
+        self.maxsize = maxsize
+        self._entries: "OrderedDict[Hashable, Tuple[Tuple[int, ...], Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get_or_compute(self, key: Hashable, compute: Callable[[], Any]) -> Any:
+        """Return the cached value for ``key`` or compute and store it."""
+        version = snapshot(*self.tables)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] == version:
+                self._entries.move_to_end(key)
+                return entry[1]
+
+        value = compute()
+        with self._lock:
+            self._entries[key] = (version, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+        return value
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()